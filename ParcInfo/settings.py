@@ -289,3 +289,75 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "30"))
 OLLAMA_MAX_TOKENS = int(os.getenv("OLLAMA_MAX_TOKENS", "1000"))
 OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
+# Connexions keep-alive partagées et générations simultanées (au-delà : attente jusqu'à OLLAMA_QUEUE_TIMEOUT s)
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "10"))
+# Disponibilité mise en cache ; circuit ouvert après N échecs consécutifs, pendant N secondes
+OLLAMA_AVAILABILITY_TTL = float(os.getenv("OLLAMA_AVAILABILITY_TTL", "30"))
+OLLAMA_CIRCUIT_FAILURES = int(os.getenv("OLLAMA_CIRCUIT_FAILURES", "3"))
+OLLAMA_CIRCUIT_RESET_SECONDS = float(os.getenv("OLLAMA_CIRCUIT_RESET_SECONDS", "30"))
+# Budget du prompt RAG en tokens ; tokenizer Hugging Face (nom ou chemin) du modèle servi
+# pour les compter, vide pour une estimation par la longueur
+OLLAMA_PROMPT_TOKENS = int(os.getenv("OLLAMA_PROMPT_TOKENS", "1536"))
+OLLAMA_TOKENIZER = os.getenv("OLLAMA_TOKENIZER", "")
+
+# Chatbot - démarrage progressif
+# Si activé, chaque worker WSGI lance le chargement des modèles NLP dès son démarrage
+CHATBOT_WARMUP_ON_START = os.getenv("CHATBOT_WARMUP_ON_START", "1") == "1"
+
+# Chatbot - serveur d'inférence partagé (python manage.py run_inference_server)
+# Laisser CHATBOT_INFERENCE_URL vide pour charger les modèles dans chaque worker
+CHATBOT_INFERENCE_URL = os.getenv("CHATBOT_INFERENCE_URL", "")
+CHATBOT_INFERENCE_HOST = os.getenv("CHATBOT_INFERENCE_HOST", "127.0.0.1")
+CHATBOT_INFERENCE_PORT = int(os.getenv("CHATBOT_INFERENCE_PORT", "8765"))
+CHATBOT_INFERENCE_ZERO_SHOT = os.getenv("CHATBOT_INFERENCE_ZERO_SHOT", "0") == "1"
+CHATBOT_INFERENCE_MAX_WAIT_MS = float(os.getenv("CHATBOT_INFERENCE_MAX_WAIT_MS", "5"))
+
+# Chatbot - classification zero-shot BART par micro-lots
+CHATBOT_ZERO_SHOT_BATCH_SIZE = int(os.getenv("CHATBOT_ZERO_SHOT_BATCH_SIZE", "16"))
+CHATBOT_ZERO_SHOT_MAX_WAIT_MS = float(os.getenv("CHATBOT_ZERO_SHOT_MAX_WAIT_MS", "5"))
+
+# Chatbot - backend de classification d'intents
+# zero_shot (BART-large-MNLI), embedding_logreg (manage.py train_intent_classifier),
+# quantized (modèle ParcInfoBartRetrainer quantifié int8) ou rules
+CHATBOT_INTENT_BACKEND = os.getenv("CHATBOT_INTENT_BACKEND", "zero_shot")
+CHATBOT_INTENT_MODEL_PATH = os.getenv("CHATBOT_INTENT_MODEL_PATH", os.path.join(BASE_DIR, "models", "intent_classifier.joblib"))
+CHATBOT_QUANTIZED_INTENT_MODEL_PATH = os.getenv("CHATBOT_QUANTIZED_INTENT_MODEL_PATH", os.path.join(BASE_DIR, "models", "parcinfo_bart"))
+
+# Chatbot - cache disque des embeddings (fichiers .npy en mmap partagés entre workers)
+# Laisser vide pour désactiver
+CHATBOT_CACHE_DIR = os.getenv("CHATBOT_CACHE_DIR", os.path.join(BASE_DIR, "cache", "chatbot"))
+
+# Chatbot - cache des réponses (Redis, repli sur le cache Django si Redis est indisponible)
+# Invalidé par les versions de tables incrémentées par les signaux ; 0 pour désactiver
+CHATBOT_RESPONSE_CACHE_TTL = int(os.getenv("CHATBOT_RESPONSE_CACHE_TTL", "1800"))
+CHATBOT_REDIS_HOST = os.getenv("CHATBOT_REDIS_HOST", "localhost")
+CHATBOT_REDIS_PORT = int(os.getenv("CHATBOT_REDIS_PORT", "6379"))
+CHATBOT_REDIS_DB = int(os.getenv("CHATBOT_REDIS_DB", "0"))
+
+# Chatbot - cache des embeddings de requêtes (LRU en mémoire puis Redis, float32 brut)
+CHATBOT_EMBEDDING_CACHE_MAX_MB = int(os.getenv("CHATBOT_EMBEDDING_CACHE_MAX_MB", "64"))
+CHATBOT_EMBEDDING_CACHE_TTL = int(os.getenv("CHATBOT_EMBEDDING_CACHE_TTL", "86400"))
+
+# Chatbot - cache sémantique des réponses RAG+LLM (en mémoire, par processus)
+# Réponse réutilisée si cosinus >= seuil et mêmes documents retrouvés ; TTL 0 pour désactiver
+CHATBOT_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("CHATBOT_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+CHATBOT_SEMANTIC_CACHE_SIZE = int(os.getenv("CHATBOT_SEMANTIC_CACHE_SIZE", "512"))
+CHATBOT_SEMANTIC_CACHE_TTL = int(os.getenv("CHATBOT_SEMANTIC_CACHE_TTL", "3600"))
+
+# Chatbot - valeurs connues (codes, ICE, commandes...) pour la vérification des réponses LLM
+# Rechargées au changement de version des tables, au plus tard après ce délai (s)
+CHATBOT_KNOWN_ENTITIES_TTL = int(os.getenv("CHATBOT_KNOWN_ENTITIES_TTL", "600"))
+
+# Chatbot - mode test de l'indexation RAG : nombre de requêtes SQL par lot vérifié
+# (voir RELATED_SPECS dans apps/chatbot/rag_manager.py)
+CHATBOT_INDEX_CHECK_QUERIES = os.getenv("CHATBOT_INDEX_CHECK_QUERIES", "0") == "1"
+
+# Chatbot - index ANN pgvector (manage.py tune_vector_index)
+# 0 = valeur dérivée de l'index ou réglée par tune_vector_index --benchmark --apply
+CHATBOT_VECTOR_PROBES = int(os.getenv("CHATBOT_VECTOR_PROBES", "0"))
+CHATBOT_VECTOR_EF_SEARCH = int(os.getenv("CHATBOT_VECTOR_EF_SEARCH", "0"))
+# Représentation indexée : full, halfvec ou binary (présélection compacte puis rerank pleine précision)
+CHATBOT_VECTOR_STORAGE = os.getenv("CHATBOT_VECTOR_STORAGE", "full")
+CHATBOT_VECTOR_RERANK_FACTOR = int(os.getenv("CHATBOT_VECTOR_RERANK_FACTOR", "0"))
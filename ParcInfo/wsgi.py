@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ParcInfo.settings")
 
 application = get_wsgi_application()
+
+# Préchauffage du chatbot au démarrage du worker : le routage par règles est
+# prêt immédiatement, les modèles NLP se chargent en arrière-plan.
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, "CHATBOT_WARMUP_ON_START", False):
+    import logging  # noqa: E402
+
+    try:
+        from apps.chatbot.core_chatbot import get_chatbot  # noqa: E402
+
+        get_chatbot()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Chatbot warm-up skipped: {e}")
@@ -8,6 +8,9 @@ class ChatbotConfig(AppConfig):
     
     def ready(self):
         """Initialise les signals lors du démarrage de l'application"""
+        import apps.chatbot.signals
+        apps.chatbot.signals.connect_data_version_signals()
+        apps.chatbot.signals.connect_rag_index_signals()
         try:
             import apps.chatbot.auto_vectorization
         except ImportError:
@@ -9,20 +9,19 @@ import json
 import logging
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
-import torch
-from transformers import (
-    BartForSequenceClassification, 
-    BartTokenizer, 
-    TrainingArguments, 
-    Trainer,
-    DataCollatorWithPadding
-)
-from datasets import Dataset
+try:
+    from datasets import Dataset
+except ImportError:
+    # Seul le réentraînement a besoin de datasets ; le corpus reste importable sans
+    Dataset = None
 import numpy as np
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support
+
+# Réexportés : le corpus vit dans intent_corpus, importable sans torch ni transformers
+from apps.chatbot.intent_corpus import PARCINFO_TRAINING_DATA, PARCINFO_VALIDATION_DATA, routing_examples
 
 logger = logging.getLogger(__name__)
 
+
 class ParcInfoBartRetrainer:
     """Classe pour réentraîner le modèle BART sur le domaine ParcInfo"""
     
@@ -33,97 +32,9 @@ class ParcInfoBartRetrainer:
         self.label2id = {}
         self.id2label = {}
         
-        # Corpus d'entraînement spécifique à ParcInfo
-        self.parcinfo_training_data = [
-            # Codes et inventaire
-            ("Code inventaire de la Baie", "codes_by_designation"),
-            ("Numéro d'inventaire du serveur", "codes_by_designation"),
-            ("Code de la station de travail", "codes_by_designation"),
-            ("Référence du matériel informatique", "codes_by_designation"),
-            ("Code inventaire du PC", "codes_by_designation"),
-            
-            # Statut de livraison
-            ("Statut de la livraison BC23", "delivery_status"),
-            ("État de la livraison BC24", "delivery_status"),
-            ("Livraison BC23 est-elle arrivée", "delivery_status"),
-            ("Quand arrive la livraison BC24", "delivery_status"),
-            ("Statut livraison commande", "delivery_status"),
-            
-            # Fournisseurs de commandes
-            ("Fournisseur de la commande BC23", "order_supplier"),
-            ("Qui fournit la commande BC24", "order_supplier"),
-            ("Fournisseur commande informatique", "order_supplier"),
-            ("Fournisseur de la commande", "order_supplier"),
-            ("Quel fournisseur pour BC23", "order_supplier"),
-            
-            # Fournisseurs ICE
-            ("Fournisseurs avec ICE commençant par 001", "fournisseurs_ice_001"),
-            ("ICE commençant par 001", "fournisseurs_ice_001"),
-            ("Fournisseurs ICE 001", "fournisseurs_ice_001"),
-            ("ICE 001 fournisseurs", "fournisseurs_ice_001"),
-            ("Fournisseurs commençant par ICE 001", "fournisseurs_ice_001"),
-            
-            # Comptage de demandes
-            ("Combien de demandes d'équipement ont été faites par gestionnaire bureau", "count_equipment_requests"),
-            ("Nombre de demandes gestionnaire bureau", "count_equipment_requests"),
-            ("Compte des demandes équipement", "count_equipment_requests"),
-            ("Combien de demandes par utilisateur", "count_equipment_requests"),
-            ("Total des demandes d'équipement", "count_equipment_requests"),
-            
-            # Affectation de matériels
-            ("Matériels bureautiques affectés à gestionnaire bureau", "user_material_assignment"),
-            ("Matériels affectés à l'utilisateur", "user_material_assignment"),
-            ("Affectation matériels bureautiques", "user_material_assignment"),
-            ("Quels matériels pour l'utilisateur", "user_material_assignment"),
-            ("Matériels assignés à", "user_material_assignment"),
-            
-            # Demandes par date
-            ("Demandes d'équipement approuvées en août 2025", "equipment_requests_by_date"),
-            ("Demandes approuvées août 2025", "equipment_requests_by_date"),
-            ("Demandes équipement août", "equipment_requests_by_date"),
-            ("Demandes approuvées en juillet", "equipment_requests_by_date"),
-            ("Demandes par mois", "equipment_requests_by_date"),
-            
-            # Montants totaux
-            ("Coût total des commandes juillet 2025", "total_it_orders_amount"),
-            ("Montant total commandes informatiques", "total_it_orders_amount"),
-            ("Prix total des commandes", "total_it_orders_amount"),
-            ("Coût total juillet 2025", "total_it_orders_amount"),
-            ("Total des montants commandes", "total_it_orders_amount"),
-            
-            # Données manquantes (fallback)
-            ("Quels sont les prix des matériels informatiques", "fallback"),
-            ("Prix du matériel informatique", "fallback"),
-            ("Coût des équipements", "fallback"),
-            ("Historique des logs admin pour l'utilisateur superadmin", "fallback"),
-            ("Logs d'activité admin", "fallback"),
-            ("Historique des actions admin", "fallback"),
-            
-            # Intents existants pour maintenir la compatibilité
-            ("Liste des fournisseurs", "liste_fournisseurs"),
-            ("Tous les fournisseurs", "liste_fournisseurs"),
-            ("Fournisseurs disponibles", "liste_fournisseurs"),
-            ("Comparer les garanties", "compare_garanties"),
-            ("Garantie des matériels", "compare_garanties"),
-            ("Vérifier les garanties", "compare_garanties"),
-            ("Matériels expirant bientôt", "check_expiring_soon"),
-            ("Équipements qui expirent", "check_expiring_soon"),
-            ("Garanties qui expirent", "check_expiring_soon")
-        ]
-        
-        # Données de validation
-        self.validation_data = [
-            ("Code inventaire du serveur Lenovo", "codes_by_designation"),
-            ("Statut livraison commande BC25", "delivery_status"),
-            ("Fournisseur commande BC26", "order_supplier"),
-            ("ICE 002 fournisseurs", "fournisseurs_ice_001"),
-            ("Demandes équipement par mois", "count_equipment_requests"),
-            ("Matériels affectés à test_employe", "user_material_assignment"),
-            ("Demandes approuvées septembre", "equipment_requests_by_date"),
-            ("Total coût commandes août", "total_it_orders_amount"),
-            ("Prix matériel bureautique", "fallback"),
-            ("Logs admin superadmin", "fallback")
-        ]
+        # Libellés ramenés aux clés de handler du chatbot (backend 'quantized')
+        self.parcinfo_training_data = routing_examples(PARCINFO_TRAINING_DATA)
+        self.validation_data = routing_examples(PARCINFO_VALIDATION_DATA)
     
     def prepare_training_data(self) -> Dataset:
         """Prépare les données d'entraînement pour le modèle BART"""
@@ -192,6 +103,7 @@ class ParcInfoBartRetrainer:
     
     def compute_metrics(self, pred):
         """Calcule les métriques de performance"""
+        from sklearn.metrics import accuracy_score, precision_recall_fscore_support
         labels = pred.label_ids
         preds = pred.predictions.argmax(-1)
         precision, recall, f1, _ = precision_recall_fscore_support(labels, preds, average='weighted')
@@ -207,6 +119,14 @@ class ParcInfoBartRetrainer:
                      num_epochs: int = 5, batch_size: int = 8) -> bool:
         """Réentraîne le modèle BART sur les données ParcInfo"""
         try:
+            import torch
+            from transformers import (
+                BartForSequenceClassification,
+                BartTokenizer,
+                TrainingArguments,
+                Trainer,
+                DataCollatorWithPadding
+            )
             logger.info("Début du réentraînement du modèle BART pour ParcInfo")
             
             # Charger le tokenizer et le modèle
@@ -315,6 +235,7 @@ class ParcInfoBartRetrainer:
                 logger.info(f"Configuration chargée: {len(self.label2id)} labels")
             
             # Charger le modèle et le tokenizer
+            from transformers import BartForSequenceClassification, BartTokenizer
             self.tokenizer = BartTokenizer.from_pretrained(model_path)
             self.model = BartForSequenceClassification.from_pretrained(model_path)
             
@@ -332,6 +253,7 @@ class ParcInfoBartRetrainer:
     def predict_intent(self, text: str) -> Tuple[str, float]:
         """Prédit l'intent avec le modèle réentraîné"""
         try:
+            import torch
             if self.model is None or self.tokenizer is None:
                 raise ValueError("Modèle non chargé. Utilisez load_retrained_model() d'abord.")
             
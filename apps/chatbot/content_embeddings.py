@@ -0,0 +1,105 @@
+"""
+Embeddings des contenus indexés, adressés par leur texte
+Clé : SHA-256 du texte normalisé + nom du modèle d'embedding. Les désignations,
+descriptions ou lignes de commande au texte identique partagent un seul vecteur,
+stocké dans ContentEmbedding : seul un texte jamais vu est encodé, y compris
+d'une réindexation à l'autre.
+"""
+
+import hashlib
+import logging
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from apps.chatbot import metrics
+from apps.chatbot.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+ENCODE_BATCH_SIZE = 64
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class ContentEmbeddingStore:
+    """Consulté avant chaque appel à encode() pour des contenus du corpus"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def _fetch(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        from apps.chatbot.models import ContentEmbedding
+        if not hashes:
+            return {}
+        rows = ContentEmbedding.objects.filter(model_name=self.model_name, content_hash__in=hashes)
+        return {
+            content_hash: np.asarray(embedding, dtype=np.float32)
+            for content_hash, embedding in rows.values_list('content_hash', 'embedding')
+        }
+
+    def _store(self, vectors: Dict[str, np.ndarray]):
+        from apps.chatbot.models import ContentEmbedding
+        try:
+            ContentEmbedding.objects.bulk_create(
+                [ContentEmbedding(content_hash=content_hash, model_name=self.model_name, embedding=vector)
+                 for content_hash, vector in vectors.items()],
+                ignore_conflicts=True,
+            )
+        except Exception as e:
+            # Les vecteurs restent utilisables : ils seront simplement ré-encodés la prochaine fois
+            logger.warning(f"Content embeddings: store failed ({e})")
+
+    def encode(self, model, texts: List[str]) -> np.ndarray:
+        """Matrice (len(texts), dim) float32 ; seuls les textes inconnus passent par le modèle"""
+        normalized = [normalize_text(text) for text in texts]
+        hashes = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in normalized]
+        vectors = self._fetch(list(dict.fromkeys(hashes)))
+
+        missing = {content_hash: text for content_hash, text in zip(hashes, normalized) if content_hash not in vectors}
+        if missing:
+            started = time.perf_counter()
+            encoded = np.asarray(
+                model.encode(list(missing.values()), batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True,
+                             show_progress_bar=False),
+                dtype=np.float32,
+            )
+            metrics.increment('content_embeddings.encode_ms', int((time.perf_counter() - started) * 1000))
+            new_vectors = dict(zip(missing, encoded))
+            self._store(new_vectors)
+            vectors.update(new_vectors)
+
+        metrics.increment('content_embeddings.encoded', len(missing))
+        metrics.increment('content_embeddings.reused', len(texts) - len(missing))
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[content_hash] for content_hash in hashes])
+
+    def get_stats(self):
+        """Taux de déduplication et temps d'encodage économisé (estimé au temps moyen par texte)"""
+        counters = metrics.get_counters()
+        encoded = counters.get('content_embeddings.encoded', 0)
+        reused = counters.get('content_embeddings.reused', 0)
+        encode_seconds = counters.get('content_embeddings.encode_ms', 0) / 1000
+        total = encoded + reused
+        return {
+            'model': self.model_name,
+            'encoded': encoded,
+            'reused': reused,
+            'dedupe_ratio': round(reused / total, 3) if total else 0.0,
+            'encode_seconds': round(encode_seconds, 2),
+            'seconds_saved': round(reused * encode_seconds / encoded, 2) if encoded else 0.0,
+        }
+
+
+_stores: Dict[str, ContentEmbeddingStore] = {}
+
+
+def get_content_embeddings(model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2') -> ContentEmbeddingStore:
+    store = _stores.get(model_name)
+    if store is None:
+        store = _stores[model_name] = ContentEmbeddingStore(model_name)
+    return store
@@ -1,5 +1,6 @@
 import logging
 import re
+import threading
 import unicodedata
 from typing import List, Dict, Any, Optional, Tuple, Union
 from django.db.models import Q, Sum, Count, F, DecimalField, ExpressionWrapper
@@ -42,11 +43,23 @@ from apps.fournisseurs.models import Fournisseur
 from apps.users.models import CustomUser
 from apps.livraison.models import Livraison
 from apps.demande_equipement.models import DemandeEquipement, ArchiveDecharge
-from apps.chatbot.models import IntentExample, ChatbotFeedback
+from apps.chatbot.models import ChatbotFeedback
 from apps.chatbot.rag_manager import RAGManager
-from apps.chatbot.llm_client import OllamaClient
+from apps.chatbot.llm_client import OllamaClient, FAILED_RESPONSES
 from apps.chatbot.structured_search import StructuredSearch
 from apps.chatbot.generic_query import GenericQueryEngine
+from apps.chatbot.intent_router import CompiledIntentRouter
+from apps.chatbot.intent_index import IntentEmbeddingIndex
+from apps.chatbot.embedding_store import get_intent_embedding_cache
+from apps.chatbot.intent_backends import IntentBackend, ZeroShotIntentBackend, build_intent_backend
+from apps.chatbot.inference_client import get_inference_client, RemoteZeroShotClassifier
+from apps.chatbot.readiness import ComponentReadiness, LOADING, READY, FAILED, DISABLED
+from apps.chatbot.response_cache import get_response_cache
+from apps.chatbot.embedding_cache import get_embedding_cache
+from apps.chatbot.content_embeddings import get_content_embeddings
+from apps.chatbot.semantic_cache import get_semantic_cache
+from apps.chatbot.known_entities import get_known_entities
+from apps.chatbot import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -106,11 +119,20 @@ Exemple de réponse attendue :
 - Réponse : "Bonjour ! Oui, j'ai trouvé une baie, cd14 (numéro de série sn14), encore sous garantie jusqu'au 23/08/2025 via la commande BC23, soit 5 jours restants. Besoin d'autres détails ?"
 """
 
+# Composants suivis pendant le démarrage progressif
+WARMUP_COMPONENTS = ['rules', 'embedding', 'intent_examples', 'intent_backend', 'llm', 'db_indexes']
+
 # Singleton instance
 _chatbot_instance = None
+_chatbot_lock = threading.Lock()
 
 class ParcInfoChatbot:
-    def __init__(self):
+    def __init__(self, warmup: str = 'background', intent_backend: Union[str, IntentBackend, None] = None):
+        """
+        Args:
+            warmup: 'background' (défaut) charge les modèles dans un thread,
+                'sync' les charge avant de rendre la main, 'none' ne les charge pas.
+        """
         try:
             logger.info("Initializing ParcInfo Chatbot...")
 
@@ -172,50 +194,22 @@ class ParcInfoChatbot:
             }
 
             # Initialize RAG, LLM and Structured Search components
-            self.rag = RAGManager()
+            # Les composants lourds (modèles NLP, sonde Ollama, index DB) sont chargés
+            # par warm_up(), en arrière-plan par défaut : le routage par règles reste
+            # disponible immédiatement.
+            self.readiness = ComponentReadiness(WARMUP_COMPONENTS)
+            self.rag = RAGManager(load_model=False)
             self.llm_client = OllamaClient()
             self.structured_search = StructuredSearch()
             self.generic_query = GenericQueryEngine()
-            self.use_llm = self.llm_client.is_available()
-
-            if self.use_llm:
-                logger.info(" LLM (Ollama) available for enhanced responses")
-            else:
-                logger.warning(" LLM not available, using structured responses only")
-
-            # Initialize NLP components with robust BART loading
-            # Reuse embedding model from RAGManager to avoid duplicate loading
-            if SentenceTransformer is not None and pipeline is not None:
-                try:
-                    # Use the embedding model from RAGManager to avoid duplicate loading
-                    self.embedding_model = self.rag.embed_model
-                    if self.embedding_model:
-                        logger.info(f"Load pretrained SentenceTransformer: {EMBEDDING_MODEL}")
-                        # Chargement robuste de BART avec retry et gestion d'erreurs
-                        self.intent_classifier = self._load_bart_model_robustly()
-                        self.nlp_available = True
-                        if self.intent_classifier:
-                            logger.info("Advanced NLP components initialized successfully (BART enabled)")
-                        else:
-                            logger.warning("Advanced NLP components initialized with BART fallback")
-                    else:
-                        logger.warning("Embedding model not available from RAGManager")
-                        self.intent_classifier = None
-                        self.nlp_available = False
-                except Exception as e:
-                    logger.warning(f"Failed to initialize advanced NLP components: {e}")
-                    self.embedding_model = None
-                    self.intent_classifier = None
-                    self.nlp_available = False
-            else:
-                logger.warning("Advanced NLP not available, using basic features only")
-                self.embedding_model = None
-                self.intent_classifier = None
-                self.nlp_available = False
-
-            # Initialiser les indexes DB si nécessaire
-            self._ensure_db_indexes()
-            logger.info("Chatbot initialized successfully with DB indexes")
+            self.use_llm = False
+            self.embedding_model = None
+            self.intent_classifier = None
+            # Backend de classification d'intents : nom (voir CHATBOT_INTENT_BACKEND) ou instance
+            self._intent_backend_choice = intent_backend
+            self.intent_backend = None
+            self.nlp_available = False
+            self._warmup_thread = None
 
             # Model mapping for generic queries
             from apps.fournisseurs.models import Fournisseur
@@ -310,14 +304,14 @@ class ParcInfoChatbot:
             self.intent_map = self._build_intent_map()
             self._compiled_intent_patterns = self._compile_intent_patterns()
             self._phrase_boosts = self._build_phrase_boosts()
+            self._intent_router = CompiledIntentRouter(
+                self.intent_map, self._compiled_intent_patterns, self._phrase_boosts
+            )
             self._entity_patterns = self._build_entity_patterns()
 
-            # Initialize intent examples
-            self._intent_examples = self._load_intent_examples()
-            if self.nlp_available:
-                self._intent_embeddings = self._encode_intent_examples()
-            else:
-                self._intent_embeddings = {}
+            # Initialize intent examples (encodés lors du warm-up, avec ceux de la base)
+            self._intent_examples = self._default_intent_examples()
+            self._intent_index = None
 
             # Initialize intent handlers mapping
             self.intent_handlers = {
@@ -388,11 +382,125 @@ class ParcInfoChatbot:
             'equipment_requests_by_date': self._handle_equipment_requests_by_date,
             }
 
-            logger.info("Chatbot initialized successfully")
+            self.readiness.mark('rules', READY)
+            logger.info("Chatbot initialized successfully (rule-based routing ready)")
+
+            if warmup == 'sync':
+                self.warm_up()
+            elif warmup == 'background':
+                self.start_background_warmup()
         except Exception as e:
             logger.error(f"Initialization error: {e}")
             raise
 
+    def start_background_warmup(self) -> threading.Thread:
+        """Lance le chargement des composants lourds dans un thread daemon"""
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(
+                target=self.warm_up, name='chatbot-warmup', daemon=True
+            )
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def warm_up(self):
+        """Charge les composants lourds un par un en publiant leur état de disponibilité"""
+        # 1. Modèle d'embeddings (partagé entre RAG et matching sémantique)
+        self.readiness.mark('embedding', LOADING)
+        inference_client = get_inference_client()
+        remote_models = inference_client is not None and inference_client.is_available()
+        if not remote_models and (SentenceTransformer is None or pipeline is None):
+            self.readiness.mark('embedding', DISABLED, 'sentence_transformers non installé')
+            self.readiness.mark('intent_examples', DISABLED, 'modèle d\'embeddings indisponible')
+        else:
+            try:
+                self.embedding_model = self.rag.load_embedding_model()
+            except Exception as e:
+                logger.warning(f"Failed to initialize advanced NLP components: {e}")
+                self.embedding_model = None
+            if self.embedding_model:
+                logger.info(f"Load pretrained SentenceTransformer: {EMBEDDING_MODEL}")
+                self.readiness.mark('embedding', READY)
+
+                # 2. Exemples d'intents encodés pour le matching sémantique
+                self.readiness.mark('intent_examples', LOADING)
+                self.nlp_available = True
+                self._intent_index = self._encode_intent_examples()
+                self.readiness.mark('intent_examples', READY if self._intent_index else FAILED,
+                                    None if self._intent_index else 'encodage des exemples échoué')
+            else:
+                logger.warning("Embedding model not available from RAGManager")
+                self.readiness.mark('embedding', FAILED, 'chargement du modèle échoué')
+                self.readiness.mark('intent_examples', DISABLED, 'modèle d\'embeddings indisponible')
+
+        # 3. Backend de classification d'intents (zero-shot BART, tête MiniLM, modèle int8)
+        self.readiness.mark('intent_backend', LOADING)
+        try:
+            self.intent_backend = self._load_intent_backend(inference_client if remote_models else None)
+        except Exception as e:
+            logger.warning(f"Intent backend loading failed: {e}")
+            self.intent_backend = None
+        if self.intent_backend:
+            logger.info(f"Intent backend ready: {self.intent_backend.name}")
+            self.readiness.mark('intent_backend', READY)
+        else:
+            logger.warning("No intent backend available, using rule-based classification")
+            self.readiness.mark('intent_backend', DISABLED, 'classification par règles utilisée')
+
+        # 4. Sonde Ollama
+        self.readiness.mark('llm', LOADING)
+        try:
+            self.use_llm = self.llm_client.is_available()
+        except Exception as e:
+            logger.warning(f"Ollama probe failed: {e}")
+            self.use_llm = False
+        if self.use_llm:
+            logger.info(" LLM (Ollama) available for enhanced responses")
+            self.readiness.mark('llm', READY)
+        else:
+            logger.warning(" LLM not available, using structured responses only")
+            self.readiness.mark('llm', DISABLED, 'Ollama injoignable')
+
+        # 5. Index DB
+        self.readiness.mark('db_indexes', LOADING)
+        try:
+            self._ensure_db_indexes()
+            self.readiness.mark('db_indexes', READY)
+        except Exception as e:
+            self.readiness.mark('db_indexes', FAILED, str(e))
+        logger.info("Chatbot warm-up finished")
+
+    def _load_intent_backend(self, inference_client=None) -> Optional[IntentBackend]:
+        """Instancie le backend de classification d'intents configuré"""
+        from django.conf import settings
+
+        choice = self._intent_backend_choice
+        if isinstance(choice, IntentBackend):
+            return choice
+        name = choice or getattr(settings, 'CHATBOT_INTENT_BACKEND', 'zero_shot')
+
+        def local_zero_shot():
+            if SentenceTransformer is None or pipeline is None:
+                return None
+            return self._load_bart_model_robustly()
+
+        def zero_shot_loader():
+            if inference_client is not None and inference_client.has_zero_shot():
+                return RemoteZeroShotClassifier(inference_client, fallback_loader=local_zero_shot)
+            return local_zero_shot()
+
+        backend = build_intent_backend(
+            name,
+            embedding_model=self.embedding_model,
+            zero_shot_loader=zero_shot_loader,
+            candidate_labels=PREDEFINED_INTENTS,
+            model_path=getattr(settings, 'CHATBOT_INTENT_MODEL_PATH', ''),
+            quantized_model_path=getattr(settings, 'CHATBOT_QUANTIZED_INTENT_MODEL_PATH', ''),
+            handler_intents=list(self.intent_handlers),
+        )
+        if isinstance(backend, ZeroShotIntentBackend):
+            self.intent_classifier = backend.classifier
+        return backend
+
     def _is_bart_model_cached(self, model_name: str = "facebook/bart-large-mnli") -> bool:
         """
         Vérifie si le modèle BART est déjà en cache local.
@@ -426,7 +534,8 @@ class ParcInfoChatbot:
             Le pipeline BART ou None si échec
         """
         import time
-        from transformers import pipeline
+        from django.conf import settings
+        from apps.chatbot.zero_shot import BatchedZeroShotClassifier
         
         model_name = "facebook/bart-large-mnli"
         
@@ -441,12 +550,12 @@ class ParcInfoChatbot:
             try:
                 logger.info(f"Tentative {attempt + 1}/{max_retries} de téléchargement de BART...")
                 
-                # Créer le pipeline (téléchargement automatique si nécessaire)
-                intent_classifier = pipeline(
-                    "zero-shot-classification", 
-                    model=model_name,
-                    device=-1,  # CPU par défaut pour éviter les problèmes GPU
-                    return_all_scores=True
+                # Classifieur NLI par lots (téléchargement automatique si nécessaire)
+                intent_classifier = BatchedZeroShotClassifier(
+                    model_name,
+                    device='cpu',  # CPU par défaut pour éviter les problèmes GPU
+                    max_batch_size=getattr(settings, 'CHATBOT_ZERO_SHOT_BATCH_SIZE', 16),
+                    max_wait_ms=getattr(settings, 'CHATBOT_ZERO_SHOT_MAX_WAIT_MS', 5.0)
                 )
                 
                 # Test rapide pour vérifier que le modèle fonctionne
@@ -490,11 +599,8 @@ class ParcInfoChatbot:
         self._entity_patterns = self._build_entity_patterns()
 
         # Initialize intent examples
-        self._intent_examples = self._load_intent_examples()
-        if self.nlp_available:
-            self._intent_embeddings = self._encode_intent_examples()
-        else:
-            self._intent_embeddings = {}
+        self._intent_examples = self._default_intent_examples()
+        self._intent_index = self._encode_intent_examples() if self.nlp_available else None
 
         # Initialize intent handlers mapping
         self.intent_handlers = {
@@ -1183,9 +1289,9 @@ class ParcInfoChatbot:
         patterns['model_patterns'] = [re.compile(rf"\b({model_regex})\b", re.IGNORECASE)]
         return patterns
 
-    def _load_intent_examples(self) -> Dict[str, List[str]]:
-        """Load intent examples from DB and defaults"""
-        base_examples = {
+    def _default_intent_examples(self) -> Dict[str, List[str]]:
+        """Built-in intent examples (DB examples are added by the intent index)"""
+        return {
             'liste_materiel': [
                 "Liste du matériel informatique",
                 "Voir tout le matériel disponible",
@@ -1238,33 +1344,14 @@ class ParcInfoChatbot:
             ]
         }
 
-        # Load dynamic examples from DB
-        try:
-            for example in IntentExample.objects.all():
-                intent = example.intent
-                if intent in base_examples:
-                    base_examples[intent].append(example.phrase)
-                else:
-                    base_examples[intent] = [example.phrase]
-                    logger.warning(f"Unknown intent in DB: {intent}")
-        except Exception as e:
-            logger.error(f"Error loading intent examples from DB: {e}")
-
-        return base_examples
-
-    def _encode_intent_examples(self) -> Dict[str, Any]:
-        """Encode intent examples for semantic matching"""
+    def _encode_intent_examples(self) -> Optional[IntentEmbeddingIndex]:
+        """Encode intent examples (defaults + IntentExample table) into one stacked index"""
         if not self.nlp_available or not self.embedding_model:
-            return {}
-            
-        try:
-            return {
-                intent: self.embedding_model.encode(examples, normalize_embeddings=True)
-                for intent, examples in self._intent_examples.items()
-            }
-        except Exception as e:
-            logger.error(f"Failed to encode intent examples: {e}")
-            return {}
+            return None
+
+        store = get_intent_embedding_cache(EMBEDDING_MODEL)
+        index = IntentEmbeddingIndex(self.embedding_model, self._intent_examples, store=store)
+        return index if index.build() else None
 
     def _classify_intent(self, query: str) -> Dict[str, Any]:
         """Classification d'intent améliorée avec priorité correcte et intents spécifiques"""
@@ -1272,8 +1359,7 @@ class ParcInfoChatbot:
         query_lower = query.lower()
         
         # PRIORITÉ 0: Phrase boosts explicites pour intents sensibles
-        boost_map = self._build_phrase_boosts()
-        for intent, patterns in boost_map.items():
+        for intent, patterns in self._phrase_boosts.items():
             if intent in ['supplier_ice', 'order_mode_passation', 'order_total_price', 'delivery_overview', 'deliveries_by_month', 'material_types']:
                 if any(p.search(query_lower) for p in patterns):
                     return {
@@ -1738,32 +1824,10 @@ class ParcInfoChatbot:
 
     def _rule_based_intent_classification(self, query: str) -> Dict[str, Any]:
         """Rule-based intent classification with pattern matching"""
-        intent_scores = {intent: 0 for intent in self.intent_map}
         query_lower = query.lower()
 
-        # Score based on patterns
-        for intent, patterns in self._compiled_intent_patterns.items():
-            for pattern in patterns:
-                if pattern.search(query_lower):
-                    intent_scores[intent] += 10
-
-        # Score based on keywords
-        for intent, config in self.intent_map.items():
-            for keyword in config['keywords']:
-                if keyword in query_lower:
-                    intent_scores[intent] += 5
-                else:
-                    # Fuzzy matching for typos
-                    for token in query_lower.split():
-                        if fuzz.ratio(token, keyword) >= 80:
-                            intent_scores[intent] += 3
-                            break
-
-        # Apply phrase boosts
-        for intent, phrases in self._phrase_boosts.items():
-            for phrase in phrases:
-                if phrase.search(query_lower):
-                    intent_scores[intent] += 15
+        # Patterns, mots-clés (exacts et approchés) et phrase boosts en un seul passage
+        intent_scores = self._intent_router.score(query_lower)
 
         # Force high confidence for supplier threshold queries
         if ("fournisseurs" in query_lower and "commandes" in query_lower and 
@@ -1812,21 +1876,13 @@ class ParcInfoChatbot:
 
     def _semantic_intent_match(self, query: str) -> Optional[Tuple[str, float]]:
         """Match intent using semantic similarity"""
-        if not self.nlp_available or not self.embedding_model or not self._intent_embeddings:
+        if not self.nlp_available or not self.embedding_model or not self._intent_index:
             return None
-            
-        try:
-            query_embedding = self.embedding_model.encode([query], normalize_embeddings=True)
-            best_intent, best_score = None, -1
 
-            for intent, embeddings in self._intent_embeddings.items():
-                if util and hasattr(util, 'cos_sim'):
-                    scores = util.cos_sim(query_embedding, embeddings)
-                    max_score = float(scores.max())
-                    if max_score > best_score:
-                        best_intent, best_score = intent, max_score
-
-            return (best_intent, best_score) if best_score >= 0.5 else None
+        try:
+            query_embedding = get_embedding_cache(EMBEDDING_MODEL).encode(self.embedding_model, [query], normalize=True)
+            match = self._intent_index.match(query_embedding)
+            return match if match and match[1] >= 0.5 else None
         except Exception as e:
             logger.warning(f"Semantic intent matching failed: {e}")
             return None
@@ -3984,7 +4040,10 @@ class ParcInfoChatbot:
         try:
             rag_results = self.rag.semantic_search(query, top_k=5)
             if rag_results:
-                chat_result = self.llm_client.chat_with_context(query, rag_results)
+                chat_result, _ = get_semantic_cache().get_or_generate(
+                    self.rag.embed_query(query), rag_results,
+                    lambda: self.llm_client.chat_with_context(query, rag_results),
+                )
                 return chat_result['response']
             return "Je n'ai pas trouvé d'informations pertinentes pour répondre à cette question."
         except Exception as e:
@@ -5671,7 +5730,8 @@ class ParcInfoChatbot:
                 }
             
             # Step 2: Try RAG+LLM with enhanced context
-            if self.use_llm:
+            # Disponibilité en cache (rafraîchie en arrière-plan), fausse tant que le circuit est ouvert
+            if self.llm_client.is_available(wait=False):
                 logger.info("Step 2: Using enhanced RAG+LLM fallback")
                 
                 # Get semantic search results from RAG
@@ -5702,29 +5762,38 @@ class ParcInfoChatbot:
                 Context from database:
                 """
                 
-                # Generate response with strict instructions
-                if isinstance(results, list):
-                    context_for_llm = []
-                    for result in results:
-                        if isinstance(result, dict):
-                            context_for_llm.append({
-                                'content': str(result.get('content', '')),
-                                'score': result.get('score', 0),
-                                'metadata': result.get('metadata', {})
-                            })
-                        else:
-                            context_for_llm.append({
-                                'content': str(result),
-                                'score': 0.5,
-                                'metadata': {}
-                            })
-                    response = self.llm_client.generate_response(query, context=context_for_llm)
-                else:
-                    context_for_llm = [{'content': str(results), 'score': 0.5, 'metadata': {}}]
-                    response = self.llm_client.generate_response(query, context=context_for_llm)
-                
-                # Validate response for hallucinations
-                validated_response = self._validate_response_data(response, query)
+                def generate():
+                    # Generate response with strict instructions
+                    if isinstance(results, list):
+                        context_for_llm = []
+                        for result in results:
+                            if isinstance(result, dict):
+                                context_for_llm.append({
+                                    'content': str(result.get('content', '')),
+                                    'score': result.get('score', 0),
+                                    'metadata': result.get('metadata', {})
+                                })
+                            else:
+                                context_for_llm.append({
+                                    'content': str(result),
+                                    'score': 0.5,
+                                    'metadata': {}
+                                })
+                        response = self.llm_client.generate_response(query, context=context_for_llm)
+                    else:
+                        context_for_llm = [{'content': str(results), 'score': 0.5, 'metadata': {}}]
+                        response = self.llm_client.generate_response(query, context=context_for_llm)
+                    
+                    # Validate response for hallucinations
+                    validated_response = self._validate_response_data(response, query)
+                    return {'response': validated_response, 'generated': response not in FAILED_RESPONSES}
+
+                # Reformulation d'une question déjà traitée, sur les mêmes documents : pas d'appel au LLM
+                generated, _ = get_semantic_cache().get_or_generate(
+                    self.rag.embed_query(query), results if isinstance(results, list) else [], generate,
+                    scope='fallback',
+                )
+                validated_response = generated['response']
                 
                 # Add source attribution
                 if "Je n'ai pas trouvé" not in validated_response:
@@ -6087,9 +6156,23 @@ Si une réponse ne vous convient pas :
         """Get comprehensive system status"""
         return {
             'rag_documents': self.rag.get_rag_count(),
-            'llm_available': self.use_llm,
+            'llm_available': self.llm_client.is_available(wait=False),
+            'llm_circuit': self.llm_client.endpoint.breaker.state,
             'ollama_models': self.llm_client.list_models() if self.use_llm else [],
             'embedding_model': getattr(self, 'embedding_model_name', 'sentence-transformers'),
+            'components': self.readiness.snapshot(),
+            'warmup_complete': self.readiness.is_settled(),
+            'intent_router': self._intent_router.get_stats(),
+            'intent_backend': self.intent_backend.name if self.intent_backend else 'rules',
+            'zero_shot_batching': (self.intent_classifier.get_stats()
+                                   if hasattr(self.intent_classifier, 'get_stats') else None),
+            'response_cache': get_response_cache().get_stats(),
+            'embedding_cache': get_embedding_cache(EMBEDDING_MODEL).get_stats(),
+            'content_embeddings': get_content_embeddings(EMBEDDING_MODEL).get_stats(),
+            'semantic_cache': get_semantic_cache().get_stats(),
+            'known_entities': get_known_entities().get_stats(),
+            'metrics': metrics.get_counters(),
+            'latencies': metrics.get_latencies(),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -6103,23 +6186,25 @@ Si une réponse ne vous convient pas :
             # Extract potential supplier names (look for capitalized words or phrases)
             supplier_names = re.findall(r'\b[A-Z][A-Z0-9\s&-]+\b(?=\s*\()', response) + re.findall(r'\b[A-Z][A-Z0-9\s&-]+\b(?=\s*:\s*\d)', response)
             
+            # Valeurs connues en mémoire (une recherche par entité, pas de requête par entité)
+            known = get_known_entities()
+            
             # Validate codes against actual DB
             for code in codes:
-                if not self._code_exists_in_db(code):
+                if not known.contains('materials', code):
                     logger.warning(f"Potential hallucinated code detected: {code}")
                     response = response.replace(code, "[CODE_VÉRIFIÉ_REQUIS]")
             
             # Validate supplier names against DB
-            db_suppliers = [f.nom for f in Fournisseur.objects.all()]
             for supplier in supplier_names:
                 supplier = supplier.strip()
-                if supplier and supplier not in db_suppliers:
+                if supplier and not known.contains('suppliers', supplier):
                     logger.warning(f"Potential hallucinated supplier detected: {supplier}")
                     response = response.replace(supplier, "[FOURNISSEUR_NON_VÉRIFIÉ]")
             
             # Validate ICE numbers (simplified check for format only if DB check not feasible)
             for ice in ice_numbers:
-                if not Fournisseur.objects.filter(ice=ice).exists():
+                if not known.contains('ices', ice):
                     logger.warning(f"Potential hallucinated ICE detected: {ice}")
                     response = response.replace(ice, "[ICE_VÉRIFIÉ_REQUIS]")
             
@@ -6141,15 +6226,14 @@ Si une réponse ne vous convient pas :
     def _code_exists_in_db(self, code: str) -> bool:
         """Check if a code exists in the database"""
         try:
-            return (MaterielInformatique.objects.filter(code_inventaire=code).exists() or
-                    MaterielBureau.objects.filter(code_inventaire=code).exists())
+            return get_known_entities().contains('materials', code)
         except Exception:
             return False
     
     def _ice_exists_in_db(self, ice: str) -> bool:
         """Check if an ICE number exists in the database"""
         try:
-            return Fournisseur.objects.filter(ice=ice).exists()
+            return get_known_entities().contains('ices', ice)
         except Exception:
             return False
     
@@ -7265,31 +7349,21 @@ Si une réponse ne vous convient pas :
         return data
 
     def _classify_intent(self, query: str) -> Dict[str, Any]:
-        """Classifie l'intent d'une requête en utilisant le modèle zero-shot avec fallback intelligent."""
-        if not self.nlp_available or not self.intent_classifier:
+        """Classifie l'intent d'une requête avec le backend configuré et fallback intelligent."""
+        if self.intent_backend is None:
             # Fallback intelligent vers la classification basée sur les règles
-            logger.info("BART non disponible, utilisation du fallback basé sur les règles")
+            logger.info("Backend d'intents non disponible, utilisation du fallback basé sur les règles")
             return self._rule_based_intent_classification(query)
         
         try:
-            # Classification zero-shot avec les intents prédéfinis
-            result = self.intent_classifier(query, candidate_labels=PREDEFINED_INTENTS)
-            
-            # Extraire le meilleur intent et sa confiance
-            best_intent = result["labels"][0]
-            confidence = result["scores"][0]
-            
-            # Log pour audit
-            logger.info(f"Intent classification: '{query}' -> {best_intent} (confidence: {confidence:.3f})")
-            
-            return {
-                "intent": best_intent,
-                "confidence": confidence,
-                "method": "zero_shot_nlp",
-                "all_scores": dict(zip(result["labels"], result["scores"]))
-            }
+            result = self.intent_backend.classify(query)
+            if result is None:
+                return self._rule_based_intent_classification(query)
+            result.setdefault("entities", self._extract_entities(query))
+            result.setdefault("original_query", query)
+            return result
         except Exception as e:
-            logger.warning(f"Intent classification BART failed: {e}, using rule-based fallback")
+            logger.warning(f"Intent classification ({self.intent_backend.name}) failed: {e}, using rule-based fallback")
             # Fallback vers la classification basée sur les règles en cas d'erreur
             return self._rule_based_intent_classification(query)
 
@@ -13992,14 +14066,16 @@ ParcInfo est un système de gestion de parc informatique et bureautique complet
         """Trouve des matériels similaires en utilisant les embeddings"""
         try:
             # Encoder le code de référence
-            reference_embedding = self.embedding_model.encode([reference_code])
+            embedding_cache = get_embedding_cache(EMBEDDING_MODEL)
+            reference_embedding = embedding_cache.encode(self.embedding_model, [reference_code])
             
             # Récupérer tous les matériels
             materials = list(MaterielInformatique.objects.all())
             
             # Encoder les descriptions des matériels
             material_descriptions = [f"{m.code_inventaire} {m.numero_serie} {m.lieu_stockage}" for m in materials]
-            material_embeddings = self.embedding_model.encode(material_descriptions)
+            material_embeddings = get_content_embeddings(EMBEDDING_MODEL).encode(self.embedding_model,
+                                                                                 material_descriptions)
             
             # Calculer les similarités
             similarities = util.pytorch_cos_sim(reference_embedding, material_embeddings)[0]
@@ -14041,14 +14117,15 @@ ParcInfo est un système de gestion de parc informatique et bureautique complet
         """Trouve des fournisseurs similaires en utilisant les embeddings"""
         try:
             # Encoder le nom de référence
-            reference_embedding = self.embedding_model.encode([reference_name])
+            embedding_cache = get_embedding_cache(EMBEDDING_MODEL)
+            reference_embedding = embedding_cache.encode(self.embedding_model, [reference_name])
             
             # Récupérer tous les fournisseurs
             suppliers = list(Fournisseur.objects.all())
             
             # Encoder les informations des fournisseurs
             supplier_info = [f"{s.nom} {s.adresse} {s.ice}" for s in suppliers]
-            supplier_embeddings = self.embedding_model.encode(supplier_info)
+            supplier_embeddings = get_content_embeddings(EMBEDDING_MODEL).encode(self.embedding_model, supplier_info)
             
             # Calculer les similarités
             similarities = util.pytorch_cos_sim(reference_embedding, supplier_embeddings)[0]
@@ -15103,10 +15180,20 @@ ParcInfo est un système de gestion de parc informatique et bureautique complet
 
 
 def get_chatbot():
-    """Get singleton chatbot instance"""
+    """Get singleton chatbot instance (heavy components keep loading in background)"""
     global _chatbot_instance
     if _chatbot_instance is None:
-        _chatbot_instance = ParcInfoChatbot()
+        with _chatbot_lock:
+            if _chatbot_instance is None:
+                _chatbot_instance = ParcInfoChatbot(warmup='background')
     return _chatbot_instance
 
 
+def warm_up_chatbot(timeout: Optional[float] = None) -> ParcInfoChatbot:
+    """Crée le singleton et attend la fin du chargement (à appeler au boot d'un worker)"""
+    chatbot = get_chatbot()
+    if not chatbot.readiness.wait(timeout):
+        logger.warning(f"Chatbot warm-up not finished after {timeout}s, continuing in background")
+    return chatbot
+
+
@@ -0,0 +1,228 @@
+"""
+Cache à deux niveaux des embeddings de requêtes
+1. LRU en mémoire du processus, borné en octets
+2. Redis, partagé entre workers : les vecteurs y sont stockés en float32 brut
+   (4 octets par dimension) plutôt qu'en listes JSON
+
+Seuls les textes absents des deux niveaux sont encodés, en un seul appel au modèle.
+"""
+
+import hashlib
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from apps.chatbot import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'parcinfo:embedding:'
+REDIS_RETRY_SECONDS = 30.0
+
+
+def normalize_text(text: str) -> str:
+    """Forme canonique d'un texte : les variantes d'espacement partagent la même entrée"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+class LRUByteCache:
+    """Dictionnaire LRU dont la taille est bornée par le volume des vecteurs stockés"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + sys.getsizeof(key)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        size = self._size(key, vector)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= self._size(key, previous)
+            self._entries[key] = vector
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self.current_bytes -= self._size(old_key, old_vector)
+                metrics.increment('embedding_cache.evictions')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EmbeddingCache:
+    """Embeddings par (modèle, normalisation, texte), en mémoire puis dans Redis"""
+
+    def __init__(self, model_name: str, max_bytes: int = 64 * 1024 * 1024, redis_ttl: int = 86400,
+                 redis_host: str = 'localhost', redis_port: int = 6379, redis_db: int = 0):
+        self.model_name = model_name
+        self.lru = LRUByteCache(max_bytes)
+        self.redis_ttl = redis_ttl
+        self._redis_config = {'host': redis_host, 'port': redis_port, 'db': redis_db}
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self._redis_lock = threading.Lock()
+        self._slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+
+    def _key(self, text: str, normalize: bool) -> str:
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return f"{KEY_PREFIX}{self._slug}:{'n' if normalize else 'r'}:{digest}"
+
+    def _redis_client(self):
+        """Client Redis binaire (decode_responses=False), reconnecté au plus toutes les 30 s"""
+        if self._redis is not None or self.redis_ttl <= 0 or time.monotonic() < self._redis_retry_at:
+            return self._redis
+        with self._redis_lock:
+            if self._redis is None and time.monotonic() >= self._redis_retry_at:
+                try:
+                    import redis
+                    client = redis.Redis(socket_timeout=0.5, socket_connect_timeout=0.5, **self._redis_config)
+                    client.ping()
+                    self._redis = client
+                except ImportError:
+                    self._redis_retry_at = float('inf')
+                except Exception as e:
+                    logger.warning(f"Embedding cache: Redis unavailable ({e}), using in-process cache only")
+                    self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.warning(f"Embedding cache: Redis error ({error}), retrying in {REDIS_RETRY_SECONDS:.0f}s")
+        metrics.increment('embedding_cache.redis_errors')
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _redis_get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        client = self._redis_client()
+        if client is None or not keys:
+            return [None] * len(keys)
+        try:
+            values = client.mget(keys)
+        except Exception as e:
+            self._redis_failed(e)
+            return [None] * len(keys)
+        vectors = []
+        for value in values:
+            if value is None or len(value) % 4:
+                vectors.append(None)
+            else:
+                vectors.append(np.frombuffer(value, dtype=np.float32))
+        return vectors
+
+    def _redis_set_many(self, items):
+        client = self._redis_client()
+        if client is None or not items:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, vector in items:
+                pipe.setex(key, self.redis_ttl, vector.tobytes())
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def encode(self, model, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """Matrice (len(texts), dim) float32, comme model.encode(texts, normalize_embeddings=normalize)"""
+        texts = [normalize_text(text) for text in texts]
+        keys = [self._key(text, normalize) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self.lru.get(key) for key in keys]
+        lru_hits = sum(vector is not None for vector in vectors)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        redis_hits = 0
+        if missing:
+            for i, vector in zip(missing, self._redis_get_many([keys[i] for i in missing])):
+                if vector is not None:
+                    vectors[i] = vector
+                    self.lru.put(keys[i], vector)
+                    redis_hits += 1
+
+        # Les doublons d'un même appel ne sont encodés qu'une fois
+        to_encode = list(dict.fromkeys(texts[i] for i, vector in enumerate(vectors) if vector is None))
+        if to_encode:
+            encoded = np.asarray(model.encode(to_encode, normalize_embeddings=normalize), dtype=np.float32)
+            by_text = {}
+            for text, vector in zip(to_encode, encoded):
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                by_text[text] = vector
+                self.lru.put(self._key(text, normalize), vector)
+            self._redis_set_many([(self._key(text, normalize), vector) for text, vector in by_text.items()])
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    vectors[i] = by_text[texts[i]]
+
+        metrics.increment('embedding_cache.lru_hits', lru_hits)
+        metrics.increment('embedding_cache.redis_hits', redis_hits)
+        metrics.increment('embedding_cache.misses', len(texts) - lru_hits - redis_hits)
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def encode_one(self, model, text: str, normalize: bool = False) -> np.ndarray:
+        return self.encode(model, [text], normalize)[0]
+
+    def get_stats(self):
+        counters = metrics.get_counters()
+        lru_hits = counters.get('embedding_cache.lru_hits', 0)
+        redis_hits = counters.get('embedding_cache.redis_hits', 0)
+        total = lru_hits + redis_hits + counters.get('embedding_cache.misses', 0)
+        return {
+            'model': self.model_name,
+            'lru_entries': len(self.lru),
+            'lru_bytes': self.lru.current_bytes,
+            'lru_max_bytes': self.lru.max_bytes,
+            'redis': self._redis is not None,
+            'lru_hits': lru_hits,
+            'redis_hits': redis_hits,
+            'misses': counters.get('embedding_cache.misses', 0),
+            'evictions': counters.get('embedding_cache.evictions', 0),
+            'hit_rate': round((lru_hits + redis_hits) / total, 3) if total else 0.0,
+        }
+
+
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2') -> EmbeddingCache:
+    """Cache partagé propre à chaque modèle : les vecteurs de deux modèles ne se mélangent pas"""
+    with _embedding_cache_lock:
+        cache = _embedding_caches.get(model_name)
+        if cache is None:
+            from django.conf import settings
+            cache = _embedding_caches[model_name] = EmbeddingCache(
+                model_name,
+                max_bytes=int(getattr(settings, 'CHATBOT_EMBEDDING_CACHE_MAX_MB', 64)) * 1024 * 1024,
+                redis_ttl=int(getattr(settings, 'CHATBOT_EMBEDDING_CACHE_TTL', 86400)),
+                redis_host=getattr(settings, 'CHATBOT_REDIS_HOST', 'localhost'),
+                redis_port=getattr(settings, 'CHATBOT_REDIS_PORT', 6379),
+                redis_db=getattr(settings, 'CHATBOT_REDIS_DB', 0),
+            )
+    return cache
@@ -0,0 +1,150 @@
+"""
+Cache disque des embeddings d'exemples, partagé entre processus
+Les vecteurs sont stockés dans un fichier .npy ouvert en mmap : les workers
+partagent les mêmes pages via le cache du système et n'encodent au démarrage
+que les phrases absentes du fichier.
+
+Un manifeste JSON décrit le fichier courant :
+    {"model": ..., "dim": ..., "content_hash": ..., "file": ..., "rows": [sha1(phrase), ...]}
+Le fichier .npy est nommé d'après content_hash et écrit avant le manifeste, si
+bien qu'un lecteur voit toujours un couple manifeste/fichier cohérent.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def phrase_hash(phrase: str) -> str:
+    return hashlib.sha1(phrase.encode('utf-8')).hexdigest()
+
+
+class EmbeddingFileCache:
+    """Embeddings normalisés indexés par hash de phrase, pour un modèle donné"""
+
+    def __init__(self, directory: str, model_name: str, namespace: str = 'intent_examples'):
+        self.directory = directory
+        self.model_name = model_name
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self._base = os.path.join(directory, f"{namespace}-{slug}")
+        self._manifest_path = f"{self._base}.json"
+        self._manifest = None
+        self._vectors = None
+        self._rows = {}
+
+    def _load(self) -> bool:
+        """Ouvre en mmap le fichier décrit par le manifeste courant"""
+        try:
+            with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('model') != self.model_name:
+                return False
+            if self._manifest and manifest.get('content_hash') == self._manifest.get('content_hash'):
+                return True
+            vectors = np.load(os.path.join(self.directory, manifest['file']), mmap_mode='r')
+            if vectors.shape[0] != len(manifest['rows']):
+                logger.warning(f"Embedding cache {self._manifest_path} is inconsistent, ignoring it")
+                return False
+        except (OSError, ValueError, KeyError):
+            return False
+        self._manifest = manifest
+        self._vectors = vectors
+        self._rows = {h: i for i, h in enumerate(manifest['rows'])}
+        return True
+
+    def _write(self, hashes: List[str], vectors: np.ndarray):
+        """Écrit un nouveau fichier puis bascule le manifeste de façon atomique"""
+        os.makedirs(self.directory, exist_ok=True)
+        content_hash = hashlib.sha256('\n'.join(hashes).encode('ascii')).hexdigest()
+        filename = f"{os.path.basename(self._base)}-{content_hash[:16]}.npy"
+        lock = open(f"{self._base}.lock", 'w')
+        try:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            path = os.path.join(self.directory, filename)
+            if not os.path.exists(path):
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.npy')
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+                os.replace(tmp, path)
+            previous = self._manifest.get('file') if self._manifest else None
+            manifest = {
+                'model': self.model_name,
+                'dim': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                'content_hash': content_hash,
+                'file': filename,
+                'rows': hashes,
+            }
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path)
+            # Les processus qui ont encore l'ancien fichier en mmap gardent leur copie
+            if previous and previous != filename:
+                try:
+                    os.remove(os.path.join(self.directory, previous))
+                except OSError:
+                    pass
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def get_or_encode(self, phrases: List[str], encode_fn: Callable[[List[str]], np.ndarray],
+                      persist: bool = False) -> np.ndarray:
+        """Embeddings des phrases, dans l'ordre ; seules les phrases inconnues sont encodées
+
+        Avec persist=True, le fichier est réécrit pour contenir exactement ces phrases
+        dans cet ordre : au démarrage suivant, le mmap est renvoyé tel quel.
+        """
+        self._load()
+        hashes = [phrase_hash(p) for p in phrases]
+        if self._manifest and hashes == self._manifest['rows']:
+            logger.info(f"Embedding cache hit: {len(hashes)} vectors mapped from {self._manifest['file']}")
+            return self._vectors
+
+        missing = {}
+        for phrase, h in zip(phrases, hashes):
+            if h not in self._rows and h not in missing:
+                missing[h] = phrase
+        encoded = {}
+        if missing:
+            vectors = encode_fn(list(missing.values()))
+            encoded = dict(zip(missing.keys(), vectors))
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        result = np.stack([
+            encoded[h] if h in encoded else self._vectors[self._rows[h]] for h in hashes
+        ]).astype(np.float32, copy=False)
+        logger.info(f"Embedding cache: {len(hashes) - len(missing)} reused, {len(missing)} encoded")
+
+        if persist:
+            try:
+                self._write(hashes, result)
+                if self._load():
+                    return self._vectors
+            except OSError as e:
+                logger.warning(f"Could not write embedding cache {self._manifest_path}: {e}")
+        return result
+
+
+def get_intent_embedding_cache(model_name: str) -> Optional[EmbeddingFileCache]:
+    """Cache disque des exemples d'intents, ou None si CHATBOT_CACHE_DIR est vide"""
+    from django.conf import settings
+    directory = getattr(settings, 'CHATBOT_CACHE_DIR', '')
+    if not directory:
+        return None
+    return EmbeddingFileCache(directory, model_name)
@@ -13,8 +13,24 @@ from django.db import connection
 from django.conf import settings
 import numpy as np
 
+from apps.chatbot.known_entities import get_known_entities
+
 logger = logging.getLogger(__name__)
 
+# Clés de _extract_entities_to_verify -> type d'entité de known_entities (et clé du résultat)
+ENTITY_KINDS = {
+    "suppliers": "suppliers",
+    "codes": "materials",
+    "orders": "orders",
+    "users": "users",
+}
+
+
+def _table(app_label: str, model_name: str) -> str:
+    """Table réelle d'un modèle, citée pour le SQL"""
+    from django.apps import apps
+    return connection.ops.quote_name(apps.get_model(app_label, model_name)._meta.db_table)
+
 class HallucinationFilter:
     """Filtre anti-hallucinations basé sur la vérification de la base de données"""
     
@@ -179,10 +195,26 @@ class HallucinationFilter:
         return entities
     
     def _verify_entities_in_database(self, entities: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
-        """Vérifie les entités extraites dans la base de données"""
+        """Vérifie les entités extraites dans la base de données
+
+        Contre l'index en mémoire des valeurs connues (known_entities) ; s'il ne peut
+        pas être chargé, une requête par type d'entité.
+        """
         verification_results = {}
         
         try:
+            known = get_known_entities()
+        except Exception as e:
+            logger.warning(f"Index des entités connues indisponible, vérification en base: {e}")
+            known = None
+        
+        try:
+            if known is not None:
+                for entity_type, kind in ENTITY_KINDS.items():
+                    if entities.get(entity_type):
+                        verification_results[kind] = self._verify_known(known, kind, entities[entity_type])
+                return verification_results
+            
             with self.connection.cursor() as cursor:
                 # Vérifier les fournisseurs
                 if entities["suppliers"]:
@@ -206,174 +238,79 @@ class HallucinationFilter:
         
         return verification_results
     
-    def _verify_suppliers(self, cursor, supplier_names: List[str]) -> Dict[str, Any]:
-        """Vérifie les fournisseurs dans la base de données"""
+    @staticmethod
+    def _verify_known(known, kind: str, values: List[str]) -> Dict[str, Any]:
+        """Vérifie des entités d'un type contre l'index en mémoire"""
         results = {}
-        
-        for supplier in supplier_names:
-            try:
-                # Rechercher par nom
-                cursor.execute("""
-                    SELECT id, nom, ice, ville 
-                    FROM fournisseurs 
-                    WHERE nom ILIKE %s OR nom ILIKE %s
-                """, (f"%{supplier}%", supplier))
-                
-                matches = cursor.fetchall()
-                
-                if matches:
-                    results[supplier] = {
-                        "verified": True,
-                        "matches": [{"id": m[0], "nom": m[1], "ice": m[2], "ville": m[3]} for m in matches],
-                        "source": "database"
-                    }
-                else:
-                    results[supplier] = {
-                        "verified": False,
-                        "matches": [],
-                        "source": "not_found"
-                    }
-                    
-            except Exception as e:
-                results[supplier] = {
-                    "verified": False,
-                    "error": str(e),
-                    "source": "error"
-                }
-        
+        for value in values:
+            matches = known.lookup(kind, value)
+            verified = bool(matches) or (kind == 'suppliers' and known.is_supplier(value))
+            results[value] = {
+                "verified": verified,
+                "matches": [{"model": label, "id": pk} for label, pk in matches],
+                "source": "known_entities" if verified else "not_found"
+            }
         return results
     
+    @staticmethod
+    def _rows_by_value(values: List[str], rows, to_match) -> Dict[str, Any]:
+        """Résultats par entité à partir des lignes (valeur cherchée, colonnes...) d'une requête groupée"""
+        found = {}
+        for row in rows:
+            found.setdefault(row[0], []).append(to_match(row[1:]))
+        return {
+            value: {"verified": True, "matches": found[value], "source": "database"} if value in found
+            else {"verified": False, "matches": [], "source": "not_found"}
+            for value in values
+        }
+    
+    def _verify_suppliers(self, cursor, supplier_names: List[str]) -> Dict[str, Any]:
+        """Vérifie les fournisseurs dans la base de données (nom contenant l'entité)"""
+        cursor.execute(f"""
+            SELECT s.value, f.id, f.nom, f.ice
+            FROM unnest(%s::text[]) AS s(value)
+            JOIN {_table('fournisseurs', 'Fournisseur')} f ON f.nom ILIKE '%%' || s.value || '%%'
+        """, [supplier_names])
+        return self._rows_by_value(supplier_names, cursor.fetchall(),
+                                   lambda m: {"id": m[0], "nom": m[1], "ice": m[2]})
+    
     def _verify_materials(self, cursor, material_codes: List[str]) -> Dict[str, Any]:
         """Vérifie les codes de matériel dans la base de données"""
-        results = {}
-        
-        for code in material_codes:
-            try:
-                # Rechercher dans materiel_informatique
-                cursor.execute("""
-                    SELECT id, code_inventaire, designation, marque, modele
-                    FROM materiel_informatique 
-                    WHERE code_inventaire = %s
-                """, (code,))
-                
-                matches_it = cursor.fetchall()
-                
-                # Rechercher dans materiel_bureautique
-                cursor.execute("""
-                    SELECT id, code_inventaire, designation, marque, modele
-                    FROM materiel_bureautique 
-                    WHERE code_inventaire = %s
-                """, (code,))
-                
-                matches_bureau = cursor.fetchall()
-                
-                all_matches = matches_it + matches_bureau
-                
-                if all_matches:
-                    results[code] = {
-                        "verified": True,
-                        "matches": [{"id": m[0], "code": m[1], "designation": m[2], "marque": m[3], "modele": m[4]} for m in all_matches],
-                        "source": "database"
-                    }
-                else:
-                    results[code] = {
-                        "verified": False,
-                        "matches": [],
-                        "source": "not_found"
-                    }
-                    
-            except Exception as e:
-                results[code] = {
-                    "verified": False,
-                    "error": str(e),
-                    "source": "error"
-                }
-        
-        return results
+        cursor.execute(f"""
+            SELECT code_inventaire, id, code_inventaire, 'informatique'
+            FROM {_table('materiel_informatique', 'MaterielInformatique')}
+            WHERE code_inventaire = ANY(%s)
+            UNION ALL
+            SELECT code_inventaire, id, code_inventaire, 'bureautique'
+            FROM {_table('materiel_bureautique', 'MaterielBureau')}
+            WHERE code_inventaire = ANY(%s)
+        """, [material_codes, material_codes])
+        return self._rows_by_value(material_codes, cursor.fetchall(),
+                                   lambda m: {"id": m[0], "code": m[1], "type": m[2]})
     
     def _verify_orders(self, cursor, order_numbers: List[str]) -> Dict[str, Any]:
         """Vérifie les numéros de commande dans la base de données"""
-        results = {}
-        
-        for order in order_numbers:
-            try:
-                # Rechercher dans commande_informatique
-                cursor.execute("""
-                    SELECT id, numero_commande, date_commande, montant, fournisseur_id
-                    FROM commande_informatique 
-                    WHERE numero_commande = %s
-                """, (order,))
-                
-                matches_it = cursor.fetchall()
-                
-                # Rechercher dans commande_bureau
-                cursor.execute("""
-                    SELECT id, numero_commande, date_commande, montant, fournisseur_id
-                    FROM commande_bureau 
-                    WHERE numero_commande = %s
-                """, (order,))
-                
-                matches_bureau = cursor.fetchall()
-                
-                all_matches = matches_it + matches_bureau
-                
-                if all_matches:
-                    results[order] = {
-                        "verified": True,
-                        "matches": [{"id": m[0], "numero": m[1], "date": m[2], "montant": m[3], "fournisseur_id": m[4]} for m in all_matches],
-                        "source": "database"
-                    }
-                else:
-                    results[order] = {
-                        "verified": False,
-                        "matches": [],
-                        "source": "not_found"
-                    }
-                    
-            except Exception as e:
-                results[order] = {
-                    "verified": False,
-                    "error": str(e),
-                    "source": "error"
-                }
-        
-        return results
+        cursor.execute(f"""
+            SELECT numero_commande, id, numero_commande, date_commande, fournisseur_id
+            FROM {_table('commande_informatique', 'Commande')}
+            WHERE numero_commande = ANY(%s)
+            UNION ALL
+            SELECT numero_commande, id, numero_commande, date_commande, fournisseur_id
+            FROM {_table('commande_bureau', 'CommandeBureau')}
+            WHERE numero_commande = ANY(%s)
+        """, [order_numbers, order_numbers])
+        return self._rows_by_value(order_numbers, cursor.fetchall(),
+                                   lambda m: {"id": m[0], "numero": m[1], "date": m[2], "fournisseur_id": m[3]})
     
     def _verify_users(self, cursor, usernames: List[str]) -> Dict[str, Any]:
         """Vérifie les noms d'utilisateur dans la base de données"""
-        results = {}
-        
-        for username in usernames:
-            try:
-                cursor.execute("""
-                    SELECT id, username, email, role, is_active
-                    FROM users_customuser 
-                    WHERE username = %s
-                """, (username,))
-                
-                matches = cursor.fetchall()
-                
-                if matches:
-                    results[username] = {
-                        "verified": True,
-                        "matches": [{"id": m[0], "username": m[1], "email": m[2], "role": m[3], "active": m[4]} for m in matches],
-                        "source": "database"
-                    }
-                else:
-                    results[username] = {
-                        "verified": False,
-                        "matches": [],
-                        "source": "not_found"
-                    }
-                    
-            except Exception as e:
-                results[username] = {
-                    "verified": False,
-                    "error": str(e),
-                    "source": "error"
-                }
-        
-        return results
+        cursor.execute(f"""
+            SELECT username, id, username, email, is_active
+            FROM {_table('users', 'CustomUser')}
+            WHERE username = ANY(%s)
+        """, [usernames])
+        return self._rows_by_value(usernames, cursor.fetchall(),
+                                   lambda m: {"id": m[0], "username": m[1], "email": m[2], "active": m[3]})
     
     def _analyze_inconsistencies(self, response_text: str, verification_results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Analyse les incohérences dans la réponse"""
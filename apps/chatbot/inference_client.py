@@ -0,0 +1,174 @@
+"""
+Client léger du serveur d'inférence local (voir inference_server.py)
+Expose des objets compatibles avec SentenceTransformer.encode et avec le
+pipeline zero-shot de transformers, pour que les workers n'aient pas à
+charger leur propre copie des modèles.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import requests
+
+from apps.chatbot.inference_server import decode_array
+
+logger = logging.getLogger(__name__)
+
+# Après un échec, délai pendant lequel le modèle local sert seul avant de réessayer le serveur
+REMOTE_RETRY_SECONDS = 60.0
+
+
+class InferenceClient:
+    """Accès HTTP au serveur d'inférence avec sonde de disponibilité mise en cache"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0, health_ttl: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.health_ttl = health_ttl
+        self._session = requests.Session()
+        self._health: Optional[Dict[str, Any]] = None
+        self._health_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def health(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Retourne l'état du serveur, ou None s'il est injoignable"""
+        with self._lock:
+            if not force and time.monotonic() - self._health_checked_at < self.health_ttl:
+                return self._health
+            try:
+                response = self._session.get(f"{self.base_url}/health", timeout=2)
+                self._health = response.json() if response.status_code == 200 else None
+            except (requests.RequestException, ValueError):
+                self._health = None
+            self._health_checked_at = time.monotonic()
+            return self._health
+
+    def is_available(self) -> bool:
+        health = self.health()
+        return bool(health and health.get('status') == 'ok')
+
+    def has_zero_shot(self) -> bool:
+        health = self.health()
+        return bool(health and health.get('models', {}).get('zero_shot'))
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = self._session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def encode(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        return decode_array(self._post('/encode', {'texts': texts, 'normalize': normalize}))
+
+    def zero_shot(self, sequences: List[str], candidate_labels: List[str]) -> List[Dict[str, Any]]:
+        return self._post('/zero_shot', {'sequences': sequences, 'candidate_labels': candidate_labels})['results']
+
+
+class RemoteEmbeddingModel:
+    """Remplaçant de SentenceTransformer s'appuyant sur le serveur d'inférence
+
+    Si le serveur devient injoignable, le modèle local est chargé via
+    fallback_loader et sert seul pendant REMOTE_RETRY_SECONDS, après quoi le
+    serveur est de nouveau essayé.
+    """
+
+    def __init__(self, client: InferenceClient, fallback_loader: Optional[Callable[[], Any]] = None):
+        self.client = client
+        self.fallback_loader = fallback_loader
+        self._local_model = None
+        self._local_lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def _local(self):
+        self._retry_at = time.monotonic() + REMOTE_RETRY_SECONDS
+        if self._local_model is None and self.fallback_loader is not None:
+            with self._local_lock:
+                if self._local_model is None:
+                    logger.warning("Inference server unreachable, loading in-process embedding model")
+                    self._local_model = self.fallback_loader()
+        return self._local_model
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = None,
+               convert_to_numpy: bool = True, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs):
+        if self._local_model is not None and time.monotonic() < self._retry_at:
+            return self._local_model.encode(sentences, batch_size=batch_size, convert_to_numpy=convert_to_numpy,
+                                            convert_to_tensor=convert_to_tensor,
+                                            normalize_embeddings=normalize_embeddings, **kwargs)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        try:
+            vectors = self.client.encode(texts, normalize=normalize_embeddings)
+        except requests.RequestException:
+            local = self._local()
+            if local is None:
+                raise
+            return local.encode(sentences, batch_size=batch_size, convert_to_numpy=convert_to_numpy,
+                                convert_to_tensor=convert_to_tensor,
+                                normalize_embeddings=normalize_embeddings, **kwargs)
+        if convert_to_tensor:
+            import torch
+            vectors = torch.from_numpy(vectors.copy())
+        return vectors[0] if single else vectors
+
+
+class RemoteZeroShotClassifier:
+    """Appelable comme le pipeline 'zero-shot-classification' de transformers
+
+    Comme RemoteEmbeddingModel : si le serveur devient injoignable, le pipeline
+    local est chargé via fallback_loader et sert seul pendant REMOTE_RETRY_SECONDS.
+    """
+
+    def __init__(self, client: InferenceClient, fallback_loader: Optional[Callable[[], Any]] = None):
+        self.client = client
+        self.fallback_loader = fallback_loader
+        self._local_pipeline = None
+        self._local_lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def _local(self):
+        self._retry_at = time.monotonic() + REMOTE_RETRY_SECONDS
+        if self._local_pipeline is None and self.fallback_loader is not None:
+            with self._local_lock:
+                if self._local_pipeline is None:
+                    logger.warning("Inference server unreachable, loading in-process zero-shot pipeline")
+                    self._local_pipeline = self.fallback_loader()
+        return self._local_pipeline
+
+    def __call__(self, sequences: Union[str, List[str]], candidate_labels: List[str], **kwargs):
+        if self._local_pipeline is not None and time.monotonic() < self._retry_at:
+            return self._local_pipeline(sequences, candidate_labels=candidate_labels, **kwargs)
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        try:
+            results = self.client.zero_shot(texts, list(candidate_labels))
+        except requests.RequestException:
+            local = self._local()
+            if local is None:
+                raise
+            return local(sequences, candidate_labels=candidate_labels, **kwargs)
+        for seq, result in zip(texts, results):
+            result['sequence'] = seq
+        return results[0] if single else results
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """Client partagé, ou None si CHATBOT_INFERENCE_URL n'est pas configuré"""
+    global _client
+    try:
+        from django.conf import settings
+        base_url = getattr(settings, 'CHATBOT_INFERENCE_URL', '')
+    except Exception:
+        base_url = ''
+    if not base_url:
+        return None
+    with _client_lock:
+        if _client is None or _client.base_url != base_url.rstrip('/'):
+            _client = InferenceClient(base_url)
+    return _client
@@ -0,0 +1,165 @@
+"""
+Serveur d'inférence local du chatbot ParcInfo
+Héberge une seule copie des modèles NLP (SentenceTransformer, BART zero-shot)
+pour l'ensemble des workers gunicorn et regroupe leurs appels en micro-lots.
+
+Protocole (HTTP JSON sur localhost) :
+    GET  /health      -> {"status": "ok", "models": {...}, "batching": {...}}
+    POST /encode      {"texts": [...], "normalize": bool}
+                      -> {"shape": [n, dim], "data": "<float32 base64>"}
+    POST /zero_shot   {"sequences": [...], "candidate_labels": [...]}
+                      -> {"results": [{"labels": [...], "scores": [...]}, ...]}
+"""
+
+import base64
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+
+from apps.chatbot.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+ZERO_SHOT_MODEL = 'facebook/bart-large-mnli'
+
+
+def encode_array(array: np.ndarray) -> Dict[str, Any]:
+    """Sérialise une matrice float32 pour le transport JSON"""
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {'shape': list(array.shape), 'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def decode_array(payload: Dict[str, Any]) -> np.ndarray:
+    """Inverse de encode_array"""
+    data = base64.b64decode(payload['data'])
+    return np.frombuffer(data, dtype=np.float32).reshape(payload['shape'])
+
+
+class InferenceModels:
+    """Modèles chargés une seule fois et exposés via des micro-batchers"""
+
+    def __init__(self, enable_zero_shot: bool = False, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embedding_model = None
+        self.zero_shot = None
+        self.enable_zero_shot = enable_zero_shot
+        self.encode_batcher = MicroBatcher(self._encode_batch, max_batch_size, max_wait_ms, 'encode-batcher')
+        self.zero_shot_batcher = MicroBatcher(self._zero_shot_batch, max_batch_size, max_wait_ms, 'zero-shot-batcher')
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        import torch
+        device = 'mps' if torch.backends.mps.is_available() else 'cpu'
+        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL, device=device)
+        logger.info(f"Inference server: {EMBEDDING_MODEL} loaded on {device}")
+        if self.enable_zero_shot:
+            from apps.chatbot.zero_shot import BatchedZeroShotClassifier
+            self.zero_shot = BatchedZeroShotClassifier(ZERO_SHOT_MODEL, device='cpu')
+            logger.info(f"Inference server: {ZERO_SHOT_MODEL} loaded")
+
+    def _encode_batch(self, items: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """Encode tous les textes des requêtes du lot en un seul appel au modèle"""
+        texts = [text for item in items for text in item['texts']]
+        vectors = self.embedding_model.encode(texts, batch_size=64, convert_to_numpy=True,
+                                              show_progress_bar=False)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        results, offset = [], 0
+        for item in items:
+            chunk = vectors[offset:offset + len(item['texts'])]
+            offset += len(item['texts'])
+            if item.get('normalize'):
+                norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+                chunk = chunk / np.where(norms == 0, 1.0, norms)
+            results.append(chunk)
+        return results
+
+    def _zero_shot_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Toutes les paires (séquence, hypothèse) du lot passent dans un seul batch NLI"""
+        outputs = self.zero_shot.classify_batch(
+            [(item['sequence'], tuple(item['candidate_labels'])) for item in items]
+        )
+        return [{'labels': output['labels'], 'scores': output['scores']} for output in outputs]
+
+    def encode(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        return self.encode_batcher({'texts': texts, 'normalize': normalize})
+
+    def classify(self, sequences: List[str], candidate_labels: List[str]) -> List[Dict[str, Any]]:
+        if self.zero_shot is None:
+            raise RuntimeError('zero-shot classifier not loaded')
+        futures = [
+            self.zero_shot_batcher.submit({'sequence': s, 'candidate_labels': candidate_labels})
+            for s in sequences
+        ]
+        return [f.result() for f in futures]
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            'status': 'ok' if self.embedding_model is not None else 'loading',
+            'models': {
+                'embedding': EMBEDDING_MODEL if self.embedding_model is not None else None,
+                'zero_shot': ZERO_SHOT_MODEL if self.zero_shot is not None else None,
+            },
+            'batching': {
+                'encode': self.encode_batcher.get_stats(),
+                'zero_shot': self.zero_shot_batcher.get_stats(),
+            },
+        }
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    models: InferenceModels = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.models.health())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if self.path == '/encode':
+                texts = [str(t) for t in payload.get('texts', [])]
+                if not texts:
+                    self._send_json(200, encode_array(np.zeros((0, 0), dtype=np.float32)))
+                    return
+                vectors = self.models.encode(texts, bool(payload.get('normalize')))
+                self._send_json(200, encode_array(vectors))
+            elif self.path == '/zero_shot':
+                if self.models.zero_shot is None:
+                    self._send_json(503, {'error': 'zero-shot classifier not loaded'})
+                    return
+                results = self.models.classify(
+                    [str(s) for s in payload.get('sequences', [])],
+                    [str(l) for l in payload.get('candidate_labels', [])],
+                )
+                self._send_json(200, {'results': results})
+            else:
+                self._send_json(404, {'error': 'not found'})
+        except Exception as e:
+            logger.error(f"Inference request {self.path} failed: {e}")
+            self._send_json(500, {'error': str(e)})
+
+
+def create_server(host: str, port: int, models: InferenceModels) -> ThreadingHTTPServer:
+    """Construit le serveur HTTP ; chaque connexion est servie par un thread"""
+    handler = type('BoundInferenceRequestHandler', (InferenceRequestHandler,), {'models': models})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,234 @@
+"""
+Backends de classification d'intents interchangeables
+- zero_shot        : BART-large-MNLI zero-shot (comportement historique, coûteux sur CPU)
+- embedding_logreg : régression logistique sur les embeddings MiniLM déjà chargés
+- quantized        : classifieur fine-tuné (ParcInfoBartRetrainer) quantifié int8
+- rules            : aucun modèle, classification par règles uniquement
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_CHOICES = ['zero_shot', 'embedding_logreg', 'quantized', 'rules']
+EMBEDDING_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+
+class IntentBackend:
+    """Interface commune : classify() renvoie None pour laisser la main aux règles"""
+
+    name = 'base'
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _result(labels: Sequence[str], scores: Sequence[float], method: str) -> Dict[str, Any]:
+        """Confiance sur l'échelle des règles (0-100) ; all_scores garde les probabilités"""
+        order = np.argsort(scores)[::-1]
+        return {
+            "intent": labels[order[0]],
+            "confidence": round(float(scores[order[0]]) * 100, 1),
+            "method": method,
+            "all_scores": {labels[i]: float(scores[i]) for i in order},
+        }
+
+
+class ZeroShotIntentBackend(IntentBackend):
+    name = 'zero_shot'
+
+    def __init__(self, classifier, candidate_labels: Sequence[str]):
+        self.classifier = classifier
+        self.candidate_labels = list(candidate_labels)
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        result = self.classifier(query, candidate_labels=self.candidate_labels)
+        logger.info(f"Intent classification: '{query}' -> {result['labels'][0]} (confidence: {result['scores'][0]:.3f})")
+        return self._result(result["labels"], result["scores"], "zero_shot_nlp")
+
+
+class EmbeddingLogRegBackend(IntentBackend):
+    """Tête de régression logistique sur les embeddings normalisés de la requête"""
+
+    name = 'embedding_logreg'
+
+    def __init__(self, embedding_model, classifier, labels: Sequence[str]):
+        self.embedding_model = embedding_model
+        self.classifier = classifier
+        self.labels = list(labels)
+
+    @classmethod
+    def load(cls, embedding_model, path: str) -> 'EmbeddingLogRegBackend':
+        import joblib
+        bundle = joblib.load(path)
+        if bundle.get('embedding_model') != EMBEDDING_MODEL:
+            raise ValueError(f"{path} was trained on {bundle.get('embedding_model')}, not {EMBEDDING_MODEL}")
+        logger.info(f"Intent classifier loaded from {path} ({len(bundle['labels'])} intents, "
+                    f"{bundle.get('n_examples')} examples)")
+        return cls(embedding_model, bundle['classifier'], bundle['labels'])
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        vector = self.embedding_model.encode([query], normalize_embeddings=True)
+        probabilities = self.classifier.predict_proba(np.asarray(vector, dtype=np.float32))[0]
+        return self._result(self.labels, probabilities, 'embedding_logreg')
+
+
+class QuantizedIntentBackend(IntentBackend):
+    """Modèle de classification fine-tuné, quantifié dynamiquement en int8 au chargement"""
+
+    name = 'quantized'
+
+    def __init__(self, tokenizer, model, labels: Sequence[str]):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.labels = list(labels)
+
+    @classmethod
+    def load(cls, model_path: str) -> 'QuantizedIntentBackend':
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        id2label = {int(k): v for k, v in model.config.id2label.items()}
+        config_file = os.path.join(model_path, "parcinfo_config.json")
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                id2label = {int(k): v for k, v in json.load(f)["id2label"].items()}
+        labels = [id2label[i] for i in range(len(id2label))]
+        logger.info(f"Quantized intent model loaded from {model_path} ({len(labels)} intents)")
+        return cls(tokenizer, model, labels)
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        import torch
+        inputs = self.tokenizer(query, return_tensors="pt", truncation=True, max_length=128)
+        with torch.inference_mode():
+            probabilities = torch.softmax(self.model(**inputs).logits[0], dim=-1).numpy()
+        return self._result(self.labels, probabilities, 'quantized_classifier')
+
+
+def collect_training_examples(extra_examples: Optional[Dict[str, List[str]]] = None,
+                              handler_intents: Optional[Sequence[str]] = None) -> List[Tuple[str, str, float]]:
+    """Rassemble (phrase, intent, poids) depuis le corpus, IntentExample et ChatbotFeedback
+
+    Les libellés sont ramenés aux clés de handler (intent_corpus.LABEL_TO_INTENT) ; avec
+    handler_intents, les exemples dont l'intent n'a pas de handler sont écartés.
+    """
+    from apps.chatbot.intent_corpus import PARCINFO_TRAINING_DATA, routing_intent
+
+    examples: Dict[Tuple[str, str], float] = {}
+    dropped: Dict[str, int] = {}
+
+    def add(phrase: str, intent: str, weight: float = 1.0):
+        phrase = (phrase or '').strip()
+        if not phrase or not intent:
+            return
+        routed = routing_intent(intent)
+        if routed is None or (handler_intents is not None and routed not in handler_intents):
+            dropped[intent] = dropped.get(intent, 0) + 1
+            return
+        key = (phrase, routed)
+        examples[key] = max(examples.get(key, 0.0), weight)
+
+    for phrase, intent in PARCINFO_TRAINING_DATA:
+        add(phrase, intent)
+
+    for intent, phrases in (extra_examples or {}).items():
+        for phrase in phrases:
+            add(phrase, intent)
+
+    from apps.chatbot.models import IntentExample, ChatbotFeedback
+    for phrase, intent, weight in IntentExample.objects.values_list('phrase', 'intent', 'weight'):
+        add(phrase, intent, weight or 1.0)
+    # Corrections explicites des utilisateurs, et prédictions notées positivement
+    for query, intent_final, intent_pred, rating in ChatbotFeedback.objects.values_list(
+            'query', 'intent_final', 'intent_pred', 'rating'):
+        if intent_final:
+            add(query, intent_final, 2.0)
+        elif intent_pred and rating is not None and rating > 0:
+            add(query, intent_pred, 1.0)
+
+    if dropped:
+        logger.warning("Training examples without handler dropped: "
+                       + ', '.join(f"{intent}={count}" for intent, count in sorted(dropped.items())))
+    return [(phrase, intent, weight) for (phrase, intent), weight in examples.items()]
+
+
+def train_embedding_classifier(embedding_model, examples: List[Tuple[str, str, float]], output_path: str,
+                               C: float = 4.0, validation: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """Entraîne et sauvegarde la tête de régression logistique"""
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import cross_val_score
+
+    phrases = [phrase for phrase, _, _ in examples]
+    targets = np.array([intent for _, intent, _ in examples])
+    weights = np.array([weight for _, _, weight in examples], dtype=np.float32)
+    vectors = np.asarray(embedding_model.encode(phrases, batch_size=64, normalize_embeddings=True), dtype=np.float32)
+
+    classifier = LogisticRegression(C=C, max_iter=2000, class_weight='balanced')
+    metrics: Dict[str, Any] = {'n_examples': len(phrases), 'n_intents': int(len(set(targets)))}
+    folds = min(5, int(min(np.unique(targets, return_counts=True)[1])))
+    if folds >= 2:
+        metrics['cv_accuracy'] = float(cross_val_score(classifier, vectors, targets, cv=folds).mean())
+    classifier.fit(vectors, targets, sample_weight=weights)
+
+    if validation:
+        known = [(p, i) for p, i in validation if i in set(classifier.classes_)]
+        if known:
+            val_vectors = embedding_model.encode([p for p, _ in known], normalize_embeddings=True)
+            predicted = classifier.predict(np.asarray(val_vectors, dtype=np.float32))
+            metrics['validation_accuracy'] = float(np.mean(predicted == np.array([i for _, i in known])))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    joblib.dump({
+        'classifier': classifier,
+        'labels': list(classifier.classes_),
+        'embedding_model': EMBEDDING_MODEL,
+        'n_examples': len(phrases),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'metrics': metrics,
+    }, output_path)
+    return metrics
+
+
+def build_intent_backend(name: str, embedding_model=None, zero_shot_loader=None,
+                         candidate_labels: Sequence[str] = (), model_path: str = '',
+                         quantized_model_path: str = '',
+                         handler_intents: Optional[Sequence[str]] = None) -> Optional[IntentBackend]:
+    """Instancie le backend demandé ; None signifie classification par règles
+
+    Avec handler_intents, un backend entraîné dont un libellé n'a pas de handler est refusé.
+    """
+    from apps.chatbot.intent_corpus import check_handled
+
+    if name == 'rules':
+        return None
+    if name == 'zero_shot':
+        classifier = zero_shot_loader() if zero_shot_loader else None
+        return ZeroShotIntentBackend(classifier, candidate_labels) if classifier else None
+    if name == 'embedding_logreg':
+        if embedding_model is None:
+            raise ValueError("embedding_logreg requires the embedding model")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found, run 'manage.py train_intent_classifier' first")
+        backend = EmbeddingLogRegBackend.load(embedding_model, model_path)
+        if handler_intents is not None:
+            check_handled(backend.labels, handler_intents)
+        return backend
+    if name == 'quantized':
+        if not os.path.isdir(quantized_model_path):
+            raise FileNotFoundError(f"{quantized_model_path} not found, retrain with ParcInfoBartRetrainer first")
+        backend = QuantizedIntentBackend.load(quantized_model_path)
+        if handler_intents is not None:
+            check_handled(backend.labels, handler_intents)
+        return backend
+    raise ValueError(f"Unknown intent backend '{name}', expected one of {BACKEND_CHOICES}")
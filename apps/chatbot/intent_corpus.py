@@ -0,0 +1,126 @@
+"""
+Corpus d'intents ParcInfo (phrases étiquetées)
+Sans dépendance lourde : partagé par le réentraînement BART, les backends
+d'intents légers et la commande compare_intent_backends.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+# Corpus d'entraînement spécifique à ParcInfo
+PARCINFO_TRAINING_DATA = [
+    # Codes et inventaire
+    ("Code inventaire de la Baie", "codes_by_designation"),
+    ("Numéro d'inventaire du serveur", "codes_by_designation"),
+    ("Code de la station de travail", "codes_by_designation"),
+    ("Référence du matériel informatique", "codes_by_designation"),
+    ("Code inventaire du PC", "codes_by_designation"),
+    
+    # Statut de livraison
+    ("Statut de la livraison BC23", "delivery_status"),
+    ("État de la livraison BC24", "delivery_status"),
+    ("Livraison BC23 est-elle arrivée", "delivery_status"),
+    ("Quand arrive la livraison BC24", "delivery_status"),
+    ("Statut livraison commande", "delivery_status"),
+    
+    # Fournisseurs de commandes
+    ("Fournisseur de la commande BC23", "order_supplier"),
+    ("Qui fournit la commande BC24", "order_supplier"),
+    ("Fournisseur commande informatique", "order_supplier"),
+    ("Fournisseur de la commande", "order_supplier"),
+    ("Quel fournisseur pour BC23", "order_supplier"),
+    
+    # Fournisseurs ICE
+    ("Fournisseurs avec ICE commençant par 001", "fournisseurs_ice_001"),
+    ("ICE commençant par 001", "fournisseurs_ice_001"),
+    ("Fournisseurs ICE 001", "fournisseurs_ice_001"),
+    ("ICE 001 fournisseurs", "fournisseurs_ice_001"),
+    ("Fournisseurs commençant par ICE 001", "fournisseurs_ice_001"),
+    
+    # Comptage de demandes
+    ("Combien de demandes d'équipement ont été faites par gestionnaire bureau", "count_equipment_requests"),
+    ("Nombre de demandes gestionnaire bureau", "count_equipment_requests"),
+    ("Compte des demandes équipement", "count_equipment_requests"),
+    ("Combien de demandes par utilisateur", "count_equipment_requests"),
+    ("Total des demandes d'équipement", "count_equipment_requests"),
+    
+    # Affectation de matériels
+    ("Matériels bureautiques affectés à gestionnaire bureau", "user_material_assignment"),
+    ("Matériels affectés à l'utilisateur", "user_material_assignment"),
+    ("Affectation matériels bureautiques", "user_material_assignment"),
+    ("Quels matériels pour l'utilisateur", "user_material_assignment"),
+    ("Matériels assignés à", "user_material_assignment"),
+    
+    # Demandes par date
+    ("Demandes d'équipement approuvées en août 2025", "equipment_requests_by_date"),
+    ("Demandes approuvées août 2025", "equipment_requests_by_date"),
+    ("Demandes équipement août", "equipment_requests_by_date"),
+    ("Demandes approuvées en juillet", "equipment_requests_by_date"),
+    ("Demandes par mois", "equipment_requests_by_date"),
+    
+    # Montants totaux
+    ("Coût total des commandes juillet 2025", "total_it_orders_amount"),
+    ("Montant total commandes informatiques", "total_it_orders_amount"),
+    ("Prix total des commandes", "total_it_orders_amount"),
+    ("Coût total juillet 2025", "total_it_orders_amount"),
+    ("Total des montants commandes", "total_it_orders_amount"),
+    
+    # Données manquantes (fallback)
+    ("Quels sont les prix des matériels informatiques", "fallback"),
+    ("Prix du matériel informatique", "fallback"),
+    ("Coût des équipements", "fallback"),
+    ("Historique des logs admin pour l'utilisateur superadmin", "fallback"),
+    ("Logs d'activité admin", "fallback"),
+    ("Historique des actions admin", "fallback"),
+    
+    # Intents existants pour maintenir la compatibilité
+    ("Liste des fournisseurs", "liste_fournisseurs"),
+    ("Tous les fournisseurs", "liste_fournisseurs"),
+    ("Fournisseurs disponibles", "liste_fournisseurs"),
+    ("Comparer les garanties", "compare_garanties"),
+    ("Garantie des matériels", "compare_garanties"),
+    ("Vérifier les garanties", "compare_garanties"),
+    ("Matériels expirant bientôt", "check_expiring_soon"),
+    ("Équipements qui expirent", "check_expiring_soon"),
+    ("Garanties qui expirent", "check_expiring_soon")
+]
+
+# Données de validation
+PARCINFO_VALIDATION_DATA = [
+    ("Code inventaire du serveur Lenovo", "codes_by_designation"),
+    ("Statut livraison commande BC25", "delivery_status"),
+    ("Fournisseur commande BC26", "order_supplier"),
+    ("ICE 002 fournisseurs", "fournisseurs_ice_001"),
+    ("Demandes équipement par mois", "count_equipment_requests"),
+    ("Matériels affectés à test_employe", "user_material_assignment"),
+    ("Demandes approuvées septembre", "equipment_requests_by_date"),
+    ("Total coût commandes août", "total_it_orders_amount"),
+    ("Prix matériel bureautique", "fallback"),
+    ("Logs admin superadmin", "fallback")
+]
+
+# Libellés du corpus -> clé de ParcInfoChatbot.intent_handlers quand le nom diffère ;
+# None : aucun handler ne traite cette intention, les exemples sont écartés
+LABEL_TO_INTENT = {
+    'codes_by_designation': 'recherche_materiel',
+    'order_supplier': 'command_details',
+    'fournisseurs_ice_001': 'supplier_ice',
+    'compare_garanties': None,
+    'check_expiring_soon': None,
+}
+
+
+def routing_intent(label: str) -> Optional[str]:
+    """Clé de handler correspondant à un libellé, None si l'intention n'est pas routable"""
+    return LABEL_TO_INTENT.get(label, label)
+
+
+def routing_examples(pairs: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """(phrase, clé de handler), sans les exemples non routables"""
+    return [(phrase, routing_intent(label)) for phrase, label in pairs if routing_intent(label)]
+
+
+def check_handled(labels: Iterable[str], handler_intents: Iterable[str]):
+    """Lève ValueError si un libellé de classifieur n'a pas de handler"""
+    missing = sorted(set(labels) - set(handler_intents))
+    if missing:
+        raise ValueError(f"Intent labels without handler: {', '.join(missing)}")
@@ -0,0 +1,221 @@
+"""
+Index vectoriel des exemples d'intents
+Tous les exemples (par défaut et table IntentExample) sont empilés dans une seule
+matrice normalisée triée par intent : le matching d'une requête est un unique
+produit matrice-vecteur suivi d'un max segmenté par intent.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Incrémenté par les signaux IntentExample du processus courant
+_generation = 0
+_rebuild_generation = 0
+_generation_lock = threading.Lock()
+
+
+def mark_intent_examples_changed(rebuild: bool = False):
+    """Signale un ajout (ou, avec rebuild=True, une modification/suppression) d'IntentExample"""
+    global _generation, _rebuild_generation
+    with _generation_lock:
+        _generation += 1
+        if rebuild:
+            _rebuild_generation += 1
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class IntentEmbeddingIndex:
+    """Matrice d'embeddings des exemples d'intents, enrichie au fil des ajouts en base
+
+    Les autres processus ne reçoivent pas les signaux : la version de la table
+    (compteurs de response_cache, partagés entre processus), son max id et son
+    nombre de lignes sont donc aussi sondés au plus toutes les refresh_interval secondes.
+    """
+
+    def __init__(self, embedding_model, default_examples: Dict[str, List[str]], refresh_interval: float = 30.0,
+                 store=None):
+        """
+        Args:
+            store: EmbeddingFileCache optionnel ; les vecteurs déjà calculés par un
+                autre processus (ou au démarrage précédent) y sont relus en mmap
+        """
+        self.embedding_model = embedding_model
+        self.store = store
+        self.default_examples = default_examples
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # (matrice triée par intent, début de chaque segment, intent de chaque segment)
+        self._view: Optional[Tuple[np.ndarray, np.ndarray, List[str]]] = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._labels: List[str] = []
+        # Sans store : vecteur de chaque phrase indexée, par hash de la phrase
+        self._memo: Dict[str, np.ndarray] = {}
+        self._db_last_id = 0
+        self._db_count = 0
+        self._db_version: Optional[int] = None
+        self._seen_generation = _generation
+        self._seen_rebuild = _rebuild_generation
+        self._checked_at = 0.0
+
+    def _encode_with_model(self, phrases: List[str]) -> np.ndarray:
+        return _normalize(self.embedding_model.encode(phrases, normalize_embeddings=True))
+
+    def _encode_in_memory(self, phrases: List[str], complete: bool) -> np.ndarray:
+        """Seules les phrases absentes du mémo sont encodées ; complete=True : phrases de tout l'index"""
+        keys = [hashlib.sha1(phrase.encode('utf-8')).hexdigest() for phrase in phrases]
+        missing = {key: phrase for key, phrase in zip(keys, phrases) if key not in self._memo}
+        if missing:
+            self._memo.update(zip(missing, self._encode_with_model(list(missing.values()))))
+        if complete:
+            # Exemples supprimés ou modifiés : leurs anciens vecteurs sont oubliés
+            self._memo = {key: self._memo[key] for key in keys}
+        return np.stack([self._memo[key] for key in keys])
+
+    def _encode(self, phrases: List[str], persist: bool = False) -> np.ndarray:
+        if self.store is None:
+            return self._encode_in_memory(phrases, complete=persist)
+        return self.store.get_or_encode(phrases, self._encode_with_model, persist=persist)
+
+    def _fetch_db_rows(self, after_id: int = 0) -> List[Tuple[int, str, str]]:
+        from apps.chatbot.models import IntentExample
+        return list(
+            IntentExample.objects.filter(pk__gt=after_id).order_by('pk').values_list('pk', 'intent', 'phrase')
+        )
+
+    @staticmethod
+    def _read_db_version() -> Optional[int]:
+        """Version de la table IntentExample, incrémentée à chaque modification validée"""
+        from apps.chatbot.models import IntentExample
+        from apps.chatbot.response_cache import get_response_cache
+        table = IntentExample._meta.db_table
+        try:
+            return get_response_cache().get_versions([table])[table]
+        except Exception as e:
+            logger.warning(f"Intent index: data version unavailable ({e})")
+            return None
+
+    def _publish(self):
+        """Trie les lignes par intent et calcule les segments pour np.maximum.reduceat"""
+        intents = sorted(set(self._labels))
+        label_ids = np.searchsorted(np.array(intents), np.array(self._labels))
+        order = np.argsort(label_ids, kind='stable')
+        sorted_ids = label_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        # Déjà trié (cas du build) : on garde la matrice telle quelle, éventuellement en mmap
+        matrix = self._vectors if np.array_equal(order, np.arange(len(order))) else self._vectors[order]
+        self._view = (matrix, starts, [intents[i] for i in sorted_ids[starts]])
+
+    def _assemble(self, rows: List[Tuple[int, str, str]], persist: bool = False):
+        """Encode les exemples par défaut et les lignes données, regroupés par intent"""
+        pairs = [(intent, phrase) for intent, examples in self.default_examples.items() for phrase in examples]
+        pairs += [(intent, phrase) for _, intent, phrase in rows]
+        # Tri par intent dès l'encodage : la matrice (et le fichier du cache) n'a plus à être réordonnée
+        pairs.sort(key=lambda pair: pair[0])
+        self._vectors = self._encode([phrase for _, phrase in pairs], persist=persist) if pairs \
+            else np.zeros((0, 0), dtype=np.float32)
+        self._labels = [intent for intent, _ in pairs]
+        self._db_last_id = rows[-1][0] if rows else 0
+        self._db_count = len(rows)
+
+    def build(self) -> bool:
+        """Encode les exemples par défaut et ceux de la base"""
+        with self._lock:
+            try:
+                rows = []
+                # Lue avant les lignes : une modification intermédiaire sera revue au prochain refresh
+                version = self._read_db_version()
+                try:
+                    rows = self._fetch_db_rows()
+                except Exception as e:
+                    logger.error(f"Error loading intent examples from DB: {e}")
+                self._assemble(rows, persist=True)
+                self._db_version = version
+                if not self._labels:
+                    return False
+                self._publish()
+                self._checked_at = time.monotonic()
+                logger.info(f"Intent index built: {len(self._labels)} examples, {len(self._view[2])} intents")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to encode intent examples: {e}")
+                return False
+
+    def _append_db_rows(self, rows: List[Tuple[int, str, str]]):
+        self._vectors = np.vstack([self._vectors, self._encode([phrase for _, _, phrase in rows])])
+        self._labels = self._labels + [intent for _, intent, _ in rows]
+        self._db_last_id = rows[-1][0]
+        self._db_count += len(rows)
+
+    def refresh(self, force: bool = False):
+        """Intègre les nouvelles lignes d'IntentExample sans ré-encoder les autres"""
+        if self._view is None:
+            return
+        signalled = self._seen_generation != _generation
+        if not (force or signalled or time.monotonic() - self._checked_at >= self.refresh_interval):
+            return
+        with self._lock:
+            try:
+                from django.db.models import Count, Max
+                from apps.chatbot.models import IntentExample
+                rebuild = self._seen_rebuild != _rebuild_generation
+                new_rows = []
+                self._seen_generation, self._seen_rebuild = _generation, _rebuild_generation
+                self._checked_at = time.monotonic()
+                version = self._read_db_version()
+
+                if not rebuild:
+                    stats = IntentExample.objects.aggregate(max_id=Max('pk'), count=Count('pk'))
+                    max_id, count = stats['max_id'] or 0, stats['count']
+                    if version == self._db_version and max_id == self._db_last_id and count == self._db_count:
+                        return
+                    new_rows = self._fetch_db_rows(self._db_last_id) if max_id > self._db_last_id else []
+                    # Des lignes anciennes ont disparu, ou la version a avancé plus que le nombre
+                    # d'ajouts (modification) : ré-encodage de la partie base
+                    rebuild = count != self._db_count + len(new_rows) or (
+                        version is not None and self._db_version is not None
+                        and version - self._db_version != len(new_rows)
+                    )
+
+                if rebuild:
+                    # Modification ou suppression : seules les phrases inconnues du cache sont ré-encodées
+                    self._assemble(self._fetch_db_rows(), persist=True)
+                    logger.info(f"Intent index: DB examples re-encoded ({self._db_count} rows)")
+                elif new_rows:
+                    self._append_db_rows(new_rows)
+                    logger.info(f"Intent index: {len(new_rows)} new examples added")
+                self._db_version = version
+                self._publish()
+            except Exception as e:
+                logger.warning(f"Intent index refresh failed: {e}")
+
+    def match(self, query_embedding: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Meilleur intent et son score cosinus pour un embedding de requête"""
+        self.refresh()
+        view = self._view
+        if view is None:
+            return None
+        matrix, starts, intents = view
+        query = _normalize(query_embedding)[0]
+        segment_max = np.maximum.reduceat(matrix @ query, starts)
+        best = int(np.argmax(segment_max))
+        return intents[best], float(segment_max[best])
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __bool__(self) -> bool:
+        return self._view is not None
@@ -0,0 +1,338 @@
+"""
+Table de routage des intents précompilée
+Les mots-clés et les littéraux obligatoires des patterns sont regroupés dans un
+automate Aho-Corasick : un seul parcours de la requête normalisée suffit pour
+savoir quels mots-clés sont présents et quels patterns peuvent matcher. Seuls
+ces patterns sont ensuite évalués.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz
+
+logger = logging.getLogger(__name__)
+
+# Score attribué par type de règle (identique à l'ancienne classification par règles)
+PATTERN_SCORE = 10
+KEYWORD_SCORE = 5
+FUZZY_SCORE = 3
+BOOST_SCORE = 15
+FUZZY_THRESHOLD = 80
+
+_QUANTIFIERS = '*?+{'
+
+
+class KeywordAutomaton:
+    """Automate Aho-Corasick : retrouve en un passage toutes les chaînes présentes dans un texte"""
+
+    def __init__(self, words: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for word in set(w for w in words if w):
+            self._add(word)
+        self._build()
+
+    def _add(self, word: str):
+        node = 0
+        for char in word:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (word,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """Index du ']' fermant la classe de caractères ouverte en pattern[start]"""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == '\\':
+            i += 2
+            continue
+        if pattern[i] == ']':
+            return i
+        i += 1
+    raise ValueError(f"unbalanced pattern: {pattern}")
+
+
+def _group_end(pattern: str, start: int) -> int:
+    """Index de la parenthèse fermant le groupe ouvert en pattern[start]"""
+    depth, i = 0, start
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            i = _class_end(pattern, i) + 1
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError(f"unbalanced pattern: {pattern}")
+
+
+def _plain_literal(fragment: str) -> Optional[str]:
+    """Retourne le littéral si le fragment ne contient aucun métacaractère actif"""
+    chars, i = [], 0
+    while i < len(fragment):
+        char = fragment[i]
+        if char == '\\':
+            if i + 1 >= len(fragment) or fragment[i + 1].isalnum():
+                return None
+            chars.append(fragment[i + 1])
+            i += 2
+            continue
+        if char in '.^$|()[]' or char in _QUANTIFIERS:
+            return None
+        chars.append(char)
+        i += 1
+    return ''.join(chars)
+
+
+def required_literals(pattern: str) -> Optional[Set[str]]:
+    """Extrait un ensemble de littéraux dont au moins un est forcément présent si le pattern matche
+
+    Analyse volontairement conservatrice : retourne None (pattern toujours évalué)
+    dès que la structure n'est pas comprise.
+    """
+    candidates: List[Set[str]] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            candidates.append({''.join(run).lower()})
+            run.clear()
+
+    i = 0
+    try:
+        while i < len(pattern):
+            char = pattern[i]
+            optional = False
+            atom_len = 1
+            if char == '\\':
+                nxt = pattern[i + 1] if i + 1 < len(pattern) else ''
+                i += 2
+                if not nxt or nxt.isalnum():
+                    flush()
+                    continue
+                run.append(nxt)
+            elif char == '[':
+                flush()
+                i = _class_end(pattern, i) + 1
+                atom_len = 0
+            elif char == '(':
+                flush()
+                end = _group_end(pattern, i)
+                body = pattern[i + 1:end]
+                i = end + 1
+                atom_len = 0
+                if body.startswith('?'):
+                    continue
+                alternatives = [_plain_literal(part) for part in body.split('|')]
+                if all(alternatives):
+                    if i < len(pattern) and pattern[i] in '*?{':
+                        optional = True
+                    if not optional:
+                        candidates.append({alt.lower() for alt in alternatives})
+            elif char == '|':
+                return None
+            elif char in '.^$':
+                flush()
+                i += 1
+                atom_len = 0
+            elif char in _QUANTIFIERS:
+                # Quantificateur sans atome littéral (après une classe, un groupe ou un échappement)
+                i = pattern.index('}', i) + 1 if char == '{' else i + 1
+                continue
+            else:
+                run.append(char)
+                i += 1
+
+            # Quantificateur portant sur l'atome précédent
+            if i < len(pattern) and pattern[i] in _QUANTIFIERS:
+                quant = pattern[i]
+                if quant == '{':
+                    i = pattern.index('}', i) + 1
+                else:
+                    i += 1
+                if i < len(pattern) and pattern[i] in '?+':
+                    i += 1
+                if atom_len and run:
+                    if quant == '+':
+                        flush()
+                    else:
+                        run.pop()
+                        flush()
+        flush()
+    except (ValueError, IndexError):
+        return None
+
+    candidates = [c for c in candidates if min(len(alt) for alt in c) >= 2]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: min(len(alt) for alt in c))
+
+
+def _fuzzy_length_compatible(a: int, b: int) -> bool:
+    """fuzz.ratio(a, b) >= 80 impose |la - lb| <= 0.2 * (la + lb)"""
+    return 5 * abs(a - b) <= a + b
+
+
+class CompiledIntentRouter:
+    """Score des intents par règles avec préfiltrage par automate et compteurs de hits"""
+
+    def __init__(self, intent_map: Dict[str, Dict], compiled_patterns: Dict[str, List[re.Pattern]],
+                 phrase_boosts: Dict[str, List[re.Pattern]]):
+        self.intents = list(intent_map)
+        self._keywords: Dict[str, List[str]] = {
+            intent: list(cfg.get('keywords', [])) for intent, cfg in intent_map.items()
+        }
+        self._patterns = self._prepare_rules(compiled_patterns, 'pattern')
+        self._boosts = self._prepare_rules(phrase_boosts, 'boost')
+
+        words: Set[str] = {kw for kws in self._keywords.values() for kw in kws}
+        for _, _, _, literals in self._patterns + self._boosts:
+            if literals:
+                words.update(literals)
+        self._automaton = KeywordAutomaton(words)
+
+        self._hits: Counter = Counter()
+        self._stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+        always = sum(1 for rule in self._patterns + self._boosts if rule[3] is None)
+        logger.info(f"Intent router compiled: {len(self._patterns)} patterns, {len(self._boosts)} boosts, "
+                    f"{len(words)} automaton terms, {always} rules without literal prefilter")
+
+    @staticmethod
+    def _prepare_rules(rules: Dict[str, List[re.Pattern]], kind: str):
+        prepared = []
+        for intent, patterns in rules.items():
+            for index, compiled in enumerate(patterns):
+                prepared.append((intent, f"{intent}:{kind}:{index}", compiled, required_literals(compiled.pattern)))
+        return prepared
+
+    def _fuzzy_keywords(self, text: str, missing: Iterable[str]) -> Set[str]:
+        """Mots-clés absents du texte mais proches (faute de frappe) d'un de ses tokens"""
+        tokens = set(text.split())
+        matched = set()
+        for keyword in missing:
+            for token in tokens:
+                if _fuzzy_length_compatible(len(token), len(keyword)) and \
+                        fuzz.ratio(token, keyword, score_cutoff=FUZZY_THRESHOLD) >= FUZZY_THRESHOLD:
+                    matched.add(keyword)
+                    break
+        return matched
+
+    def score(self, text: str) -> Dict[str, int]:
+        """Scores par intent pour un texte déjà en minuscules"""
+        found = self._automaton.find_all(text)
+        scores = dict.fromkeys(self.intents, 0)
+        hits: List[str] = []
+        evaluated = 0
+
+        for intent, rule_id, compiled, literals in self._patterns:
+            if literals is None or not literals.isdisjoint(found):
+                evaluated += 1
+                if compiled.search(text):
+                    scores[intent] += PATTERN_SCORE
+                    hits.append(rule_id)
+
+        all_keywords = {kw for kws in self._keywords.values() for kw in kws}
+        fuzzy = self._fuzzy_keywords(text, all_keywords - found)
+        for intent, keywords in self._keywords.items():
+            for keyword in keywords:
+                if keyword in found:
+                    scores[intent] += KEYWORD_SCORE
+                    hits.append(f"{intent}:keyword:{keyword}")
+                elif keyword in fuzzy:
+                    scores[intent] += FUZZY_SCORE
+                    hits.append(f"{intent}:fuzzy:{keyword}")
+
+        for intent, rule_id, compiled, literals in self._boosts:
+            if literals is None or not literals.isdisjoint(found):
+                evaluated += 1
+                if compiled.search(text):
+                    scores[intent] = scores.get(intent, 0) + BOOST_SCORE
+                    hits.append(rule_id)
+
+        with self._lock:
+            self._hits.update(hits)
+            self._stats['queries'] += 1
+            self._stats['regex_evaluated'] += evaluated
+            self._stats['regex_skipped'] += len(self._patterns) + len(self._boosts) - evaluated
+        return scores
+
+    def score_sequential(self, text: str) -> Dict[str, int]:
+        """Évaluation exhaustive d'origine, conservée comme référence pour les benchmarks"""
+        scores = dict.fromkeys(self.intents, 0)
+        for intent, _, compiled, _ in self._patterns:
+            if compiled.search(text):
+                scores[intent] += PATTERN_SCORE
+        for intent, keywords in self._keywords.items():
+            for keyword in keywords:
+                if keyword in text:
+                    scores[intent] += KEYWORD_SCORE
+                else:
+                    for token in text.split():
+                        if fuzz.ratio(token, keyword) >= FUZZY_THRESHOLD:
+                            scores[intent] += FUZZY_SCORE
+                            break
+        for intent, _, compiled, _ in self._boosts:
+            if compiled.search(text):
+                scores[intent] = scores.get(intent, 0) + BOOST_SCORE
+        return scores
+
+    def get_stats(self, top: int = 20) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['top_rules'] = self._hits.most_common(top)
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._stats.clear()
@@ -0,0 +1,182 @@
+"""
+Valeurs connues des entités citées dans les réponses : fournisseurs, ICE, codes
+matériel, numéros de commande et utilisateurs
+Chargées en une requête par type d'entité, gardées en mémoire et rechargées quand
+la version d'une table source change (compteurs de response_cache, incrémentés
+par les signaux) ou au plus tard après KNOWN_ENTITIES_TTL secondes, pour les
+écritures qui contournent les signaux. Vérifier une entité revient alors à une
+recherche dans un dictionnaire, quelle que soit la longueur de la réponse.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.db import connection
+
+from apps.chatbot import metrics
+
+logger = logging.getLogger(__name__)
+
+KNOWN_ENTITIES_TTL = 600
+# Intervalle minimal entre deux lectures des versions de tables
+VERSION_CHECK_SECONDS = 1.0
+
+# Type d'entité -> (app_label, modèle, colonnes) lues dans une seule requête UNION ALL
+ENTITY_SOURCES = {
+    'suppliers': [('fournisseurs', 'Fournisseur', ('nom',))],
+    'ices': [('fournisseurs', 'Fournisseur', ('ice', 'if_fiscal'))],
+    'materials': [
+        ('materiel_informatique', 'MaterielInformatique', ('code_inventaire', 'numero_serie')),
+        ('materiel_bureautique', 'MaterielBureau', ('code_inventaire',)),
+    ],
+    'orders': [
+        ('commande_informatique', 'Commande', ('numero_commande',)),
+        ('commande_bureau', 'CommandeBureau', ('numero_commande',)),
+    ],
+    'users': [('users', 'CustomUser', ('username',))],
+}
+
+# valeur normalisée -> [(modèle, pk)]
+EntityValues = Dict[str, List[Tuple[str, int]]]
+
+
+def normalize_entity(value: str) -> str:
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+def _sources():
+    from django.apps import apps
+    for kind, sources in ENTITY_SOURCES.items():
+        yield kind, [(apps.get_model(app_label, model_name), columns)
+                     for app_label, model_name, columns in sources]
+
+
+def _entity_sql(sources) -> str:
+    quote = connection.ops.quote_name
+    parts = []
+    for model, columns in sources:
+        for column in columns:
+            parts.append(
+                f"SELECT '{model._meta.label}', {quote(model._meta.pk.column)}, {quote(column)} "
+                f"FROM {quote(model._meta.db_table)} "
+                f"WHERE {quote(column)} IS NOT NULL AND {quote(column)} <> ''"
+            )
+    return ' UNION ALL '.join(parts)
+
+
+class KnownEntities:
+    """Index en mémoire, propre à chaque processus"""
+
+    def __init__(self, ttl: int = KNOWN_ENTITIES_TTL):
+        self.ttl = ttl
+        self._values: Dict[str, EntityValues] = {}
+        self._supplier_words: Set[str] = set()
+        self._versions: Optional[Dict[str, int]] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @staticmethod
+    def tables() -> List[str]:
+        return sorted({model._meta.db_table for _, sources in _sources() for model, _ in sources})
+
+    @staticmethod
+    def _read_versions(tables: List[str]) -> Optional[Dict[str, int]]:
+        from apps.chatbot.response_cache import get_response_cache
+        try:
+            return get_response_cache().get_versions(tables)
+        except Exception as e:
+            logger.warning(f"Known entities: data versions unavailable ({e})")
+            return None
+
+    def load(self):
+        """Recharge toutes les valeurs : une requête par type d'entité"""
+        started = time.perf_counter()
+        # Versions lues avant les données : une modification concurrente force le prochain rechargement
+        versions = self._read_versions(self.tables())
+        values: Dict[str, EntityValues] = {}
+        with connection.cursor() as cursor:
+            for kind, sources in _sources():
+                cursor.execute(_entity_sql(sources))
+                by_value: EntityValues = defaultdict(list)
+                for label, pk, value in cursor.fetchall():
+                    by_value[normalize_entity(value)].append((label, pk))
+                values[kind] = dict(by_value)
+        supplier_words = {word for name in values['suppliers'] for word in name.split()}
+        with self._lock:
+            self._values = values
+            self._supplier_words = supplier_words
+            self._versions = versions
+            self._loaded_at = self._checked_at = time.monotonic()
+        metrics.increment('known_entities.reloads')
+        logger.info(f"Known entities loaded in {(time.perf_counter() - started) * 1000:.0f} ms: "
+                    + ', '.join(f"{kind}={len(entries)}" for kind, entries in values.items()))
+
+    def refresh(self):
+        """Recharge si l'index est vide, expiré ou si une table source a changé de version"""
+        now = time.monotonic()
+        if self._values and now - self._loaded_at < self.ttl:
+            if now - self._checked_at < VERSION_CHECK_SECONDS:
+                return
+            self._checked_at = now
+            current = self._read_versions(self.tables())
+            # Versions illisibles : le TTL reste la seule limite
+            if current is None or self._versions is None or current == self._versions:
+                return
+            metrics.increment('known_entities.invalidations')
+        # Un seul rechargement à la fois ; pendant ce temps les autres threads utilisent l'index courant
+        if not self._load_lock.acquire(blocking=not self._values):
+            return
+        try:
+            # Index rechargé par un autre thread pendant l'attente du verrou
+            if self._loaded_at <= now:
+                self.load()
+        finally:
+            self._load_lock.release()
+
+    def lookup(self, kind: str, value: str) -> List[Tuple[str, int]]:
+        """Objets (modèle, pk) portant cette valeur ; liste vide si inconnue"""
+        return self._values.get(kind, {}).get(normalize_entity(value), [])
+
+    def contains(self, kind: str, value: str) -> bool:
+        return normalize_entity(value) in self._values.get(kind, {})
+
+    def is_supplier(self, name: str) -> bool:
+        """Nom complet d'un fournisseur, ou mots tous présents dans des noms de fournisseurs"""
+        normalized = normalize_entity(name)
+        if normalized in self._values.get('suppliers', {}):
+            return True
+        words = normalized.split()
+        return bool(words) and all(word in self._supplier_words for word in words)
+
+    def get_stats(self):
+        counters = metrics.get_counters()
+        return {
+            'loaded': bool(self._values),
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._values else None,
+            'sizes': {kind: len(entries) for kind, entries in self._values.items()},
+            'reloads': counters.get('known_entities.reloads', 0),
+            'invalidations': counters.get('known_entities.invalidations', 0),
+        }
+
+
+_known_entities: Optional[KnownEntities] = None
+_known_entities_lock = threading.Lock()
+
+
+def get_known_entities() -> KnownEntities:
+    """Index partagé, à jour (rechargé si nécessaire)"""
+    global _known_entities
+    with _known_entities_lock:
+        if _known_entities is None:
+            from django.conf import settings
+            _known_entities = KnownEntities(ttl=int(getattr(settings, 'CHATBOT_KNOWN_ENTITIES_TTL',
+                                                            KNOWN_ENTITIES_TTL)))
+        known = _known_entities
+    known.refresh()
+    return known
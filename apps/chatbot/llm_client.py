@@ -2,12 +2,170 @@ import json
 import logging
 import requests
 import re
-from typing import List, Dict, Optional, Any
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Optional, Any, Tuple
 from django.conf import settings
 from datetime import datetime
 
+from apps.chatbot import metrics
+from apps.chatbot.prompt_builder import PromptBuilder
+from apps.chatbot.semantic_cache import get_semantic_cache
+
 logger = logging.getLogger(__name__)
 
+# Destinataire des tokens générés dans le thread courant (voir stream_tokens_to)
+_token_sink = threading.local()
+
+UNAVAILABLE_RESPONSE = "Désolé, le service LLM n'est pas disponible actuellement."
+TIMEOUT_RESPONSE = "La génération de réponse a pris trop de temps. Veuillez réessayer avec une question plus simple."
+ERROR_RESPONSE = "Une erreur est survenue lors de la génération de la réponse."
+EMPTY_RESPONSE = "Je n'ai pas pu générer une réponse appropriée."
+# Réponses de repli de generate_response : à ne pas mettre en cache
+FAILED_RESPONSES = frozenset({UNAVAILABLE_RESPONSE, TIMEOUT_RESPONSE, ERROR_RESPONSE, EMPTY_RESPONSE})
+
+
+@contextmanager
+def stream_tokens_to(callback: Callable[[str], None], on_end: Optional[Callable[[], None]] = None):
+    """Dans le bloc, generate_response transmet chaque token à callback au fil de la génération
+
+    on_end est appelé à la fin de chaque génération diffusée, pour que l'appelant
+    sépare les générations successives d'une même requête.
+    Le texte complet, nettoyé et validé, reste la valeur de retour : les appelants
+    de generate_response (process_query, chat_with_context) n'ont pas à changer.
+    """
+    previous = getattr(_token_sink, 'callback', None), getattr(_token_sink, 'on_end', None)
+    _token_sink.callback, _token_sink.on_end = callback, on_end
+    try:
+        yield
+    finally:
+        _token_sink.callback, _token_sink.on_end = previous
+
+
+class LLMUnavailable(Exception):
+    """Ollama indisponible (circuit ouvert) ou saturé (attente d'un créneau dépassée)"""
+
+
+class CircuitBreaker:
+    """Coupe les appels après failure_threshold échecs consécutifs, pendant reset_seconds
+
+    Passé ce délai, un seul appel d'essai passe (semi-ouvert) : son succès referme
+    le circuit, son échec le rouvre.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def is_open(self) -> bool:
+        """Vrai tant qu'aucun appel ne passerait (ne consomme pas l'appel d'essai)"""
+        with self._lock:
+            return self.state == self.HALF_OPEN or (self.state == self.OPEN and not self._cooled_down())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._cooled_down():
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.increment('llm.circuit_opened')
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class OllamaEndpoint:
+    """Ressources partagées par tous les clients d'une même URL Ollama dans le processus
+
+    Session HTTP avec pool de connexions keep-alive, sémaphore bornant les
+    générations simultanées, disjoncteur et disponibilité mise en cache.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=getattr(settings, 'OLLAMA_POOL_SIZE', 10))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.semaphore = threading.BoundedSemaphore(getattr(settings, 'OLLAMA_MAX_CONCURRENCY', 2))
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'OLLAMA_CIRCUIT_FAILURES', 3),
+            reset_seconds=getattr(settings, 'OLLAMA_CIRCUIT_RESET_SECONDS', 30),
+        )
+        self.availability_ttl = getattr(settings, 'OLLAMA_AVAILABILITY_TTL', 30)
+        self.available: Optional[bool] = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def probe(self) -> bool:
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+            available = response.status_code == 200
+        except Exception as e:
+            logger.warning(f"Ollama not available: {e}")
+            available = False
+        if available:
+            self.breaker.record_success()
+        elif not self.breaker.is_open():
+            self.breaker.record_failure()
+        with self._lock:
+            self.available = available
+            self._checked_at = time.monotonic()
+            self._refreshing = False
+        return available
+
+    def is_available(self, wait: bool = True) -> bool:
+        """Dernier état connu ; une fois le TTL écoulé, la sonde est relancée en arrière-plan
+
+        Sans état connu, wait=True sonde immédiatement et wait=False répond False.
+        """
+        with self._lock:
+            known = self.available
+            stale = time.monotonic() - self._checked_at >= self.availability_ttl
+            refresh = known is not None and stale and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if known is None:
+            known = self.probe() if wait else False
+        elif refresh:
+            threading.Thread(target=self.probe, name='ollama-probe', daemon=True).start()
+        return known and not self.breaker.is_open()
+
+
+_endpoints: Dict[str, OllamaEndpoint] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(base_url: str) -> OllamaEndpoint:
+    with _endpoints_lock:
+        endpoint = _endpoints.get(base_url)
+        if endpoint is None:
+            endpoint = _endpoints[base_url] = OllamaEndpoint(base_url)
+        return endpoint
+
 
 class OllamaClient:
     """Client for Ollama/LLaMA 3 integration with RAG context"""
@@ -18,20 +176,24 @@ class OllamaClient:
         self.timeout = getattr(settings, 'OLLAMA_TIMEOUT', 120)  # Increased timeout
         self.max_tokens = getattr(settings, 'OLLAMA_MAX_TOKENS', 1000)
         self.temperature = getattr(settings, 'OLLAMA_TEMPERATURE', 0.7)
+        # Attente maximale d'un créneau de génération avant de renoncer au LLM
+        self.queue_timeout = getattr(settings, 'OLLAMA_QUEUE_TIMEOUT', 10)
+        self.endpoint = get_endpoint(self.base_url)
+        self.session = self.endpoint.session
+        # Budget du prompt complet (consignes + contexte + question), en tokens du modèle
+        self.prompt_tokens = getattr(settings, 'OLLAMA_PROMPT_TOKENS', 1536)
+        self.prompt_builder = PromptBuilder()
         
-    def is_available(self) -> bool:
-        """Check if Ollama service is available"""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
-            return response.status_code == 200
-        except Exception as e:
-            logger.warning(f"Ollama not available: {e}")
-            return False
+    def is_available(self, wait: bool = True) -> bool:
+        """Check if Ollama service is available (cached, refreshed in the background)"""
+        return self.endpoint.is_available(wait)
     
     def list_models(self) -> List[str]:
         """List available models in Ollama"""
+        if self.endpoint.breaker.is_open():
+            return []
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=15)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 return [model['name'] for model in data.get('models', [])]
@@ -40,47 +202,156 @@ class OllamaClient:
             logger.error(f"Error listing models: {e}")
             return []
     
+    def _generate_payload(self, prompt: str, context: List[Dict], stream: bool) -> Tuple[Dict[str, Any], Dict]:
+        """Corps de /api/generate et statistiques du prompt, journalisées après la génération"""
+        full_prompt, prompt_stats = self._build_rag_prompt(prompt, context or [])
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": stream,
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.max_tokens,
+                "top_p": 0.9,
+                "top_k": 40,
+                "stop": ["Human:", "Assistant:", "User:", "Bot:"]
+            }
+        }, prompt_stats
+
+    def _log_generation(self, prompt_stats: Dict, result: Dict, elapsed: float):
+        """Tokens du prompt (estimés avant envoi, comptés par Ollama) et durée de la génération"""
+        metrics.increment('llm.prompt_tokens', prompt_stats['prompt_tokens'])
+        if prompt_stats.get('truncated'):
+            metrics.increment('llm.prompt_truncated')
+        logger.info(
+            f"LLM generation: {prompt_stats['prompt_tokens']} prompt tokens "
+            f"({'tokenizer' if prompt_stats['exact'] else 'estimated'}, Ollama: {result.get('prompt_eval_count', '?')}), "
+            f"{result.get('eval_count', '?')} generated, "
+            f"context {prompt_stats.get('used', 0)}/{prompt_stats.get('documents', 0)} documents "
+            f"({prompt_stats.get('duplicates', 0)} duplicates{', truncated' if prompt_stats.get('truncated') else ''}), "
+            f"{elapsed * 1000:.0f} ms"
+        )
+
+    @contextmanager
+    def _generation_slot(self):
+        """Créneau de génération : sémaphore partagé puis disjoncteur, qui reçoit le résultat"""
+        if not self.endpoint.semaphore.acquire(timeout=self.queue_timeout):
+            metrics.increment('llm.queue_timeouts')
+            raise LLMUnavailable("too many concurrent generations")
+        try:
+            if not self.endpoint.breaker.allow():
+                metrics.increment('llm.circuit_skips')
+                raise LLMUnavailable("circuit open")
+            try:
+                yield
+            except (requests.exceptions.RequestException, ValueError):
+                self.endpoint.breaker.record_failure()
+                raise
+            except BaseException:
+                # Le serveur a répondu (arrêt du flux par le client, par exemple)
+                self.endpoint.breaker.record_success()
+                raise
+            self.endpoint.breaker.record_success()
+        finally:
+            self.endpoint.semaphore.release()
+
+    def generate_response_stream(self, prompt: str, context: List[Dict] = None) -> Iterator[str]:
+        """Tokens bruts de la réponse, lus au fil du flux NDJSON d'Ollama
+
+        Le temps jusqu'au premier token (llm.ttft) et la durée totale (llm.total)
+        sont mesurés séparément. Les erreurs HTTP et réseau sont levées à l'appelant,
+        LLMUnavailable si le circuit est ouvert ou qu'aucun créneau ne se libère.
+        """
+        started = time.perf_counter()
+        first_token = True
+        payload, prompt_stats = self._generate_payload(prompt, context, stream=True)
+        final_chunk: Dict[str, Any] = {}
+        # Le timeout de lecture s'applique entre deux morceaux, pas à toute la génération
+        with self._generation_slot(), self.session.post(
+            f"{self.base_url}/api/generate",
+            json=payload,
+            timeout=(10, self.timeout),
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Ollama API error: {response.status_code} - {response.text}", response=response
+                )
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise requests.exceptions.HTTPError(f"Ollama stream error: {chunk['error']}")
+                token = chunk.get('response', '')
+                if token:
+                    if first_token:
+                        metrics.record_latency('llm.ttft', time.perf_counter() - started)
+                        first_token = False
+                    yield token
+                if chunk.get('done'):
+                    # Le dernier morceau porte prompt_eval_count et eval_count
+                    final_chunk = chunk
+                    break
+        elapsed = time.perf_counter() - started
+        metrics.record_latency('llm.total', elapsed)
+        self._log_generation(prompt_stats, final_chunk, elapsed)
+
     def generate_response(self, prompt: str, context: List[Dict] = None) -> str:
         """Generate response using LLaMA 3 with RAG context"""
+        sink = getattr(_token_sink, 'callback', None)
         try:
-            # Build enhanced prompt with context
-            enhanced_prompt = self._build_rag_prompt(prompt, context or [])
-            
-            payload = {
-                "model": self.model,
-                "prompt": enhanced_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens,
-                    "top_p": 0.9,
-                    "top_k": 40,
-                    "stop": ["Human:", "Assistant:", "User:", "Bot:"]
-                }
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
+            if sink is not None:
+                tokens = []
+                try:
+                    for token in self.generate_response_stream(prompt, context):
+                        tokens.append(token)
+                        sink(token)
+                finally:
+                    on_end = getattr(_token_sink, 'on_end', None)
+                    if on_end is not None:
+                        on_end()
+                return self._clean_response(''.join(tokens))
+
+            started = time.perf_counter()
+            payload, prompt_stats = self._generate_payload(prompt, context, stream=False)
+            with self._generation_slot():
+                response = self.session.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    timeout=self.timeout
+                )
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(
+                        f"Ollama API error: {response.status_code} - {response.text}", response=response
+                    )
                 result = response.json()
-                return self._clean_response(result.get('response', ''))
-            else:
-                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-                return "Désolé, le service LLM n'est pas disponible actuellement."
+            elapsed = time.perf_counter() - started
+            metrics.record_latency('llm.total', elapsed)
+            self._log_generation(prompt_stats, result, elapsed)
+            return self._clean_response(result.get('response', ''))
                 
+        except LLMUnavailable as e:
+            logger.warning(f"LLM skipped: {e}")
+            return UNAVAILABLE_RESPONSE
+        except requests.exceptions.HTTPError as e:
+            logger.error(str(e))
+            return UNAVAILABLE_RESPONSE
         except requests.exceptions.Timeout:
             logger.error("Ollama request timeout")
-            return "La génération de réponse a pris trop de temps. Veuillez réessayer avec une question plus simple."
+            return TIMEOUT_RESPONSE
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "Une erreur est survenue lors de la génération de la réponse."
+            return ERROR_RESPONSE
     
-    def _build_rag_prompt(self, query: str, context: List[Dict]) -> str:
-        """Build enhanced prompt with RAG context and strong anti-hallucination rules"""
+    def _build_rag_prompt(self, query: str, context: List[Dict]) -> Tuple[str, Dict]:
+        """Build enhanced prompt with RAG context and strong anti-hallucination rules
+
+        Le contexte est compressé pour que le prompt tienne dans OLLAMA_PROMPT_TOKENS ;
+        renvoie aussi les statistiques de l'assemblage.
+        """
+        counter = self.prompt_builder.counter
+        stats: Dict[str, Any] = {'exact': counter.exact}
         system_prompt = """Tu es ParcInfo, un assistant IA amical et professionnel pour la gestion du parc informatique et bureautique.
 
 TON ET PERSONNALITÉ :
@@ -106,26 +377,27 @@ EXEMPLES DE TON :
 
 CONTEXTE DISPONIBLE : Utilise les informations fournies pour donner des réponses précises et utiles."""
 
+        context_text = ''
         if context:
             # Filter and prioritize context (amélioré pour une meilleure pertinence)
             relevant_context = self._filter_relevant_context(query, context)
-            
-            if relevant_context:
-                context_text = "\n".join([
-                    f"• {item.get('content', '')} (Score de pertinence : {item.get('score', 0):.2f})" 
-                    for item in relevant_context[:5]  # Top 5 pour plus de contexte sans surcharge
-                ])
-                
-                prompt = f"""{system_prompt}
+            head = f"""{system_prompt}
 
 CONTEXTE STRICT (NE PAS UTILISER AUTRE CHOSE) :
-{context_text}
+"""
+            tail = f"""
 
 QUESTION UTILISATEUR : {query}
 
 RÉPONSE BASÉE EXCLUSIVEMENT SUR LE CONTEXTE :"""
-            else:
-                prompt = f"""{system_prompt}
+            budget = self.prompt_tokens - counter.count(head) - counter.count(tail)
+            context_text, pack_stats = self.prompt_builder.pack_context(query, relevant_context, budget)
+            stats.update(pack_stats)
+
+        if context_text:
+            prompt = head + context_text + tail
+        elif context:
+            prompt = f"""{system_prompt}
 
 QUESTION : {query}
 
@@ -137,7 +409,8 @@ QUESTION : {query}
 
 RÉPONSE : Aucune donnée disponible pour répondre à cette question."""
         
-        return prompt
+        stats['prompt_tokens'] = counter.count(prompt)
+        return prompt, stats
     
     def _filter_relevant_context(self, query: str, context: List[Dict]) -> List[Dict]:
         """Enhanced context filtering with intelligent relevance scoring"""
@@ -191,22 +464,17 @@ RÉPONSE : Aucune donnée disponible pour répondre à cette question."""
             elif metadata.get('strategy') == 'semantic':
                 score += 0.1
             
-            # Content length bonus (prefer detailed content)
-            if len(content) > 200:
-                score += 0.1
-            
             scored_context.append((item, score))
         
-        # Sort by score and return top results
+        # Sort by score: le budget de tokens du prompt décide du nombre de documents gardés
         scored_context.sort(key=lambda x: x[1], reverse=True)
         
-        # Return top 5 most relevant items
-        return [item for item, score in scored_context[:5]]
+        return [item for item, score in scored_context]
     
     def _clean_response(self, response: str) -> str:
         """Clean and format LLM response"""
         if not response:
-            return "Je n'ai pas pu générer une réponse appropriée."
+            return EMPTY_RESPONSE
         
         response = response.strip()
         
@@ -283,6 +551,7 @@ RÉPONSE : Aucune donnée disponible pour répondre à cette question."""
                 'response': response,
                 'sources': sources,
                 'context_used': len(context),
+                'generated': response not in FAILED_RESPONSES,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -326,8 +595,11 @@ class RAGChatbot:
             rag_results = self.rag.semantic_search(query, top_k=5)
             
             if rag_results:
-                # Use LLM with RAG context
-                chat_result = self.llm.chat_with_context(query, rag_results)
+                # Use LLM with RAG context (réponse en cache pour une reformulation sur les mêmes documents)
+                chat_result, _ = get_semantic_cache().get_or_generate(
+                    self.rag.embed_query(query), rag_results,
+                    lambda: self.llm.chat_with_context(query, rag_results),
+                )
                 return {
                     'response': chat_result['response'] + "\n*Source : modèle Llama 3 avec recherche contextuelle*",
                     'method': 'rag_llm',
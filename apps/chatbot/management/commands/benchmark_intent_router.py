@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the compiled intent router against the sequential rule evaluation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries',
+            help='Query file: JSON lines (query, question or title field) or one query per line',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of passes over the query set (default: 20)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of most frequently hit rules to display (default: 10)',
+        )
+
+    def _load_queries(self, path):
+        queries = []
+        try:
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line.startswith('{'):
+                        record = json.loads(line)
+                        line = record.get('query') or record.get('question') or record.get('title') or ''
+                    if line:
+                        queries.append(line.lower())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read queries from {path}: {e}")
+        if not queries:
+            raise CommandError(f"No queries found in {path}")
+        return queries
+
+    def _time(self, fn, queries, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                fn(query)
+        return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+    def handle(self, *args, **options):
+        from apps.chatbot.core_chatbot import ParcInfoChatbot
+
+        queries = self._load_queries(options['queries'])
+        router = ParcInfoChatbot(warmup='none')._intent_router
+        repeat = options['repeat']
+
+        mismatches = [q for q in queries if router.score(q) != router.score_sequential(q)]
+        router.reset_stats()
+
+        sequential_us = self._time(router.score_sequential, queries, repeat)
+        compiled_us = self._time(router.score, queries, repeat)
+        stats = router.get_stats(options['top'])
+
+        self.stdout.write(f"📊 {len(queries)} queries x {repeat} passes")
+        self.stdout.write(f"   Sequential rules : {sequential_us:8.1f} µs/query")
+        self.stdout.write(f"   Compiled router  : {compiled_us:8.1f} µs/query")
+        self.stdout.write(self.style.SUCCESS(f"   Speed-up         : x{sequential_us / compiled_us:.1f}"))
+        evaluated = stats.get('regex_evaluated', 0)
+        skipped = stats.get('regex_skipped', 0)
+        if evaluated + skipped:
+            self.stdout.write(f"   Regex evaluated  : {evaluated / (evaluated + skipped):.1%} (prefilter skipped the rest)")
+        self.stdout.write("🔝 Most frequently hit rules:")
+        for rule, count in stats['top_rules']:
+            self.stdout.write(f"   {count:6d}  {rule}")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"❌ {len(mismatches)} queries scored differently:"))
+            for query in mismatches[:10]:
+                self.stdout.write(f"   - {query}")
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Identical scores for every query"))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+import statistics
+import time
+
+from apps.chatbot.intent_backends import BACKEND_CHOICES
+
+
+class Command(BaseCommand):
+    help = 'Compare intent backends on accuracy and per-query latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            default=BACKEND_CHOICES,
+            choices=BACKEND_CHOICES,
+            help='Backends to evaluate (default: all)',
+        )
+        parser.add_argument(
+            '--dataset',
+            help='JSON lines file with {"query": ..., "intent": ...} (default: corpus validation set); '
+                 'labels are mapped to intent_handlers keys before scoring',
+        )
+
+    def _load_dataset(self, path):
+        """(requête, clé de handler) : le score porte sur l'intent effectivement routé"""
+        from apps.chatbot.intent_corpus import PARCINFO_VALIDATION_DATA, routing_examples
+        if not path:
+            return routing_examples(PARCINFO_VALIDATION_DATA)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                rows = [json.loads(line) for line in handle if line.strip()]
+            return routing_examples((row['query'], row['intent']) for row in rows)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read dataset {path}: {e}")
+
+    def handle(self, *args, **options):
+        from apps.chatbot.core_chatbot import ParcInfoChatbot
+
+        dataset = self._load_dataset(options['dataset'])
+        if not dataset:
+            raise CommandError("No labelled query maps to an intent handler")
+        self.stdout.write(f"📊 {len(dataset)} labelled queries\n")
+        self.stdout.write(f"{'backend':<18}{'accuracy':>10}{'p50 ms':>10}{'p95 ms':>10}{'warmup s':>10}")
+
+        for name in options['backends']:
+            chatbot = ParcInfoChatbot(warmup='none', intent_backend=name)
+            start = time.perf_counter()
+            chatbot.warm_up()
+            load_time = time.perf_counter() - start
+            if name != 'rules' and chatbot.intent_backend is None:
+                self.stdout.write(self.style.WARNING(f"{name:<18}unavailable (see logs)"))
+                continue
+
+            latencies, correct = [], 0
+            for query, expected in dataset:
+                start = time.perf_counter()
+                result = chatbot._classify_intent(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                correct += result.get('intent') == expected
+
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f"{name:<18}{correct / len(dataset):>10.1%}{statistics.median(latencies):>10.1f}"
+                f"{p95:>10.1f}{load_time:>10.1f}"
+            )
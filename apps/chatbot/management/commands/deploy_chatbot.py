@@ -94,6 +94,7 @@ class Command(BaseCommand):
         required_extensions = {
             'vector': 'pgvector (pour les embeddings vectoriels)',
             'pg_trgm': 'pg_trgm (pour la recherche textuelle)',
+            'unaccent': 'unaccent (pour la recherche plein texte sans accents)',
             'uuid-ossp': 'uuid-ossp (pour les UUID)'
         }
 
@@ -201,11 +202,11 @@ class Command(BaseCommand):
 
     def _run_tests(self):
         """Exécute des tests avec validation anti-hallucination - Critical Fix"""
-        from apps.chatbot.core_chatbot import get_chatbot
+        from apps.chatbot.core_chatbot import warm_up_chatbot
         from apps.fournisseurs.models import Fournisseur
 
         self.stdout.write("\n🔧 Exécution des tests avec validation anti-hallucination...")
-        chatbot = get_chatbot()
+        chatbot = warm_up_chatbot()
 
         # Tests d'intention standard
         intent_tests = [
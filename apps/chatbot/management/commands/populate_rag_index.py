@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
-from apps.chatbot.rag_manager import RAGManager
+from apps.chatbot.rag_manager import RAGManager, INDEX_BATCH_SIZE
+from apps.chatbot.content_embeddings import get_content_embeddings
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +18,34 @@ class Command(BaseCommand):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=100,
-            help='Batch size for indexing (default: 100)',
+            default=INDEX_BATCH_SIZE,
+            help=f'Objects read, embedded and upserted per batch; bounds peak memory (default: {INDEX_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--quiet-progress',
+            action='store_true',
+            help='Do not print per-batch progress',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Index in N processes, sharding models and primary-key ranges (default: 1)',
+        )
+        parser.add_argument(
+            '--check-queries',
+            action='store_true',
+            help='Fail if building a batch runs more SQL queries than the model related spec allows (N+1 check)',
         )
 
     def handle(self, *args, **options):
         self.stdout.write("🔄 Starting RAG index population...")
         
         try:
-            rag_manager = RAGManager()
+            # En mode parallèle, chaque processus charge son propre encodeur
+            rag_manager = RAGManager(load_model=options['workers'] <= 1)
+            if options['check_queries']:
+                rag_manager.check_queries = True
             
             if options['clear']:
                 self.stdout.write("🗑️  Clearing existing index...")
@@ -32,7 +53,13 @@ class Command(BaseCommand):
             
             # Populate index with all models
             self.stdout.write("📚 Populating index with all models...")
-            rag_manager.populate_index()
+            start = time.time()
+            progress = None if options['quiet_progress'] else self.report_progress
+            if options['workers'] > 1:
+                self.stdout.write(f"🔀 {options['workers']} worker processes")
+            rag_manager.populate_index(batch_size=options['batch_size'], progress=progress,
+                                       workers=options['workers'])
+            elapsed = time.time() - start
             
             # Get final count
             final_count = rag_manager.get_rag_count()
@@ -41,9 +68,11 @@ class Command(BaseCommand):
                 self.style.SUCCESS(
                     f"✅ RAG index populated successfully!\n"
                     f"🔢 RAG vectors: {final_count}\n"
+                    f"⏱️  {elapsed:.1f}s ({final_count / elapsed if elapsed else 0:.0f} docs/s)\n"
                     f"📚 All models indexed successfully"
                 )
             )
+            self.report_dedupe()
             
         except Exception as e:
             logger.error(f"Error populating RAG index: {e}")
@@ -51,3 +80,18 @@ class Command(BaseCommand):
                 self.style.ERROR(f"❌ Error populating RAG index: {str(e)}")
             )
             raise
+
+    def report_dedupe(self):
+        stats = get_content_embeddings().get_stats()
+        if stats['encoded'] or stats['reused']:
+            self.stdout.write(
+                f"♻️  {stats['reused']} embeddings reused, {stats['encoded']} encoded "
+                f"(dedupe {stats['dedupe_ratio']:.1%}, ~{stats['seconds_saved']:.1f}s of encoding saved)"
+            )
+
+    def report_progress(self, progress):
+        total = progress['total'] or progress['processed']
+        self.stdout.write(
+            f"  {progress['model']}: {progress['processed']}/{total} "
+            f"({progress['embedded']} embedded, {progress['rate']:.0f} obj/s)"
+        )
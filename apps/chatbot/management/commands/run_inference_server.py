@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import logging
+
+from apps.chatbot.inference_server import InferenceModels, create_server
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the shared local inference server hosting the chatbot NLP models'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default=getattr(settings, 'CHATBOT_INFERENCE_HOST', '127.0.0.1'),
+            help='Bind address (default: CHATBOT_INFERENCE_HOST)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=getattr(settings, 'CHATBOT_INFERENCE_PORT', 8765),
+            help='Port (default: CHATBOT_INFERENCE_PORT)',
+        )
+        parser.add_argument(
+            '--zero-shot',
+            action='store_true',
+            default=getattr(settings, 'CHATBOT_INFERENCE_ZERO_SHOT', False),
+            help='Also load the BART zero-shot classifier',
+        )
+        parser.add_argument(
+            '--max-batch-size',
+            type=int,
+            default=64,
+            help='Maximum number of requests per micro-batch (default: 64)',
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=float,
+            default=getattr(settings, 'CHATBOT_INFERENCE_MAX_WAIT_MS', 5.0),
+            help='Time to wait for more requests before running a batch (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        models = InferenceModels(
+            enable_zero_shot=options['zero_shot'],
+            max_batch_size=options['max_batch_size'],
+            max_wait_ms=options['max_wait_ms'],
+        )
+        self.stdout.write("🔄 Loading NLP models...")
+        models.load()
+
+        server = create_server(options['host'], options['port'], models)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Inference server listening on http://{options['host']}:{options['port']}\n"
+                f"💡 Set CHATBOT_INFERENCE_URL=http://{options['host']}:{options['port']} for the web workers"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Stopping inference server")
+        finally:
+            server.server_close()
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+import logging
+import time
+
+from apps.chatbot.rag_indexer import OutboxWorker
+from apps.chatbot.rag_manager import RAGManager
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the incremental RAG indexer (outbox worker), or reconcile the index with the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox once and exit',
+        )
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help='Diff the database against the index (modification dates / content hashes), then exit',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='With --reconcile, rebuild every content and compare hashes (catches related-object changes)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Outbox rows per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Polling interval in seconds when the outbox is empty (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        rag = RAGManager()
+        if not rag.embed_model:
+            raise CommandError("Embedding model not available")
+
+        if options['reconcile']:
+            start = time.time()
+            self.stdout.write("🔄 Reconciling RAG index with the database...")
+            stats = rag.reconcile(full=options['full'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Reconciled in {time.time() - start:.1f}s: {stats['indexed']} embedded, "
+                f"{stats['unchanged']} unchanged, {stats['deleted']} removed"
+            ))
+            return
+
+        worker = OutboxWorker(rag, batch_size=options['batch_size'])
+        if options['once']:
+            stats = worker.drain()
+            self.stdout.write(self.style.SUCCESS(f"✅ Outbox drained: {stats}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS("✅ RAG indexer running (Ctrl+C to stop)"))
+        try:
+            worker.run_forever(interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Stopping RAG indexer")
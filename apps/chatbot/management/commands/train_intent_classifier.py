@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Train the MiniLM + logistic regression intent classifier (embedding_logreg backend)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=getattr(settings, 'CHATBOT_INTENT_MODEL_PATH', 'models/intent_classifier.joblib'),
+            help='Where to save the classifier (default: CHATBOT_INTENT_MODEL_PATH)',
+        )
+        parser.add_argument(
+            '--c',
+            type=float,
+            default=4.0,
+            help='Inverse regularization strength (default: 4.0)',
+        )
+
+    def handle(self, *args, **options):
+        from apps.chatbot.core_chatbot import ParcInfoChatbot
+        from apps.chatbot.intent_corpus import PARCINFO_VALIDATION_DATA, check_handled, routing_examples
+        from apps.chatbot.intent_backends import collect_training_examples, train_embedding_classifier
+
+        chatbot = ParcInfoChatbot(warmup='none')
+        embedding_model = chatbot.rag.load_embedding_model()
+        if embedding_model is None:
+            raise CommandError("Embedding model unavailable")
+
+        handler_intents = list(chatbot.intent_handlers)
+        examples = collect_training_examples(chatbot._default_intent_examples(), handler_intents)
+        intents = {intent for _, intent, _ in examples}
+        try:
+            check_handled(intents, handler_intents)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if len(intents) < 2:
+            raise CommandError("At least two intents are needed to train a classifier")
+        self.stdout.write(f"📚 {len(examples)} training examples collected")
+
+        metrics = train_embedding_classifier(
+            embedding_model, examples, options['output'], C=options['c'], validation=routing_examples(PARCINFO_VALIDATION_DATA)
+        )
+        self.stdout.write(f"🔢 Intents: {metrics['n_intents']}")
+        if 'cv_accuracy' in metrics:
+            self.stdout.write(f"🎯 Cross-validation accuracy: {metrics['cv_accuracy']:.1%}")
+        if 'validation_accuracy' in metrics:
+            self.stdout.write(f"🎯 Validation accuracy: {metrics['validation_accuracy']:.1%}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Classifier saved to {options['output']}\n"
+                f"💡 Enable it with CHATBOT_INTENT_BACKEND=embedding_logreg"
+            )
+        )
@@ -0,0 +1,142 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chatbot import vector_index
+
+# Valeurs essayées par le benchmark, selon le type d'index
+PROBES_VALUES = [1, 2, 4, 8, 16, 32, 64]
+EF_SEARCH_VALUES = [20, 40, 64, 100, 200, 400]
+
+
+class Command(BaseCommand):
+    help = 'Size, rebuild and benchmark the pgvector ANN index of chatbot_documentvector'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            choices=['auto', 'hnsw', 'ivfflat'],
+            default='auto',
+            help='Index type; auto picks from the row count (default: auto)',
+        )
+        parser.add_argument(
+            '--storage',
+            choices=['full', 'halfvec', 'binary'],
+            default=None,
+            help='Indexed representation; halfvec and binary are reranked at full precision '
+                 '(default: CHATBOT_VECTOR_STORAGE)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild the index concurrently if it differs from the recommendation',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='With --rebuild, rebuild even if the index already matches',
+        )
+        parser.add_argument(
+            '--partial',
+            action='store_true',
+            help='With --rebuild, also create/drop the per-model partial indexes',
+        )
+        parser.add_argument(
+            '--partial-min-rows',
+            type=int,
+            default=vector_index.PARTIAL_INDEX_MIN_ROWS,
+            help=f'Active documents needed for a per-model partial index (default: {vector_index.PARTIAL_INDEX_MIN_ROWS})',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Measure recall@k and latency against exact search for each probes / ef_search value',
+        )
+        parser.add_argument('--k', type=int, default=10, help='k for recall@k (default: 10)')
+        parser.add_argument('--queries', type=int, default=100, help='Sampled query vectors (default: 100)')
+        parser.add_argument(
+            '--recall',
+            type=float,
+            default=0.95,
+            help='Recall@k target used to pick the setting (default: 0.95)',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0,
+            help='p95 latency budget in ms; 0 for no budget (default: 0)',
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='With --benchmark, store the picked setting for semantic_search',
+        )
+
+    def handle(self, *args, **options):
+        rows = vector_index.count_rows()
+        current = vector_index.current_index()
+        wanted = vector_index.recommend_index(rows, options['type'], options['storage'])
+
+        self.stdout.write(f"📊 {rows} documents")
+        self.stdout.write(f"   Current index     : {self._describe(current)}")
+        self.stdout.write(f"   Recommended index : {self._describe(wanted)}")
+        self.stdout.write(f"   Search params     : {vector_index.get_search_params()}")
+        for name in sorted(vector_index.partial_indexes()):
+            self.stdout.write(f"   Partial index     : {name}")
+
+        if options['rebuild']:
+            if vector_index.index_matches(current, wanted) and not options['force']:
+                self.stdout.write(self.style.SUCCESS("✅ Index already matches the recommendation"))
+            else:
+                self.stdout.write("🔨 Rebuilding index concurrently...")
+                current = vector_index.rebuild_index(wanted)
+                self.stdout.write(self.style.SUCCESS(f"✅ Index rebuilt: {self._describe(current)}"))
+            if options['partial']:
+                changes = vector_index.ensure_partial_indexes(options['type'], options['partial_min_rows'],
+                                                              options['storage'])
+                for name in changes['created']:
+                    self.stdout.write(self.style.SUCCESS(f"✅ Partial index created: {name}"))
+                for name in changes['dropped']:
+                    self.stdout.write(f"🗑️  Partial index dropped: {name}")
+
+        if options['benchmark']:
+            self._benchmark(current, options)
+
+    def _benchmark(self, current, options):
+        if current is None:
+            raise CommandError("No ANN index to benchmark, run with --rebuild first")
+        values = PROBES_VALUES if current['type'] == 'ivfflat' else EF_SEARCH_VALUES
+        if current['type'] == 'ivfflat':
+            values = [value for value in values if value <= current['lists']]
+        results = vector_index.benchmark_recall(values, k=options['k'], queries=options['queries'])
+        if not results:
+            raise CommandError("Index is empty, nothing to benchmark")
+
+        self.stdout.write(f"🎯 recall@{options['k']} vs exact search ({options['queries']} queries)")
+        for result in results:
+            self.stdout.write(
+                f"   {result['knob']} = {result['value']:4d}  recall {result['recall']:.3f}  "
+                f"p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms"
+            )
+
+        picked = vector_index.pick_setting(results, options['recall'], options['latency_ms'])
+        if picked is None:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ No setting reaches recall {options['recall']} within the latency budget"
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Picked {picked['knob']} = {picked['value']}"))
+        if options['apply']:
+            key = 'probes' if current['type'] == 'ivfflat' else 'ef_search'
+            vector_index.save_tuning({
+                'index': {k: v for k, v in current.items() if k not in ('name', 'opclass')},
+                key: picked['value'],
+                'recall': picked['recall'],
+                'p95_ms': picked['p95_ms'],
+            })
+            self.stdout.write("💾 Setting stored for semantic_search")
+
+    @staticmethod
+    def _describe(index):
+        if index is None:
+            return 'none'
+        params = ', '.join(f"{k}={v}" for k, v in index.items() if k not in ('type', 'name'))
+        return f"{index['type']} ({params})"
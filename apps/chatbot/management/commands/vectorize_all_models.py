@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from django.db import connection
 from apps.chatbot.auto_vectorization import vectorize_all_models
 from apps.chatbot.models import DocumentVector
+from apps.chatbot.content_embeddings import get_content_embeddings
 
 
 class Command(BaseCommand):
@@ -25,6 +26,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Simulation sans exécution réelle'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Nombre de processus d\'indexation (modèles et plages de clés répartis)'
+        )
         parser.add_argument(
             '--stats',
             action='store_true',
@@ -57,7 +64,7 @@ class Command(BaseCommand):
         
         try:
             # Exécution de la vectorisation
-            final_count = vectorize_all_models()
+            final_count = vectorize_all_models(workers=options['workers'])
             
             # Calcul du temps d'exécution
             execution_time = time.time() - start_time
@@ -71,6 +78,12 @@ class Command(BaseCommand):
             self.stdout.write(f"⏱️  Temps d'exécution: {execution_time:.2f}s")
             self.stdout.write(f"📈 Vecteurs générés: {final_count}")
             self.stdout.write(f"🔄 Différence: +{final_count - initial_count}")
+            dedupe = get_content_embeddings().get_stats()
+            if dedupe['encoded'] or dedupe['reused']:
+                self.stdout.write(
+                    f"♻️  Embeddings réutilisés: {dedupe['reused']}, encodés: {dedupe['encoded']} "
+                    f"(déduplication {dedupe['dedupe_ratio']:.1%}, ~{dedupe['seconds_saved']:.1f}s économisées)"
+                )
             
             # Validation de la cohérence
             self.validate_coherence()
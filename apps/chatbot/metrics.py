@@ -0,0 +1,60 @@
+"""
+Compteurs et latences du chatbot ParcInfo
+Mesures en mémoire, propres au processus, exposées par get_system_status()
+et la vue chatbot_status.
+"""
+
+import threading
+from collections import Counter, deque
+from typing import Deque, Dict
+
+# Nombre d'échantillons conservés par mesure de latence
+LATENCY_WINDOW = 1000
+
+_counters: Counter = Counter()
+_latencies: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+
+
+def increment(name: str, amount: int = 1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get_counters() -> Dict[str, int]:
+    with _lock:
+        return dict(_counters)
+
+
+def record_latency(name: str, seconds: float):
+    with _lock:
+        samples = _latencies.get(name)
+        if samples is None:
+            samples = _latencies[name] = deque(maxlen=LATENCY_WINDOW)
+        samples.append(seconds)
+
+
+def _percentile(ordered, fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def get_latencies() -> Dict[str, Dict[str, float]]:
+    """p50/p95/max en millisecondes sur les LATENCY_WINDOW derniers appels"""
+    with _lock:
+        snapshot = {name: sorted(samples) for name, samples in _latencies.items() if samples}
+    return {
+        name: {
+            'count': len(ordered),
+            'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(ordered, 0.95) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2),
+        }
+        for name, ordered in snapshot.items()
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _latencies.clear()
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-16 14:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY ne s'exécute pas dans une transaction
+    atomic = False
+
+    dependencies = [
+        ("chatbot", "0007_documentvector_content_hash_indexoutbox"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name="documentvector",
+                    name="embedding_idx",
+                ),
+            ],
+        ),
+        # IvfflatIndex(lists=100) sans opclass : vector_l2_ops, inutilisable pour les tris par
+        # distance cosinus. DDL figée ici ; la taille et le type d'index selon le volume
+        # relèvent ensuite de manage.py tune_vector_index.
+        migrations.RunSQL(
+            sql=[
+                "DROP INDEX CONCURRENTLY IF EXISTS embedding_idx",
+                """
+                CREATE INDEX CONCURRENTLY embedding_idx ON chatbot_documentvector
+                USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+                """,
+            ],
+            reverse_sql=[
+                "DROP INDEX CONCURRENTLY IF EXISTS embedding_idx",
+                """
+                CREATE INDEX CONCURRENTLY embedding_idx ON chatbot_documentvector
+                USING ivfflat (embedding) WITH (lists = 100)
+                """,
+            ],
+        ),
+    ]
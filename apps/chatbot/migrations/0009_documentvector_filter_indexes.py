@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-16 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0008_documentvector_tuned_vector_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="documentvector",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["model_name", "priority"],
+                name="docvec_model_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="documentvector",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["app_label", "priority"],
+                name="docvec_app_active_idx",
+            ),
+        ),
+    ]
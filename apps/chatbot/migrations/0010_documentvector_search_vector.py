@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-16 16:02
+
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+# unaccent() n'est pas IMMUTABLE : colonne générée et index d'expression passent par ce wrapper
+UNACCENT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION chatbot_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0009_documentvector_filter_indexes"),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql=[
+                UNACCENT_FUNCTION,
+                """
+                ALTER TABLE chatbot_documentvector ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (to_tsvector('french'::regconfig, chatbot_unaccent(content))) STORED
+                """,
+                "CREATE INDEX docvec_search_vector_idx ON chatbot_documentvector USING gin (search_vector)",
+                """
+                CREATE INDEX docvec_content_trgm_idx ON chatbot_documentvector
+                USING gin (chatbot_unaccent(lower(content)) gin_trgm_ops)
+                """,
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS docvec_content_trgm_idx",
+                "DROP INDEX IF EXISTS docvec_search_vector_idx",
+                "ALTER TABLE chatbot_documentvector DROP COLUMN IF EXISTS search_vector",
+                "DROP FUNCTION IF EXISTS chatbot_unaccent(text)",
+            ],
+        ),
+    ]
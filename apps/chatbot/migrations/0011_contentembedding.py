@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-16 16:48
+
+import pgvector.django
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0010_documentvector_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentEmbedding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                ("model_name", models.CharField(max_length=100)),
+                ("embedding", pgvector.django.VectorField(dimensions=384)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "unique_together": {("content_hash", "model_name")},
+            },
+        ),
+    ]
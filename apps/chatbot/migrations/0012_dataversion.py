@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-16 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chatbot", "0011_contentembedding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table_name", models.CharField(max_length=100, unique=True)),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
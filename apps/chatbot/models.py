@@ -1,6 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from pgvector.django import VectorField, IvfflatIndex
+from pgvector.django import VectorField
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
@@ -28,7 +29,9 @@ class DocumentVector(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
 
     content = models.TextField()
+    content_hash = models.CharField(max_length=64, blank=True, default='')
     embedding = VectorField(dimensions=384)
+    # Colonne search_vector (tsvector générée) et index GIN lexicaux : migration 0010
 
     model_name = models.CharField(max_length=100)
     app_label = models.CharField(max_length=100)
@@ -42,11 +45,49 @@ class DocumentVector(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['content_type', 'object_id']),
-            IvfflatIndex(fields=['embedding'], name='embedding_idx', lists=100),
+            # Filtres de semantic_search (documents actifs uniquement)
+            models.Index(fields=['model_name', 'priority'], condition=models.Q(is_active=True),
+                         name='docvec_model_active_idx'),
+            models.Index(fields=['app_label', 'priority'], condition=models.Q(is_active=True),
+                         name='docvec_app_active_idx'),
+            # Index ANN sur embedding : type et paramètres gérés par vector_index / tune_vector_index
         ]
         unique_together = ['content_type', 'object_id']
 
 
+class ContentEmbedding(models.Model):
+    """Embedding d'un texte normalisé, partagé par tous les contenus identiques (voir content_embeddings)"""
+    content_hash = models.CharField(max_length=64)
+    model_name = models.CharField(max_length=100)
+    embedding = VectorField(dimensions=384)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['content_hash', 'model_name']
+
+
+class IndexOutbox(models.Model):
+    """Objets à réindexer dans le RAG, écrits dans la transaction qui les modifie"""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_pk = models.CharField(max_length=64)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        unique_together = ['content_type', 'object_pk']
+        indexes = [
+            models.Index(fields=['available_at']),
+        ]
+
+
+class DataVersion(models.Model):
+    """Version d'une table métier, partagée par tous les processus (voir response_cache)"""
+    table_name = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+
+
 class ChatbotInteraction(models.Model):
     session_id = models.CharField(max_length=100)
     user_query = models.TextField()
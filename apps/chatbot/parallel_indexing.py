@@ -0,0 +1,219 @@
+"""
+Indexation RAG parallèle sur plusieurs processus
+Les modèles, et les plages de clés primaires des gros modèles, sont répartis en
+tranches entre les processus d'un pool. Chaque processus a sa propre connexion
+à la base, son propre encodeur et ses threads torch épinglés sur un sous-ensemble
+des cœurs ; il écrit ses documents par le même chemin COPY + upsert que
+l'indexation séquentielle. Le processus parent fusionne les statistiques et
+retire de l'index les objets supprimés.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import connection
+
+from apps.chatbot import metrics
+
+# rag_manager (et donc torch, numpy) n'est importé qu'à l'usage : dans un processus du pool,
+# OMP_NUM_THREADS / MKL_NUM_THREADS doivent être fixés avant le chargement de ces bibliothèques
+
+logger = logging.getLogger(__name__)
+
+# (app_label, Model, pk minimum inclus, pk maximum exclu) ; None = pas de borne
+Shard = Tuple[str, str, Optional[int], Optional[int]]
+
+_worker_rag = None
+
+
+def _pin_worker(index: int, threads: int):
+    """Limite les threads torch/BLAS du processus et l'épingle sur ses cœurs"""
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        start = (index * threads) % len(cpus)
+        try:
+            os.sched_setaffinity(0, cpus[start:start + threads] or cpus)
+        except OSError as e:
+            logger.warning(f"RAG worker {index}: CPU pinning failed ({e})")
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _init_worker(counter, threads: int, check_queries: bool):
+    """Initialisation d'un processus du pool (démarré par spawn : Django y est rechargé)"""
+    global _worker_rag
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    # Avant django.setup() et rag_manager : leur import charge torch et numpy, qui lisent
+    # OMP_NUM_THREADS / MKL_NUM_THREADS une fois pour toutes
+    _pin_worker(index, threads)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ParcInfo.settings')
+    import django
+    django.setup()
+
+    from apps.chatbot.rag_manager import RAGManager
+    # Encodeur local : le serveur d'inférence partagé sérialiserait les processus
+    _worker_rag = RAGManager(load_model=False)
+    _worker_rag.embed_model = _worker_rag._load_local_model()
+    _worker_rag.check_queries = check_queries
+
+
+def _index_shard(shard: Shard, batch_size: int) -> Dict[str, Any]:
+    """Indexe une tranche dans un processus du pool ; renvoie ses statistiques et les objets vus"""
+    from django.apps import apps
+    app_label, model_name, low, high = shard
+    model = apps.get_model(app_label, model_name)
+    queryset = model.objects.all()
+    if low is not None:
+        queryset = queryset.filter(pk__gte=low)
+    if high is not None:
+        queryset = queryset.filter(pk__lt=high)
+
+    rag = _worker_rag
+    if rag.embed_model is None:
+        raise RuntimeError("embedding model unavailable in worker")
+    content_type_id = rag._get_content_type_id(app_label, model_name)
+    before = metrics.get_counters()
+    seen = set()
+    stats = rag._new_stats(model)
+    rag._index_stream(content_type_id, rag._iter_documents(model, queryset, seen, batch_size), batch_size, stats)
+    return {
+        'model': stats['model'],
+        'processed': stats['processed'],
+        'indexed': stats['indexed'],
+        'unchanged': stats['unchanged'],
+        'deleted': stats['deleted'],
+        'seen': list(seen),
+        # Compteurs de déduplication du processus, reportés dans ceux du parent
+        'counters': {
+            name: value - before.get(name, 0)
+            for name, value in metrics.get_counters().items() if name.startswith('content_embeddings.')
+        },
+    }
+
+
+def plan_shards(models: List[Tuple[str, str]], workers: int,
+                batch_size: Optional[int] = None) -> Tuple[List[Shard], Dict[str, int]]:
+    """Tranches à indexer, les plus grosses en premier, et nombre d'objets par modèle
+
+    Un modèle à clé entière de plus de deux lots est découpé en plages de pk de même
+    largeur (au plus deux par processus) ; les autres forment une tranche chacun.
+    batch_size vaut par défaut INDEX_BATCH_SIZE.
+    """
+    from django.apps import apps
+    from django.db.models import Max, Min
+    from apps.chatbot.rag_manager import INDEX_BATCH_SIZE
+    batch_size = batch_size or INDEX_BATCH_SIZE
+    sized: List[Tuple[int, Shard]] = []
+    totals: Dict[str, int] = {}
+    for app_label, model_name in models:
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            logger.warning(f"RAG sharding: unknown model {app_label}.{model_name}")
+            continue
+        count = model.objects.count()
+        totals[model._meta.label] = count
+        if not count:
+            continue
+        parts = min(workers * 2, count // batch_size)
+        if parts < 2 or model._meta.pk.get_internal_type() not in ('AutoField', 'BigAutoField', 'IntegerField',
+                                                                    'BigIntegerField', 'SmallAutoField'):
+            sized.append((count, (app_label, model_name, None, None)))
+            continue
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        step = (bounds['high'] - bounds['low']) // parts + 1
+        for i in range(parts):
+            low = bounds['low'] + i * step
+            # Première et dernière tranches ouvertes : les objets créés pendant l'indexation y tombent
+            sized.append((count // parts, (app_label, model_name,
+                                           None if i == 0 else low,
+                                           None if i == parts - 1 else low + step)))
+    sized.sort(key=lambda item: item[0], reverse=True)
+    return [shard for _, shard in sized], totals
+
+
+def reconcile_parallel(workers: int, models: Optional[List[Tuple[str, str]]] = None,
+                       batch_size: Optional[int] = None,
+                       progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       check_queries: bool = False) -> Dict[str, int]:
+    """Équivalent de RAGManager.reconcile(full=True) réparti sur workers processus
+
+    progress reçoit, après chaque tranche terminée, l'avancement cumulé de son modèle.
+    Les documents d'un modèle dont une tranche a échoué ne sont pas purgés.
+    """
+    from django.apps import apps
+    from apps.chatbot.rag_manager import INDEX_BATCH_SIZE, RAGManager, get_indexed_models
+    batch_size = batch_size or INDEX_BATCH_SIZE
+    shards, model_totals = plan_shards(models or get_indexed_models(), workers, batch_size)
+    logger.info(f"🔀 RAG indexing: {len(shards)} shards over {workers} processes")
+
+    per_model: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {'processed': 0, 'indexed': 0, 'unchanged': 0, 'deleted': 0, 'seen': set(), 'failed': False}
+    )
+    started = time.perf_counter()
+    threads = max(1, (os.cpu_count() or workers) // workers)
+    context = multiprocessing.get_context('spawn')
+    counter = context.Value('i', 0)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(counter, threads, check_queries)) as pool:
+        futures = {pool.submit(_index_shard, shard, batch_size): shard for shard in shards}
+        for future in as_completed(futures):
+            app_label, model_name, low, high = futures[future]
+            label = apps.get_model(app_label, model_name)._meta.label
+            merged = per_model[label]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Error indexing {label} [{low}, {high}): {e}")
+                merged['failed'] = True
+                continue
+            for key in ('processed', 'indexed', 'unchanged', 'deleted'):
+                merged[key] += result[key]
+            merged['seen'].update(result['seen'])
+            for name, value in result['counters'].items():
+                metrics.increment(name, value)
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress({
+                    'model': label,
+                    'processed': merged['processed'],
+                    'total': model_totals.get(label, 0),
+                    'embedded': merged['indexed'],
+                    'elapsed': elapsed,
+                    'rate': merged['processed'] / elapsed if elapsed > 0 else 0.0,
+                })
+
+    rag = RAGManager(load_model=False)
+    totals = {'indexed': 0, 'unchanged': 0, 'deleted': 0}
+    for app_label, model_name in models or get_indexed_models():
+        try:
+            label = apps.get_model(app_label, model_name)._meta.label
+        except LookupError:
+            continue
+        merged = per_model[label]
+        if not merged['failed']:
+            # Documents d'objets supprimés : présents dans l'index, vus par aucune tranche
+            content_type_id = rag._get_content_type_id(app_label, model_name)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT object_id FROM chatbot_documentvector WHERE content_type_id = %s",
+                               [content_type_id])
+                stale = [row[0] for row in cursor.fetchall() if row[0] not in merged['seen']]
+            merged['deleted'] += rag._delete_documents(content_type_id, stale)
+        logger.info(f"  {label}: {merged['indexed']} embedded, {merged['unchanged']} unchanged, "
+                    f"{merged['deleted']} removed")
+        for key in totals:
+            totals[key] += merged[key]
+    return totals
@@ -0,0 +1,67 @@
+"""
+Chargement en masse PostgreSQL au format COPY binaire
+Les embeddings sont transmis tels quels (float4 big-endian, format de réception
+de pgvector) : ni conversion en texte '[0.1,0.2,...]' ni parsing côté serveur.
+"""
+
+import io
+import struct
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_TRAILER = struct.pack('>h', -1)
+_NULL = struct.pack('>i', -1)
+
+
+def _encode_value(value, column_type: str) -> bytes:
+    if column_type == 'int8':
+        return struct.pack('>q', int(value))
+    if column_type == 'int4':
+        return struct.pack('>i', int(value))
+    if column_type == 'bool':
+        return b'\x01' if value else b'\x00'
+    if column_type == 'text':
+        return str(value).encode('utf-8')
+    if column_type == 'vector':
+        vector = np.asarray(value, dtype='>f4').ravel()
+        return struct.pack('>hh', vector.shape[0], 0) + vector.tobytes()
+    raise ValueError(f"Unsupported COPY column type: {column_type}")
+
+
+def build_binary_copy(rows: Iterable[Sequence], column_types: Sequence[str]) -> io.BytesIO:
+    """Flux COPY ... FROM STDIN WITH (FORMAT binary) pour les lignes données"""
+    parts: List[bytes] = [_HEADER]
+    field_count = struct.pack('>h', len(column_types))
+    for row in rows:
+        parts.append(field_count)
+        for value, column_type in zip(row, column_types):
+            if value is None:
+                parts.append(_NULL)
+                continue
+            data = _encode_value(value, column_type)
+            parts.append(struct.pack('>i', len(data)))
+            parts.append(data)
+    parts.append(_TRAILER)
+    return io.BytesIO(b''.join(parts))
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], column_types: Sequence[str], rows: List[Sequence]):
+    """COPY binaire des lignes dans la table (psycopg2), INSERT multi-lignes sinon"""
+    column_list = ', '.join(columns)
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(
+            f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT binary)",
+            build_binary_copy(rows, column_types),
+        )
+        return
+    placeholders = ', '.join('%s::vector' if t == 'vector' else '%s' for t in column_types)
+    cursor.executemany(
+        f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+        [
+            tuple('[' + ','.join(map(str, v)) + ']' if t == 'vector' and v is not None else v
+                  for v, t in zip(row, column_types))
+            for row in rows
+        ],
+    )
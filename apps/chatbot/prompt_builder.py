@@ -0,0 +1,210 @@
+"""
+Assemblage du contexte RAG sous budget de tokens
+Les documents indexés sont des suites "Champ: valeur" (voir
+RAGManager._build_content_parts). Pour chaque document, par ordre de pertinence,
+seuls l'identifiant et les champs utiles à la question sont gardés, les champs
+déjà fournis par un document mieux classé sur le même objet (même identifiant)
+sont retirés, puis les documents sont
+ajoutés tant que le budget le permet ; le dernier est tronqué champ par champ.
+"""
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Repli sans tokenizer : ~3,5 caractères par token pour du français avec Llama 3
+CHARS_PER_TOKEN = 3.5
+MAX_VALUE_CHARS = 160
+# Champs gardés quand aucun ne correspond à la question (question générale sur un objet)
+DEFAULT_FIELDS = 4
+# Document ignoré si son identifiant est déjà dans le contexte avec cette part de ses champs
+DUPLICATE_OVERLAP = 0.8
+
+# "Numéro série: ", "Date fin garantie calculée: ", "ICE: " ; les mots suivant le premier
+# sont en minuscules, pour qu'une valeur ("Dell Maroc Adresse: ") ne déborde pas sur le libellé
+FIELD_LABEL = re.compile(
+    r"(?<!\S)(IF Fiscal|Registre Commerce|[A-ZÀ-Ý][\wÀ-ÿ']*(?: [a-zà-ÿ][\wà-ÿ']*){0,4}):\s"
+)
+WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    'les', 'des', 'une', 'est', 'sont', 'pour', 'dans', 'avec', 'quel', 'quels', 'quelle', 'quelles',
+    'que', 'quoi', 'combien', 'liste', 'lister', 'donne', 'moi', 'mes', 'nos', 'vos', 'sur', 'par',
+    'pas', 'plus', 'tous', 'toutes', 'tout', 'aux', 'ces', 'cette', 'montre', 'affiche', 'afficher',
+    'the', 'and', 'what', 'which',
+}
+
+# Mots de la question -> libellés de champs qu'ils désignent sans les nommer
+LABEL_HINTS = {
+    'prix': ('prix', 'montant', 'total'),
+    'cout': ('prix', 'montant', 'total'),
+    'montant': ('prix', 'montant', 'total'),
+    'quand': ('date',),
+    'qui': ('utilisateur', 'contact', 'demandeur'),
+    'affect': ('utilisateur',),
+    'ou': ('lieu', 'adresse', 'localisation'),
+    'emplacement': ('lieu', 'localisation'),
+    'etat': ('statut',),
+    'contact': ('contact', 'telephone', 'email'),
+    'joindre': ('contact', 'telephone', 'email'),
+    'livr': ('livraison', 'reception'),
+    'serie': ('serie',),
+}
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents, pour comparer question et contenus"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def split_fields(content: str) -> List[Tuple[str, str]]:
+    """[(libellé, valeur)] ; le texte sans libellé est rendu avec un libellé vide"""
+    content = re.sub(r'\s+', ' ', content or '').strip()
+    matches = list(FIELD_LABEL.finditer(content))
+    if not matches:
+        return [('', content)] if content else []
+    fields = []
+    if matches[0].start() > 0:
+        fields.append(('', content[:matches[0].start()].strip()))
+    for match, following in zip(matches, matches[1:] + [None]):
+        value = content[match.end():following.start() if following else len(content)].strip()
+        if value:
+            fields.append((match.group(1), value))
+    return fields
+
+
+def _clip(value: str, limit: int) -> str:
+    if len(value) <= limit:
+        return value
+    return value[:limit].rsplit(' ', 1)[0] + '…'
+
+
+def _format_line(fields: List[Tuple[str, str]]) -> str:
+    return '• ' + ' | '.join(f"{label}: {value}" if label else value for label, value in fields)
+
+
+class TokenCounter:
+    """Compte les tokens avec le tokenizer du modèle (OLLAMA_TOKENIZER), sinon les estime"""
+
+    def __init__(self, tokenizer_name: str = ''):
+        self.tokenizer = None
+        self.exact = False
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+                self.exact = True
+            except Exception as e:
+                logger.warning(f"Prompt tokenizer {tokenizer_name} unavailable, estimating tokens: {e}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = TokenCounter(getattr(settings, 'OLLAMA_TOKENIZER', ''))
+        return _counter
+
+
+class PromptBuilder:
+    """Contexte des documents classés, dans la limite du budget restant"""
+
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        self.counter = counter or get_token_counter()
+
+    @staticmethod
+    def _query_terms(query: str) -> Tuple[Set[str], Set[str]]:
+        """Termes à retrouver dans les champs et libellés désignés indirectement"""
+        words = WORD.findall(fold(query))
+        terms = set()
+        for word in words:
+            if len(word) > 2 and word not in STOPWORDS:
+                # Pluriels : "fournisseurs" retrouve "Fournisseur"
+                terms.add(word[:-1] if len(word) > 4 and word[-1] in 'sx' else word)
+        labels = {
+            label
+            for word in words
+            for key, hinted in LABEL_HINTS.items()
+            if word == key or (len(key) >= 4 and word.startswith(key))
+            for label in hinted
+        }
+        return terms, labels
+
+    @staticmethod
+    def _select_fields(fields: List[Tuple[str, str]], terms: Set[str],
+                       labels: Set[str]) -> List[Tuple[str, str]]:
+        """Identifiant (premier champ) puis champs qui répondent à la question"""
+        identity, rest = fields[0], fields[1:]
+        selected = []
+        for label, value in rest:
+            folded_label = fold(label)
+            folded = f"{folded_label} {fold(value)}"
+            if any(term in folded for term in terms) or any(hint in folded_label for hint in labels):
+                selected.append((label, value))
+        return [identity] + (selected or rest[:DEFAULT_FIELDS])
+
+    def pack_context(self, query: str, context: List[Dict], budget: int) -> Tuple[str, Dict]:
+        """Lignes de contexte pour au plus budget tokens, et ce qu'il a fallu retirer"""
+        terms, labels = self._query_terms(query)
+        # Identifiant -> champs déjà fournis pour cet objet ; deux objets distincts peuvent
+        # partager une valeur (même statut, même utilisateur) sans se la retirer
+        seen: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+        lines: List[str] = []
+        used = 0
+        stats = {'documents': len(context), 'used': 0, 'duplicates': 0, 'truncated': False}
+
+        for item in context:
+            fields = split_fields(str(item.get('content', '')))
+            if not fields:
+                continue
+            fields = [(label, _clip(value, MAX_VALUE_CHARS)) for label, value in
+                      self._select_fields(fields, terms, labels)]
+            identity, rest = fields[0], fields[1:]
+            known = seen.get(identity, set())
+            fresh = [field for field in rest if field not in known]
+            if identity in seen and len(fresh) <= len(rest) * (1 - DUPLICATE_OVERLAP):
+                stats['duplicates'] += 1
+                continue
+
+            complete = len(fresh)
+            line = _format_line([identity] + fresh)
+            # +1 : saut de ligne entre deux documents
+            tokens = self.counter.count(line) + 1
+            while used + tokens > budget and fresh:
+                fresh.pop()
+                line = _format_line([identity] + fresh)
+                tokens = self.counter.count(line) + 1
+            if used + tokens > budget:
+                stats['truncated'] = True
+                break
+
+            lines.append(line)
+            used += tokens
+            seen.setdefault(identity, set()).update(fresh)
+            stats['used'] += 1
+            if len(fresh) < complete:
+                # Budget atteint au milieu de ce document
+                stats['truncated'] = True
+                break
+
+        stats['context_tokens'] = used
+        return '\n'.join(lines), stats
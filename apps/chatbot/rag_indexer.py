@@ -0,0 +1,124 @@
+"""
+Indexation RAG incrémentale pilotée par les modifications
+Les signaux post_save/post_delete des modèles indexés écrivent une ligne IndexOutbox
+dans la transaction de la modification : si elle est annulée, la ligne l'est aussi,
+et une modification validée n'est jamais perdue même si le worker est arrêté.
+
+Le worker (manage.py run_rag_indexer) réserve un lot de lignes, réindexe les objets
+concernés via RAGManager.index_objects (seuls les contenus dont le hash a changé
+sont ré-encodés) puis supprime les lignes traitées.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.chatbot.models import IndexOutbox
+
+logger = logging.getLogger(__name__)
+
+# Durée de réservation d'un lot : passé ce délai, un worker arrêté en cours de lot est relayé
+LEASE_SECONDS = 300
+RETRY_DELAY_SECONDS = 60
+
+
+def enqueue(model, pks: Iterable) -> int:
+    """Ajoute (ou remet en tête) des objets dans l'outbox ; une ligne par objet"""
+    content_type = ContentType.objects.get_for_model(model)
+    now = timezone.now()
+    rows = [
+        IndexOutbox(content_type=content_type, object_pk=str(pk), enqueued_at=now, available_at=now)
+        for pk in pks
+    ]
+    if not rows:
+        return 0
+    # Savepoint : un échec de l'outbox ne doit pas casser la transaction métier
+    with transaction.atomic():
+        IndexOutbox.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['content_type', 'object_pk'],
+            update_fields=['enqueued_at', 'available_at', 'attempts', 'last_error'],
+        )
+    return len(rows)
+
+
+class OutboxWorker:
+    """Consomme l'outbox par lots"""
+
+    def __init__(self, rag_manager, batch_size: int = 200):
+        self.rag = rag_manager
+        self.batch_size = batch_size
+
+    def _claim(self) -> List[tuple]:
+        """Réserve un lot de lignes disponibles (SKIP LOCKED : plusieurs workers possibles)"""
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                IndexOutbox.objects.select_for_update(skip_locked=True)
+                .filter(available_at__lte=now)
+                .order_by('enqueued_at')
+                .values_list('pk', 'content_type_id', 'object_pk')[:self.batch_size]
+            )
+            if rows:
+                IndexOutbox.objects.filter(pk__in=[row[0] for row in rows]).update(
+                    available_at=now + timedelta(seconds=LEASE_SECONDS)
+                )
+        return rows
+
+    def process_batch(self) -> Dict[str, int]:
+        claimed_at = timezone.now()
+        rows = self._claim()
+        stats = {'claimed': len(rows), 'indexed': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0}
+        if not rows:
+            return stats
+
+        by_type = defaultdict(list)
+        for pk, content_type_id, object_pk in rows:
+            by_type[content_type_id].append((pk, object_pk))
+
+        for content_type_id, entries in by_type.items():
+            outbox_ids = [pk for pk, _ in entries]
+            try:
+                model = ContentType.objects.get_for_id(content_type_id).model_class()
+                if model is None:
+                    raise LookupError(f"content type {content_type_id} has no model")
+                result = self.rag.index_objects(model, [object_pk for _, object_pk in entries])
+                for key in ('indexed', 'unchanged', 'deleted'):
+                    stats[key] += result[key]
+                # Les lignes remises en file pendant le traitement (enqueued_at plus récent) restent
+                IndexOutbox.objects.filter(pk__in=outbox_ids, enqueued_at__lte=claimed_at).delete()
+            except Exception as e:
+                logger.error(f"RAG outbox: content type {content_type_id} failed: {e}")
+                stats['failed'] += len(entries)
+                IndexOutbox.objects.filter(pk__in=outbox_ids).update(
+                    attempts=F('attempts') + 1,
+                    last_error=str(e)[:2000],
+                    available_at=timezone.now() + timedelta(seconds=RETRY_DELAY_SECONDS),
+                )
+        return stats
+
+    def drain(self) -> Dict[str, int]:
+        """Traite l'outbox jusqu'à ce qu'il n'y ait plus de ligne disponible"""
+        totals: Dict[str, int] = defaultdict(int)
+        while True:
+            stats = self.process_batch()
+            for key, value in stats.items():
+                totals[key] += value
+            if stats['claimed'] < self.batch_size:
+                return dict(totals)
+
+    def run_forever(self, interval: float = 2.0, stop: Optional[Callable[[], bool]] = None):
+        while not (stop and stop()):
+            stats = self.process_batch()
+            if stats['claimed']:
+                logger.info(f"RAG outbox: {stats}")
+            if stats['claimed'] < self.batch_size:
+                time.sleep(interval)
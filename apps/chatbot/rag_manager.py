@@ -1,9 +1,23 @@
+import hashlib
 import logging
 import json
-from typing import List, Dict, Optional, Any
-from django.db import connection
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db import connection, transaction
 import re
 
+import numpy as np
+
+from apps.chatbot.embedding_cache import get_embedding_cache
+from apps.chatbot.content_embeddings import get_content_embeddings
+from apps.chatbot import metrics, vector_index
+from apps.chatbot.pg_bulk import copy_rows
+
 logger = logging.getLogger(__name__)
 
 # Handle missing sentence_transformers gracefully
@@ -19,141 +33,256 @@ except Exception as e:
     SentenceTransformer = None
     logger.warning(f"sentence_transformers error: {e}")
 
+# Reciprocal-rank fusion : poids de chaque liste de candidats et constante k
+RRF_K = 60
+RRF_WEIGHTS = {'exact': 2.0, 'semantic': 1.0, 'keyword': 0.8}
+SEARCH_STATEMENT_TIMEOUT_MS = 3000
+
+# Recherche lexicale (migration 0010) : search_vector = to_tsvector('french', chatbot_unaccent(content)),
+# index trigramme sur chatbot_unaccent(lower(content)). Les termes de la requête sont combinés en OU.
+NORMALIZED_QUERY = "chatbot_unaccent(lower(%(q)s))"
+LEXICAL_TSQUERY = "replace(plainto_tsquery('french', chatbot_unaccent(%(q)s))::text, '&', '|')::tsquery"
+
+# Indexation : documents par COPY / upsert (textes par appel au modèle : content_embeddings)
+INDEX_BATCH_SIZE = 1000
+EMBEDDING_DIMENSIONS = 384
+IMPORT_COLUMNS = ['id', 'object_id', 'content', 'content_hash', 'embedding', 'model_name', 'app_label',
+                  'content_type_id']
+IMPORT_COLUMN_TYPES = ['int8', 'int4', 'text', 'text', 'vector', 'text', 'text', 'int4']
+
+# Passe à True dès qu'un document est vu dans l'index (évite un COUNT(*) par recherche)
+_index_populated = False
+
+# Modèles indexés dans le RAG (app_label, Model) - ALL MODELS EXCEPT CHATBOT
+INDEXED_MODELS = [
+    # Fournisseurs
+    ('fournisseurs', 'Fournisseur'),
+
+    # Matériel
+    ('materiel_informatique', 'MaterielInformatique'),
+    ('materiel_bureautique', 'MaterielBureau'),
+
+    # Commandes
+    ('commande_informatique', 'Commande'),
+    ('commande_bureau', 'CommandeBureau'),
+    ('commande_informatique', 'LigneCommande'),
+    ('commande_bureau', 'LigneCommandeBureau'),
+    ('commande_informatique', 'Designation'),
+    ('commande_bureau', 'DesignationBureau'),
+    ('commande_informatique', 'Description'),
+    ('commande_bureau', 'DescriptionBureau'),
+
+    # Livraisons
+    ('livraison', 'Livraison'),
+
+    # Demandes d'équipement
+    ('demande_equipement', 'DemandeEquipement'),
+    ('demande_equipement', 'ArchiveDecharge'),
+
+    # Utilisateurs
+    ('users', 'CustomUser'),
+
+    # Admin logs
+    ('admin', 'LogEntry'),
+]
+
+# Champs de date de modification utilisés par la réconciliation incrémentale
+MODIFIED_FIELDS = ('date_modification', 'updated_at', 'modified_at', 'date_mise_a_jour')
+
+
+def get_indexed_models() -> List[Tuple[str, str]]:
+    """Liste explicite complétée par les modèles des applications du projet (apps.*)"""
+    from django.apps import apps
+    models_to_index = list(INDEXED_MODELS)
+    for app_config in apps.get_app_configs():
+        if app_config.label == 'chatbot' or not app_config.name.startswith('apps.'):
+            continue
+        for model in app_config.get_models():
+            key = (app_config.label, model.__name__)
+            if key not in models_to_index and not model._meta.abstract:
+                models_to_index.append(key)
+    return models_to_index
+
+
+# Relations lues par _build_content_parts, par modèle : jointures (select) et lots (prefetch).
+# Les modèles absents de la table joignent leurs clés étrangères directes.
+RELATED_SPECS = {
+    'Fournisseur': {},
+    'MaterielInformatique': {
+        'select': ['utilisateur', 'commande', 'ligne_commande__designation', 'ligne_commande__commande'],
+    },
+    'MaterielBureau': {
+        'select': ['utilisateur', 'commande__fournisseur', 'ligne_commande__designation',
+                   'ligne_commande__description', 'ligne_commande__commande'],
+    },
+    'Commande': {'select': ['fournisseur']},
+    'CommandeBureau': {'select': ['fournisseur']},
+    'LigneCommande': {'select': ['commande__fournisseur', 'designation', 'description']},
+    'LigneCommandeBureau': {'select': ['commande__fournisseur', 'designation', 'description']},
+    'Designation': {},
+    'DesignationBureau': {},
+    'Description': {},
+    'DescriptionBureau': {},
+    'Livraison': {
+        'select': ['cree_par', 'modifie_par', 'commande_informatique__fournisseur',
+                   'commande_bureau__fournisseur'],
+        # montant_total parcourt les lignes de la commande
+        'prefetch': ['commande_informatique__lignes', 'commande_bureau__lignes'],
+    },
+    'DemandeEquipement': {'select': ['demandeur']},
+    'ArchiveDecharge': {'select': ['demande']},
+    'LogEntry': {'select': ['user', 'content_type']},
+    'CustomUser': {'prefetch': ['groups', 'user_permissions']},
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un lot d'indexation a exécuté plus de requêtes que sa spec ne le prévoit (N+1)"""
+
+
+def get_related_spec(model) -> Tuple[List[str], List[str]]:
+    """(select_related, prefetch_related) à appliquer avant de construire les contenus"""
+    spec = RELATED_SPECS.get(model.__name__)
+    if spec is None:
+        return _related_fields(model), []
+    return spec.get('select', []), spec.get('prefetch', [])
+
+
+@lru_cache(maxsize=None)
+def get_dependent_lookups() -> Dict[type, List[Tuple[type, str]]]:
+    """Modèle lié -> [(modèle indexé, lookup)] : documents qui recopient des valeurs de ce modèle
+
+    Déduit des chemins de RELATED_SPECS (et des clés étrangères directes par défaut) :
+    modifier un Fournisseur doit réindexer les commandes et matériels qui citent son nom.
+    """
+    from django.apps import apps
+    from django.core.exceptions import FieldDoesNotExist
+    dependents = defaultdict(list)
+    for app_label, model_name in get_indexed_models():
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            continue
+        select, prefetch = get_related_spec(model)
+        for path in select + prefetch:
+            current, lookup = model, []
+            for name in path.split('__'):
+                try:
+                    field = current._meta.get_field(name)
+                except FieldDoesNotExist:
+                    break
+                if field.related_model is None:
+                    break
+                lookup.append(name)
+                current = field.related_model
+                entry = (model, '__'.join(lookup))
+                if current is not model and entry not in dependents[current]:
+                    dependents[current].append(entry)
+    return dict(dependents)
+
+
+def query_budget(prefetch: List[str]) -> int:
+    """Requêtes attendues par lot : lecture du paquet + une par niveau de prefetch"""
+    return 1 + sum(len(lookup.split('__')) for lookup in prefetch)
+
+
+def _related_fields(model) -> List[str]:
+    """Clés étrangères directes, chargées par jointure plutôt qu'une requête par objet"""
+    return [
+        field.name for field in model._meta.fields
+        if field.is_relation and (field.many_to_one or field.one_to_one)
+    ]
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _modified_field(model) -> Optional[str]:
+    from django.db import models as django_models
+    for name in MODIFIED_FIELDS:
+        try:
+            field = model._meta.get_field(name)
+        except Exception:
+            continue
+        if isinstance(field, django_models.DateTimeField):
+            return name
+    return None
+
+
 class RAGManager:
     """Enhanced RAG Manager with comprehensive indexing and validation"""
     
-    def __init__(self):
+    def __init__(self, load_model: bool = True):
+        self.embed_model = None
+        self._content_type_ids: Dict[tuple, int] = {}
+        # Mode test : nombre de requêtes par lot d'indexation vérifié (voir RELATED_SPECS)
+        self.check_queries = getattr(settings, 'CHATBOT_INDEX_CHECK_QUERIES', False)
+        if load_model:
+            self.load_embedding_model()
+
+    def load_embedding_model(self):
+        """Load the SentenceTransformer model (can be deferred to a background thread)"""
+        if self.embed_model is not None:
+            return self.embed_model
+        # Serveur d'inférence partagé entre workers, si configuré et joignable
+        from apps.chatbot.inference_client import get_inference_client, RemoteEmbeddingModel
+        client = get_inference_client()
+        if client is not None and client.is_available():
+            self.embed_model = RemoteEmbeddingModel(client, fallback_loader=self._load_local_model)
+            logger.info(f"✅ RAG Manager using shared inference server at {client.base_url}")
+            return self.embed_model
+        self.embed_model = self._load_local_model()
+        return self.embed_model
+
+    def _load_local_model(self):
+        """Charge le SentenceTransformer dans le processus courant"""
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             logger.error("❌ La bibliothèque sentence_transformers n'est pas installée. RAG features disabled.")
-            self.embed_model = None
-        else:
-            try:
-                import torch
-                device = 'mps' if torch.backends.mps.is_available() else 'cpu'
-                self.embed_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2', device=device)
-                logger.info(f"✅ RAG Manager initialized with embedding model on device: {device}")
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize embedding model: {e}")
-                self.embed_model = None
-        
-    def populate_index(self) -> int:
-        """Populate the RAG index with data from ALL relevant models - Comprehensive indexing"""
+            return None
+        try:
+            import torch
+            device = 'mps' if torch.backends.mps.is_available() else 'cpu'
+            model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2', device=device)
+            logger.info(f"✅ RAG Manager initialized with embedding model on device: {device}")
+            return model
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize embedding model: {e}")
+            return None
+
+    def populate_index(self, batch_size: int = INDEX_BATCH_SIZE,
+                       progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       workers: int = 1) -> int:
+        """Synchronise l'index RAG avec tous les modèles indexés, sans le vider
+
+        L'index reste interrogeable pendant l'opération : seuls les objets dont le
+        contenu a changé sont ré-encodés et les documents des objets supprimés retirés.
+        Les objets sont lus en flux : la mémoire est bornée par batch_size.
+        Avec workers > 1, les modèles et plages de pk sont répartis sur un pool de processus.
+        """
         try:
             from django.apps import apps
-            documents = []
-            indexed_ids = set()
-            
             logger.info("🔄 Starting comprehensive RAG indexing...")
-            
-            # Define models to index with proper app.model format - ALL MODELS EXCEPT CHATBOT
-            models_to_index = [
-                # Fournisseurs
-                ('fournisseurs', 'Fournisseur'),
-                
-                # Matériel
-                ('materiel_informatique', 'MaterielInformatique'),
-                ('materiel_bureautique', 'MaterielBureau'),
-                
-                # Commandes
-                ('commande_informatique', 'Commande'),
-                ('commande_bureau', 'CommandeBureau'),
-                ('commande_informatique', 'LigneCommande'),
-                ('commande_bureau', 'LigneCommandeBureau'),
-                ('commande_informatique', 'Designation'),
-                ('commande_bureau', 'DesignationBureau'),
-                ('commande_informatique', 'Description'),
-                ('commande_bureau', 'DescriptionBureau'),
-                
-                # Livraisons
-                ('livraison', 'Livraison'),
-                
-                # Demandes d'équipement
-                ('demande_equipement', 'DemandeEquipement'),
-                ('demande_equipement', 'ArchiveDecharge'),
-                
-                # Utilisateurs
-                ('users', 'CustomUser'),
-                
-                # Admin logs
-                ('admin', 'LogEntry'),
-            ]
-            
-            # Auto-detect additional models from installed apps (project apps only, exclude system apps)
-            installed_apps = [
-                app for app in apps.get_app_configs()
-                if app.label != 'chatbot'
-                and app.name.startswith('apps.')
-            ]
-            for app_config in installed_apps:
-                try:
-                    app_models = app_config.get_models()
-                    for model in app_models:
-                        app_name = app_config.label
-                        model_name = model.__name__
-                        
-                        # Skip if already in our list
-                        if (app_name, model_name) not in models_to_index:
-                            # Only add if it's a Django model and not abstract
-                            if hasattr(model, '_meta') and not model._meta.abstract:
-                                models_to_index.append((app_name, model_name))
-                                logger.info(f"Auto-detected model: {app_name}.{model_name}")
-                except Exception as e:
-                    logger.warning(f"Could not inspect models for app {app_config.label}: {e}")
-                    continue
+            models_to_index = get_indexed_models()
+            if workers > 1:
+                from apps.chatbot.parallel_indexing import reconcile_parallel
+                stats = reconcile_parallel(workers, models_to_index, batch_size, progress, self.check_queries)
+            else:
+                stats = self.reconcile(full=True, models=models_to_index, batch_size=batch_size,
+                                       progress=progress)
 
-            # Clear existing index first
-            self.clear_index()
-            
-            # Index all models systematically
-            for app_name, model_name in models_to_index:
-                try:
-                    model = apps.get_model(app_name, model_name)
-                    count = model.objects.count()
-                    logger.info(f"Indexing {app_name}.{model_name}: {count} records")
-                    
-                    if count == 0:
-                        logger.warning(f"Table {app_name}.{model_name} is empty")
-                        continue
-                    
-                    # Index each record
-                    for item in model.objects.all():
-                        try:
-                            content_parts = self._build_content_parts(model_name, item)
-                            if content_parts and any(content_parts):
-                                obj_uid = self._get_object_uid(item, model_name)
-                                doc_id = f"{model_name.lower()}_{obj_uid}"
-                                if doc_id not in indexed_ids:
-                                    content = ' '.join(filter(None, content_parts))
-                                    if len(content.strip()) > 5:  # Minimum content length
-                                        documents.append({
-                                            'id': doc_id,
-                                            'content': content,
-                                            'metadata': {
-                                                'type': model_name.lower(),
-                                                'app': app_name,
-                                                'id': obj_uid,
-                                                'pk': obj_uid,
-                                                'model': model_name
-                                            }
-                                        })
-                                        indexed_ids.add(doc_id)
-                        except Exception as e:
-                            logger.warning(f"Error indexing {model_name} ID {item.id}: {e}")
-                            continue
-                            
-                except Exception as e:
-                    logger.error(f"Error accessing model {app_name}.{model_name}: {e}")
-                    continue
-            
-            # Batch insert documents
-            logger.info(f"Inserting {len(documents)} documents into RAG index...")
-            batch_size = 100
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                self._insert_documents_batch(batch)
-                
             final_count = self.get_rag_count()
-            logger.info(f"✅ RAG index populated with {final_count} documents")
+            logger.info(f"✅ RAG index populated with {final_count} documents "
+                        f"({stats['indexed']} embedded, {stats['unchanged']} unchanged, {stats['deleted']} removed)")
             
             # Calculate coherence ratio - exclude DocumentVector from DB count to avoid double counting
             db_models_to_count = [(app, model) for app, model in models_to_index 
@@ -177,10 +306,225 @@ class RAGManager:
             
             return final_count
             
+        except QueryBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error populating RAG index: {e}")
             return 0
 
+    def reconcile(self, full: bool = False, models: Optional[List[Tuple[str, str]]] = None,
+                  batch_size: int = INDEX_BATCH_SIZE,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
+        """Rattrape l'index par rapport à la base, par exemple après un arrêt du worker
+
+        Sans full, seuls les objets absents de l'index ou dont le champ de date de
+        modification est postérieur au updated_at de leur document (date de la dernière
+        vérification) sont reconstruits.
+        Avec full, tous les contenus sont recalculés : nécessaire quand un objet lié
+        (nom du fournisseur d'une commande, par exemple) a changé. Dans les deux cas,
+        seuls les contenus dont le hash diffère sont ré-encodés.
+
+        progress reçoit après chaque lot : model, processed, total, embedded, elapsed, rate.
+        """
+        from django.apps import apps
+        totals = {'indexed': 0, 'unchanged': 0, 'deleted': 0}
+        for app_label, model_name in models or get_indexed_models():
+            try:
+                model = apps.get_model(app_label, model_name)
+                stats = self._reconcile_model(model, full, batch_size, progress)
+            except QueryBudgetExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Error reconciling {app_label}.{model_name}: {e}")
+                continue
+            logger.info(f"  {app_label}.{model_name}: {stats['indexed']} embedded, "
+                        f"{stats['unchanged']} unchanged, {stats['deleted']} removed")
+            for key in totals:
+                totals[key] += stats[key]
+        return totals
+
+    def _reconcile_model(self, model, full: bool, batch_size: int = INDEX_BATCH_SIZE,
+                         progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
+        content_type_id = self._get_content_type_id(model._meta.app_label, model.__name__)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT object_id, updated_at FROM chatbot_documentvector WHERE content_type_id = %s",
+                [content_type_id]
+            )
+            indexed = dict(cursor.fetchall())
+
+        # Seuls des identifiants sont gardés pour tout le modèle, jamais les objets ni leurs contenus
+        seen = set()
+        stats = self._new_stats(model, total=model.objects.count())
+        modified_field = None if full else _modified_field(model)
+        if modified_field is None:
+            self._index_stream(content_type_id, self._iter_documents(model, model.objects.all(), seen, batch_size),
+                               batch_size, stats, progress)
+        else:
+            candidates = []
+            for pk, modified in model.objects.values_list('pk', modified_field).iterator(chunk_size=batch_size):
+                object_id = self._object_id(pk)
+                seen.add(object_id)
+                indexed_at = indexed.get(object_id)
+                if indexed_at is None or (modified and modified > indexed_at):
+                    candidates.append(pk)
+            stats['total'] = len(candidates)
+            for i in range(0, len(candidates), batch_size):
+                queryset = model.objects.filter(pk__in=candidates[i:i + batch_size])
+                self._index_stream(content_type_id, self._iter_documents(model, queryset, set(), batch_size),
+                                   batch_size, stats, progress)
+
+        stats['deleted'] += self._delete_documents(content_type_id, [oid for oid in indexed if oid not in seen])
+        return stats
+
+    def index_objects(self, model, pks: List[Any], batch_size: int = INDEX_BATCH_SIZE) -> Dict[str, int]:
+        """Réindexe les objets donnés d'un modèle
+
+        Les objets dont le hash de contenu n'a pas changé ne sont pas ré-encodés ;
+        ceux qui n'existent plus (ou n'ont plus de contenu) sont retirés de l'index.
+        """
+        content_type_id = self._get_content_type_id(model._meta.app_label, model.__name__)
+        seen = set()
+        stats = self._new_stats(model, total=len(pks))
+        self._index_stream(content_type_id,
+                           self._iter_documents(model, model.objects.filter(pk__in=pks), seen, batch_size),
+                           batch_size, stats)
+        gone = {self._object_id(pk) for pk in pks} - seen
+        stats['deleted'] += self._delete_documents(content_type_id, list(gone))
+        return stats
+
+    @contextmanager
+    def _query_budget_check(self, label: str):
+        """Avec check_queries, vérifie que la construction d'un lot reste à nombre de requêtes fixe"""
+        if not self.check_queries:
+            yield
+            return
+        from django.apps import apps
+        from django.test.utils import CaptureQueriesContext
+        budget = query_budget(get_related_spec(apps.get_model(label))[1])
+        with CaptureQueriesContext(connection) as captured:
+            yield
+        if len(captured) > budget:
+            sample = '\n'.join(query['sql'][:200] for query in captured.captured_queries[:5])
+            raise QueryBudgetExceeded(
+                f"{label}: {len(captured)} queries for one batch, expected at most {budget}\n{sample}"
+            )
+
+    @staticmethod
+    def _new_stats(model, total: int = 0) -> Dict[str, Any]:
+        return {
+            'model': model._meta.label, 'total': total, 'processed': 0,
+            'indexed': 0, 'unchanged': 0, 'deleted': 0, 'started': time.perf_counter(),
+        }
+
+    def _iter_documents(self, model, queryset, seen: set, batch_size: int) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """(object_id, document ou None) pour chaque objet, lus par paquets de batch_size"""
+        app_label, model_name = model._meta.app_label, model.__name__
+        select, prefetch = get_related_spec(model)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        for item in queryset.iterator(chunk_size=batch_size):
+            object_id = self._object_id(item.pk)
+            seen.add(object_id)
+            yield object_id, self._build_document(app_label, model_name, item)
+
+    def _index_stream(self, content_type_id: int, documents: Iterator[Tuple[int, Optional[Dict]]],
+                      batch_size: int, stats: Dict[str, Any],
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Consomme le flux par lots : hashes comparés, contenus modifiés encodés puis upsert"""
+        batches = _chunked(documents, batch_size)
+        while True:
+            with self._query_budget_check(stats['model']):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            docs = {object_id: doc for object_id, doc in batch if doc}
+            existing = self._existing_hashes(content_type_id, list(docs))
+            changed = [doc for object_id, doc in docs.items() if existing.get(object_id) != doc['content_hash']]
+            if changed:
+                self._insert_documents_batch(changed)
+            # Documents vérifiés sans changement : updated_at avancé, sinon la réconciliation
+            # incrémentale les reprendrait à chaque passage
+            self._touch_documents(content_type_id, [
+                object_id for object_id, doc in docs.items() if existing.get(object_id) == doc['content_hash']
+            ])
+            # Objets devenus sans contenu : leur ancien document est retiré
+            stats['deleted'] += self._delete_documents(
+                content_type_id, [object_id for object_id, doc in batch if not doc]
+            )
+            stats['indexed'] += len(changed)
+            stats['unchanged'] += len(docs) - len(changed)
+            stats['processed'] += len(batch)
+            if progress:
+                elapsed = time.perf_counter() - stats['started']
+                progress({
+                    'model': stats['model'],
+                    'processed': stats['processed'],
+                    'total': stats['total'],
+                    'embedded': stats['indexed'],
+                    'elapsed': elapsed,
+                    'rate': stats['processed'] / elapsed if elapsed > 0 else 0.0,
+                })
+
+    def _build_document(self, app_name: str, model_name: str, item) -> Optional[Dict]:
+        """Document RAG d'un objet, ou None si son contenu est trop pauvre"""
+        try:
+            content_parts = self._build_content_parts(model_name, item)
+            if not content_parts or not any(content_parts):
+                return None
+            content = ' '.join(filter(None, content_parts))
+            if len(content.strip()) <= 5:  # Minimum content length
+                return None
+            obj_uid = self._get_object_uid(item, model_name)
+            return {
+                'id': f"{model_name.lower()}_{obj_uid}",
+                'content': content,
+                'content_hash': content_hash(content),
+                'metadata': {
+                    'type': model_name.lower(),
+                    'app': app_name,
+                    'id': obj_uid,
+                    'pk': obj_uid,
+                    'model': model_name
+                }
+            }
+        except Exception as e:
+            logger.warning(f"Error indexing {model_name} ID {getattr(item, 'pk', None)}: {e}")
+            return None
+
+    def _existing_hashes(self, content_type_id: int, object_ids: List[int]) -> Dict[int, str]:
+        if not object_ids:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT object_id, content_hash FROM chatbot_documentvector "
+                "WHERE content_type_id = %s AND object_id = ANY(%s)",
+                [content_type_id, object_ids]
+            )
+            return dict(cursor.fetchall())
+
+    def _touch_documents(self, content_type_id: int, object_ids: List[int]):
+        if not object_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE chatbot_documentvector SET updated_at = now() "
+                "WHERE content_type_id = %s AND object_id = ANY(%s)",
+                [content_type_id, object_ids]
+            )
+
+    def _delete_documents(self, content_type_id: int, object_ids: List[int]) -> int:
+        if not object_ids:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM chatbot_documentvector WHERE content_type_id = %s AND object_id = ANY(%s)",
+                [content_type_id, object_ids]
+            )
+            return cursor.rowcount
+
     def _build_content_parts(self, model_name: str, item) -> List[str]:
         """Build comprehensive content parts for all model types with all fields"""
         content_parts = []
@@ -392,47 +736,78 @@ class RAGManager:
             
         return [part for part in content_parts if part is not None]
 
+    def _encode_documents(self, contents: List[str]):
+        """Embeddings des contenus : réutilisés par hash de texte, un appel au modèle pour les textes nouveaux"""
+        return get_content_embeddings().encode(self.embed_model, contents)
+
+    @staticmethod
+    def _object_id(pk: Any) -> int:
+        """object_id numérique stable : la pk si elle est entière, sinon un md5 borné à 31 bits"""
+        raw_pk = str(pk)
+        try:
+            return int(raw_pk)
+        except ValueError:
+            return int(hashlib.md5(raw_pk.encode()).hexdigest()[:8], 16) & 0x7FFFFFFF
+
     def _insert_documents_batch(self, documents: List[Dict]):
-        """Insert a batch of documents into the RAG index"""
+        """Insert a batch of documents into the RAG index
+
+        Les embeddings du lot sont calculés en un seul appel, copiés en binaire dans
+        une table temporaire puis fusionnés dans chatbot_documentvector par un seul
+        INSERT ... SELECT ... ON CONFLICT.
+        """
+        documents = [doc for doc in documents if len(doc['content']) > 5]  # Minimum content length
+        if not documents:
+            return
         try:
-            for doc in documents:
-                if len(doc['content']) > 5:  # Minimum content length
-                    emb = self._to_vector_str(self.embed_model.encode(doc['content']))
-                    with connection.cursor() as cursor:
-                        # Generate a hash-based integer ID from the string ID
-                        import hashlib
-                        from django.utils import timezone
-                        hash_id = int(hashlib.md5(doc['id'].encode()).hexdigest()[:8], 16)
-                        now = timezone.now()
-                        # Derive a stable numeric object_id from metadata pk (hash if not numeric)
-                        raw_pk = str(doc['metadata'].get('pk') or doc['metadata'].get('id') or '')
-                        try:
-                            object_id = int(raw_pk)
-                        except Exception:
-                            object_id = int(hashlib.md5(raw_pk.encode()).hexdigest()[:8], 16)
-                        
-                        cursor.execute("""
-                            INSERT INTO chatbot_documentvector 
-                            (id, object_id, content, embedding, model_name, app_label, 
-                             indexed_at, updated_at, is_active, content_type_id, priority, source)
-                            VALUES (%s, %s, %s, %s::vector, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (content_type_id, object_id) 
-                            DO UPDATE SET 
-                                embedding = EXCLUDED.embedding,
-                                content = EXCLUDED.content,
-                                model_name = EXCLUDED.model_name,
-                                app_label = EXCLUDED.app_label,
-                                updated_at = EXCLUDED.updated_at,
-                                is_active = EXCLUDED.is_active,
-                                priority = EXCLUDED.priority
-                            WHERE chatbot_documentvector.updated_at < EXCLUDED.updated_at
-                                  OR chatbot_documentvector.content != EXCLUDED.content
-                        """, (hash_id, object_id, doc['content'], emb, 
-                             doc['metadata'].get('model', ''), doc['metadata'].get('app', ''),
-                             now, now, True,
-                             self._get_content_type_id(doc['metadata'].get('app', ''), doc['metadata'].get('model', '')),
-                             1, 'database'))
-                        connection.commit()
+            embeddings = self._encode_documents([doc['content'] for doc in documents])
+            rows = []
+            for doc, embedding in zip(documents, embeddings):
+                metadata = doc['metadata']
+                rows.append((
+                    int(hashlib.md5(doc['id'].encode()).hexdigest()[:8], 16),
+                    self._object_id(metadata.get('pk') or metadata.get('id') or ''),
+                    doc['content'],
+                    doc.get('content_hash') or content_hash(doc['content']),
+                    embedding,
+                    metadata.get('model', ''),
+                    metadata.get('app', ''),
+                    self._get_content_type_id(metadata.get('app', ''), metadata.get('model', '')),
+                ))
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"""
+                    CREATE TEMP TABLE rag_import (
+                        id bigint, object_id integer, content text, content_hash varchar(64),
+                        embedding vector({EMBEDDING_DIMENSIONS}),
+                        model_name varchar(100), app_label varchar(100), content_type_id integer
+                    ) ON COMMIT DROP
+                """)
+                copy_rows(cursor, 'rag_import', IMPORT_COLUMNS, IMPORT_COLUMN_TYPES, rows)
+                # DISTINCT ON : une même ligne ne peut pas être mise à jour deux fois par l'upsert
+                cursor.execute("""
+                    INSERT INTO chatbot_documentvector
+                    (id, object_id, content, content_hash, embedding, model_name, app_label,
+                     indexed_at, updated_at, is_active, content_type_id, priority, source)
+                    SELECT DISTINCT ON (content_type_id, object_id)
+                           id, object_id, content, content_hash, embedding, model_name, app_label,
+                           now(), now(), TRUE, content_type_id, 1, 'database'
+                    FROM rag_import
+                    ORDER BY content_type_id, object_id
+                    ON CONFLICT (content_type_id, object_id)
+                    DO UPDATE SET
+                        embedding = EXCLUDED.embedding,
+                        content = EXCLUDED.content,
+                        content_hash = EXCLUDED.content_hash,
+                        model_name = EXCLUDED.model_name,
+                        app_label = EXCLUDED.app_label,
+                        updated_at = EXCLUDED.updated_at,
+                        is_active = EXCLUDED.is_active,
+                        priority = EXCLUDED.priority
+                    WHERE chatbot_documentvector.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                """)
+            global _index_populated
+            _index_populated = True
         except Exception as e:
             logger.error(f"Error inserting document batch: {e}")
             raise
@@ -462,6 +837,8 @@ class RAGManager:
             with connection.cursor() as cursor:
                 cursor.execute("DELETE FROM chatbot_documentvector")
                 connection.commit()
+            global _index_populated
+            _index_populated = False
             logger.info("RAG index cleared successfully")
         except Exception as e:
             logger.error(f"Error clearing RAG index: {e}")
@@ -478,18 +855,24 @@ class RAGManager:
             return 0
 
     def _to_vector_str(self, vector) -> str:
-        """Convert vector to string format for PostgreSQL"""
-        return '[' + ','.join(map(str, vector)) + ']'
+        """Littéral pgvector ; float32 : représentation la plus courte qui redonne la même valeur"""
+        return '[' + ','.join(map(str, np.asarray(vector, dtype=np.float32).ravel())) + ']'
 
     def _get_content_type_id(self, app_label: str, model_name: str) -> int:
         """Resolve Django content_type id for (app_label, model_name). Fallback to 1 if missing."""
+        key = (app_label, model_name.lower())
+        if key not in self._content_type_ids:
+            self._content_type_ids[key] = self._lookup_content_type_id(*key)
+        return self._content_type_ids[key]
+
+    def _lookup_content_type_id(self, app_label: str, model_name: str) -> int:
         from django.contrib.contenttypes.models import ContentType
         try:
-            ct = ContentType.objects.get(app_label=app_label, model=model_name.lower())
+            ct = ContentType.objects.get(app_label=app_label, model=model_name)
             return ct.id
         except Exception:
             try:
-                ct = ContentType.objects.get(model=model_name.lower())
+                ct = ContentType.objects.get(model=model_name)
                 return ct.id
             except Exception:
                 return 1
@@ -502,14 +885,122 @@ class RAGManager:
         text = re.sub(r'\s+', ' ', text.strip())
         return text
 
+    def is_index_populated(self) -> bool:
+        """Index non vide ; une fois vrai, le résultat est gardé pour le processus"""
+        global _index_populated
+        if not _index_populated:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT EXISTS (SELECT 1 FROM chatbot_documentvector)")
+                    _index_populated = bool(cursor.fetchone()[0])
+            except Exception as e:
+                logger.error(f"Error checking RAG index: {e}")
+        return _index_populated
+
+    @staticmethod
+    def _filter_clauses(filters: Dict[str, Any], params: Dict[str, Any]) -> List[str]:
+        """Conditions SQL sur les colonnes indexées de chatbot_documentvector
+
+        Filtres acceptés : model (nom de modèle ou liste), type (nom de modèle en
+        minuscules), app, min_priority. Un modèle unique est comparé par égalité :
+        la requête peut alors utiliser l'index ANN partiel de ce modèle (vector_index).
+        """
+        clauses = ["is_active"]
+        model = filters.get('model')
+        if model is None and filters.get('type'):
+            names = {name.lower(): name for _, name in get_indexed_models()}
+            model = names.get(str(filters['type']).lower())
+            if model is None:
+                clauses.append("lower(model_name) = %(filter_type)s")
+                params['filter_type'] = str(filters['type']).lower()
+        if isinstance(model, (list, tuple, set)):
+            clauses.append("model_name = ANY(%(filter_models)s)")
+            params['filter_models'] = list(model)
+        elif model:
+            clauses.append("model_name = %(filter_model)s")
+            params['filter_model'] = model
+        if filters.get('app'):
+            clauses.append("app_label = %(filter_app)s")
+            params['filter_app'] = filters['app']
+        if filters.get('min_priority') is not None:
+            clauses.append("priority >= %(filter_min_priority)s")
+            params['filter_min_priority'] = int(filters['min_priority'])
+        return clauses
+
+    def _hybrid_search_sql(self, where_sql: str, candidates: int) -> str:
+        """Candidats vectoriels et lexicaux, fusionnés par reciprocal-rank fusion en une requête
+
+        Chaque liste classée apporte poids / (RRF_K + rang) ; le score final est ramené
+        dans [0, 1] en le divisant par le maximum atteignable. statement_timeout et
+        probes / ef_search de l'index ANN sont fixés pour la requête seule : elle
+        s'exécute dans vector_index.local_settings_scope. Les listes lexicales
+        (plein texte + trigrammes, phrase exacte) passent par les index GIN.
+        """
+        return f"""
+            SET LOCAL statement_timeout = {SEARCH_STATEMENT_TIMEOUT_MS};
+            {vector_index.search_settings_sql(candidates)}
+            WITH semantic AS (
+                SELECT id, dist, ROW_NUMBER() OVER (ORDER BY dist) AS rank
+                FROM ({vector_index.nearest_sql(where_sql)}) nearest
+            ),
+            lexical AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY relevance DESC, id) AS rank
+                FROM (
+                    SELECT id,
+                           ts_rank_cd(search_vector, {LEXICAL_TSQUERY}, 32)
+                           + word_similarity({NORMALIZED_QUERY}, chatbot_unaccent(lower(content))) AS relevance
+                    FROM chatbot_documentvector
+                    WHERE {where_sql}
+                      AND (search_vector @@ {LEXICAL_TSQUERY}
+                           OR {NORMALIZED_QUERY} <%% chatbot_unaccent(lower(content)))
+                    ORDER BY relevance DESC
+                    LIMIT %(candidates)s
+                ) matches
+            ),
+            exact AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY length(content), id) AS rank
+                FROM (
+                    SELECT id, content
+                    FROM chatbot_documentvector
+                    WHERE {where_sql}
+                      AND chatbot_unaccent(lower(content)) LIKE '%%' || chatbot_unaccent(lower(%(q_like)s)) || '%%'
+                    ORDER BY length(content)
+                    LIMIT %(candidates)s
+                ) phrases
+            ),
+            fused AS (
+                SELECT id, SUM(score) AS score, MIN(dist) AS dist,
+                       MIN(priority) AS priority
+                FROM (
+                    SELECT id, %(w_semantic)s / (%(rrf_k)s + rank) AS score, dist, 2 AS priority FROM semantic
+                    UNION ALL
+                    SELECT id, %(w_keyword)s / (%(rrf_k)s + rank), NULL, 3 FROM lexical
+                    UNION ALL
+                    SELECT id, %(w_exact)s / (%(rrf_k)s + rank), NULL, 1 FROM exact
+                ) ranked
+                GROUP BY id
+            )
+            SELECT d.id, d.content_hash, d.content, d.model_name, d.app_label, f.score / %(max_score)s AS score, f.dist,
+                   CASE f.priority WHEN 1 THEN 'exact' WHEN 2 THEN 'semantic' ELSE 'keyword' END AS strategy
+            FROM fused f
+            JOIN chatbot_documentvector d ON d.id = f.id
+            ORDER BY f.score DESC, length(d.content)
+            LIMIT %(candidates)s
+        """
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding de la requête tel que semantic_search le calcule (cache d'embeddings partagé)"""
+        return get_embedding_cache().encode_one(self.embed_model, self._clean_text((query or "").strip()))
+
     def semantic_search(self, query: str, filters: Optional[Dict] = None, top_k: int = 5) -> List[Dict]:
-        """Enhanced semantic search via pgvector with intelligent filtering and ranking"""
+        """Recherche hybride (pgvector + plein texte + trigrammes) en un seul aller-retour, fusion RRF côté SQL"""
+        started = time.perf_counter()
         try:
             if not self.embed_model:
                 logger.warning("Embedding model not available, returning empty results")
                 return []
                 
-            if self.get_rag_count() == 0:
+            if not self.is_index_populated():
                 logger.warning("RAG index is empty, populating...")
                 self.populate_index()
                 
@@ -519,135 +1010,63 @@ class RAGManager:
                 
             # Clean and normalize query text
             q = self._clean_text(q)
-            qvec = self._to_vector_str(self.embed_model.encode(q))
+            qvec = self._to_vector_str(self.embed_query(q))
 
-            where_clauses = []
-            params = []
-            
-            # Enhanced intelligent filtering
-            if filters:
-                if 'type' in filters:
-                    where_clauses.append("(metadata->>'type') = %s")
-                    params.append(filters['type'])
-                if 'model' in filters:
-                    where_clauses.append("(metadata->>'model') = %s")
-                    params.append(filters['model'])
-                if 'app' in filters:
-                    where_clauses.append("(metadata->>'app') = %s")
-                    params.append(filters['app'])
-                if 'date_range' in filters:
-                    # Add date-based filtering if needed
-                    pass
-
-            where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
-
-            # Enhanced search with multiple strategies
-            search_strategies = [
-                # Strategy 1: Exact content match (highest priority)
-                {
-                    'sql': f"""
-                        SELECT content, model_name, app_label, 0.0 AS dist, 'exact' as strategy
-                        FROM chatbot_documentvector
-                        {where_sql}
-                        WHERE content ILIKE %s
-                        ORDER BY content ILIKE %s DESC, length(content) ASC
-                        LIMIT %s
-                    """,
-                    'params': [f"%{q}%", f"%{q}%", top_k],
-                    'weight': 2.0
-                },
-                # Strategy 2: Semantic similarity (cosine)
-                {
-                    'sql': f"""
-                        SELECT content, model_name, app_label, (embedding <=> %s::vector) AS dist, 'semantic' as strategy
-                        FROM chatbot_documentvector
-                        {where_sql}
-                        ORDER BY dist ASC
-                        LIMIT %s
-                    """,
-                    'params': [qvec, top_k],
-                    'weight': 1.0
-                },
-                # Strategy 3: Keyword-based search
-                {
-                    'sql': f"""
-                        SELECT content, model_name, app_label, 
-                               CASE 
-                                   WHEN content ILIKE %s THEN 0.1
-                                   WHEN content ILIKE %s THEN 0.3
-                                   WHEN content ILIKE %s THEN 0.5
-                                   ELSE 1.0
-                               END AS dist, 'keyword' as strategy
-                        FROM chatbot_documentvector
-                        {where_sql}
-                        WHERE content ILIKE %s OR content ILIKE %s OR content ILIKE %s
-                        ORDER BY dist ASC, length(content) ASC
-                        LIMIT %s
-                    """,
-                    'params': [f"%{q}%", f"%{q[:len(q)//2]}%", f"%{q[:len(q)//3]}%", 
-                              f"%{q}%", f"%{q[:len(q)//2]}%", f"%{q[:len(q)//3]}%", top_k],
-                    'weight': 0.8
-                }
-            ]
+            params = {
+                'qvec': qvec,
+                'q': q,
+                'q_like': re.sub(r'([\\%_])', r'\\\1', q),
+                # Marge pour les contenus écartés par _validate_content_relevance et les doublons
+                'candidates': max(top_k * 4, 20),
+                'rrf_k': RRF_K,
+                'w_exact': RRF_WEIGHTS['exact'],
+                'w_semantic': RRF_WEIGHTS['semantic'],
+                'w_keyword': RRF_WEIGHTS['keyword'],
+                'max_score': sum(RRF_WEIGHTS.values()) / (RRF_K + 1),
+            }
 
-            all_results = []
-            
-            for strategy in search_strategies:
-                try:
-                    with connection.cursor() as cursor:
-                        cursor.execute("SET statement_timeout = 3000")  # 3 second timeout per strategy
-                        cursor.execute(strategy['sql'], strategy['params'])
-                        rows = cursor.fetchall()
-                        
-                        for content, model_name, app_label, dist, strategy_name in rows:
-                            # Calculate weighted score
-                            if strategy_name == 'exact':
-                                score = 1.0
-                            elif strategy_name == 'semantic':
-                                score = 1.0 / (1.0 + float(dist))
-                            else:  # keyword
-                                score = 1.0 - float(dist)
-                            
-                            # Apply strategy weight
-                            weighted_score = score * strategy['weight']
-                            
-                            # Validation stricte du contenu avant d'ajouter aux résultats
-                            if self._validate_content_relevance(content, q):
-                                all_results.append({
-                                    "content": content,
-                                    "score": weighted_score,
-                                    "metadata": {
-                                        "model": model_name or "",
-                                        "app": app_label or "",
-                                        "type": model_name.lower() if model_name else "",
-                                        "strategy": strategy_name
-                                    }
-                                })
-                            else:
-                                logger.warning(f"Contenu invalide filtré: {content[:100]}...")
-                            
-                except Exception as e:
-                    logger.warning(f"Strategy {strategy['strategy']} failed: {e}")
-                    continue
+            where_clauses = self._filter_clauses(filters or {}, params)
+
+            with vector_index.local_settings_scope(), connection.cursor() as cursor:
+                cursor.execute(self._hybrid_search_sql(' AND '.join(where_clauses), params['candidates']), params)
+                rows = cursor.fetchall()
 
-            # Remove duplicates and sort by score
+            # Remove duplicates and invalid content, rows are already ranked
             seen_contents = set()
             unique_results = []
-            
-            for result in sorted(all_results, key=lambda x: x['score'], reverse=True):
-                content_hash = hash(result['content'][:100])  # Hash first 100 chars
-                if content_hash not in seen_contents:
-                    seen_contents.add(content_hash)
-                    unique_results.append(result)
-                    if len(unique_results) >= top_k:
-                        break
-
-            logger.info(f"Semantic search returned {len(unique_results)} results using multiple strategies")
+            for document_id, document_hash, content, model_name, app_label, score, dist, strategy_name in rows:
+                content_hash = hash(content[:100])  # Hash first 100 chars
+                if content_hash in seen_contents:
+                    continue
+                # Validation stricte du contenu avant d'ajouter aux résultats
+                if not self._validate_content_relevance(content, q):
+                    logger.warning(f"Contenu invalide filtré: {content[:100]}...")
+                    continue
+                seen_contents.add(content_hash)
+                unique_results.append({
+                    "content": content,
+                    "score": float(score),
+                    "metadata": {
+                        "model": model_name or "",
+                        "app": app_label or "",
+                        "type": model_name.lower() if model_name else "",
+                        "strategy": strategy_name,
+                        "distance": float(dist) if dist is not None else None,
+                        "document_id": document_id,
+                        "content_hash": document_hash,
+                    }
+                })
+                if len(unique_results) >= top_k:
+                    break
+
+            logger.info(f"Semantic search returned {len(unique_results)} results (hybrid RRF)")
             return unique_results
             
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
             return []
+        finally:
+            metrics.record_latency('rag.semantic_search', time.perf_counter() - started)
 
     def _validate_content_relevance(self, content: str, query: str) -> bool:
         """Valide la pertinence du contenu par rapport à la requête"""
@@ -0,0 +1,87 @@
+"""
+Suivi de l'état de disponibilité des composants du chatbot ParcInfo
+Permet un démarrage progressif : le routage par règles est disponible
+immédiatement, les modèles lourds sont chargés en arrière-plan.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# États possibles d'un composant
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+DISABLED = 'disabled'
+
+_FINAL_STATES = (READY, FAILED, DISABLED)
+
+
+class ComponentReadiness:
+    """Registre thread-safe de l'état de chargement de chaque composant"""
+
+    def __init__(self, components: Iterable[str]):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._components: Dict[str, Dict[str, Any]] = {
+            name: {'state': PENDING, 'started_at': None, 'elapsed_ms': None, 'error': None}
+            for name in components
+        }
+
+    def mark(self, name: str, state: str, error: Optional[str] = None):
+        """Met à jour l'état d'un composant et réveille les threads en attente"""
+        with self._changed:
+            component = self._components.setdefault(
+                name, {'state': PENDING, 'started_at': None, 'elapsed_ms': None, 'error': None}
+            )
+            now = time.monotonic()
+            if state == LOADING:
+                component['started_at'] = now
+            elif state in _FINAL_STATES and component['started_at'] is not None:
+                component['elapsed_ms'] = round((now - component['started_at']) * 1000, 1)
+            component['state'] = state
+            component['error'] = error
+            self._changed.notify_all()
+        if state == FAILED:
+            logger.warning(f"Composant '{name}' en échec: {error}")
+        else:
+            logger.info(f"Composant '{name}': {state}")
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self._components.get(name, {}).get('state', PENDING)
+
+    def is_ready(self, name: str) -> bool:
+        return self.state(name) == READY
+
+    def is_settled(self) -> bool:
+        """True quand tous les composants ont atteint un état final"""
+        with self._lock:
+            return all(c['state'] in _FINAL_STATES for c in self._components.values())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend que tous les composants soient dans un état final"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not all(c['state'] in _FINAL_STATES for c in self._components.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copie de l'état courant, sérialisable en JSON"""
+        with self._lock:
+            return {
+                name: {
+                    'state': c['state'],
+                    'elapsed_ms': c['elapsed_ms'],
+                    'error': c['error'],
+                }
+                for name, c in self._components.items()
+            }
@@ -413,7 +413,11 @@ def get_cache_manager() -> RedisCacheManager:
     """Retourne l'instance globale du cache manager"""
     global _cache_manager
     if _cache_manager is None:
-        _cache_manager = RedisCacheManager()
+        _cache_manager = RedisCacheManager(
+            host=getattr(settings, 'CHATBOT_REDIS_HOST', 'localhost'),
+            port=getattr(settings, 'CHATBOT_REDIS_PORT', 6379),
+            db=getattr(settings, 'CHATBOT_REDIS_DB', 0),
+        )
     return _cache_manager
 
 def main():
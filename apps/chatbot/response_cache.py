@@ -0,0 +1,378 @@
+"""
+Cache des réponses du chatbot, placé devant ParcInfoChatbot.process_query
+La clé combine la requête normalisée et le rôle de l'utilisateur. Chaque entrée
+garde la version des tables lues pendant le calcul de la réponse. Les signaux
+post_save/post_delete des modèles métier incrémentent la version de leur table,
+ce qui invalide au prochain accès toutes les réponses qui en dépendent. Une réponse
+relative à la date du jour (retards, garanties, "ce mois") expire en plus au
+changement de jour.
+
+Stockage : Redis si disponible, sinon le cache Django pour les réponses et la
+table chatbot_dataversion pour les versions. Le cache LocMem par défaut est propre
+à chaque processus : les réponses n'y sont pas partagées, mais une modification
+faite dans un worker invalide aussi celles des autres. Les versions incrémentées
+pendant une panne Redis sont reportées sur Redis à la reconnexion, sans quoi les
+réponses mises en cache avant la panne redeviendraient valides. Les écritures qui
+contournent les signaux (QuerySet.update, SQL brut) ne sont couvertes que par le TTL.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from apps.chatbot import metrics
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_PREFIX = 'parcinfo:response:'
+VERSION_PREFIX = 'parcinfo:data_version:'
+REDIS_RETRY_SECONDS = 30.0
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?([A-Za-z_]\w*)"?', re.IGNORECASE)
+_UNCACHEABLE_INTENTS = {'error', 'validation'}
+# Réponses calculées par rapport à la date du jour (retards, garanties restantes, "ce mois") :
+# l'entrée n'est valable que le jour où elle a été calculée
+_DATE_SENSITIVE_INTENTS = {
+    'statut_livraison', 'delivery_status', 'delayed_deliveries', 'count_delayed_deliveries',
+    'delivery_overview', 'deliveries_by_month', 'equipment_requests_by_date', 'material_status',
+}
+_RELATIVE_DATE_RE = re.compile(
+    r"aujourd|\bhier\b|demain|\bce mois|cette (?:semaine|ann[ée]e)|\ben cours\b|retard|expir|garantie"
+    r"|r[ée]cent|dernier|derni[èe]re|prochain|\bjours?\b restants?",
+    re.IGNORECASE
+)
+
+# Tables dont les modifications sont signalées (voir signals.connect_data_version_signals)
+_tracked_tables: Set[str] = set()
+
+
+def track_tables(tables: Iterable[str]):
+    _tracked_tables.update(tables)
+
+
+def normalize_query(query: str) -> str:
+    """Minuscules, espaces compactés, ponctuation finale retirée"""
+    text = unicodedata.normalize('NFKC', query or '').lower()
+    return re.sub(r'\s+', ' ', text).strip().rstrip(' ?!.;')
+
+
+def is_date_sensitive(query: str, result: Any) -> bool:
+    """Réponse dépendant de la date du jour : par son intent ou par les termes de la question"""
+    intent = result.get('intent') if isinstance(result, dict) else None
+    return intent in _DATE_SENSITIVE_INTENTS or bool(_RELATIVE_DATE_RE.search(normalize_query(query)))
+
+
+def _today() -> str:
+    from django.utils import timezone
+    return timezone.localdate().isoformat()
+
+
+def user_role(user) -> str:
+    """Rôle utilisé dans la clé de cache : deux rôles différents ne partagent pas leurs réponses"""
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return 'anonymous'
+    if user.is_superuser:
+        return 'superuser'
+    groups = sorted(user.groups.values_list('name', flat=True))
+    return '+'.join(groups) or 'authenticated'
+
+
+class _RedisStore:
+    name = 'redis'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        self.client.setex(key, ttl, json.dumps(value, ensure_ascii=False, default=str))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def get_versions(self, tables) -> Dict[str, int]:
+        if not tables:
+            return {}
+        values = self.client.mget([VERSION_PREFIX + table for table in tables])
+        return {table: int(value) for table, value in zip(tables, values) if value is not None}
+
+    def bump(self, table: str):
+        self.client.incr(VERSION_PREFIX + table)
+
+
+class _DjangoStore:
+    """Réponses dans le cache Django, versions en base (partagées entre processus)"""
+
+    name = 'django'
+
+    def __init__(self):
+        from django.core.cache import cache
+        self.cache = cache
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        # Même contrainte que Redis : seules les réponses sérialisables en JSON sont gardées
+        self.cache.set(key, json.loads(json.dumps(value, ensure_ascii=False, default=str)), ttl)
+
+    def delete(self, key: str):
+        self.cache.delete(key)
+
+    @staticmethod
+    def _table():
+        from django.db import connection
+        from apps.chatbot.models import DataVersion
+        return connection, connection.ops.quote_name(DataVersion._meta.db_table)
+
+    def get_versions(self, tables) -> Dict[str, int]:
+        if not tables:
+            return {}
+        connection, table = self._table()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT table_name, version FROM {table} WHERE table_name = ANY(%s)", [list(tables)])
+            return {name: int(version) for name, version in cursor.fetchall()}
+
+    def bump(self, table_name: str):
+        connection, table = self._table()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (table_name, version) VALUES (%s, 1) "
+                f"ON CONFLICT (table_name) DO UPDATE SET version = {table}.version + 1",
+                [table_name]
+            )
+
+
+@contextmanager
+def capture_tables():
+    """Collecte les tables lues par les requêtes SQL exécutées dans le bloc"""
+    from django.db import connection
+    tables: Set[str] = set()
+
+    def wrapper(execute, sql, params, many, context):
+        tables.update(table.lower() for table in _TABLE_RE.findall(sql))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield tables
+
+
+class ResponseCache:
+    """Réponses de process_query, invalidées par versions de tables"""
+
+    def __init__(self, ttl: int = 1800):
+        self.ttl = ttl
+        self._redis_client = None
+        self._redis_retry_at = 0.0
+        self._django_store = None
+        # Tables dont la version a été incrémentée dans le cache Django faute de Redis
+        self._pending_bumps: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _connect_redis(self):
+        try:
+            from apps.chatbot.redis_cache import get_cache_manager
+            manager = get_cache_manager()
+            if manager.redis_client is None:
+                manager._initialize_redis()
+            if manager.redis_client is not None:
+                manager.redis_client.ping()
+            return manager.redis_client
+        except ImportError:
+            # Module redis absent : plus de nouvelle tentative
+            self._redis_retry_at = float('inf')
+        except Exception as e:
+            logger.warning(f"Response cache: Redis unavailable ({e}), using Django cache")
+        return None
+
+    def _store(self):
+        """Redis si joignable (nouvel essai au plus toutes les 30 s), sinon le cache Django"""
+        if self._redis_client is None and time.monotonic() >= self._redis_retry_at:
+            with self._lock:
+                if self._redis_client is None and time.monotonic() >= self._redis_retry_at:
+                    self._redis_client = self._connect_redis()
+                    if self._redis_client is None:
+                        self._redis_retry_at = max(self._redis_retry_at, time.monotonic() + REDIS_RETRY_SECONDS)
+                    elif self._pending_bumps:
+                        self._replay_bumps()
+        if self._redis_client is not None:
+            return _RedisStore(self._redis_client)
+        if self._django_store is None:
+            self._django_store = _DjangoStore()
+        return self._django_store
+
+    def _replay_bumps(self):
+        """Reporte sur Redis les versions incrémentées pendant la panne (appelé sous verrou)"""
+        tables = sorted(self._pending_bumps)
+        try:
+            pipeline = self._redis_client.pipeline()
+            for table in tables:
+                pipeline.incr(VERSION_PREFIX + table)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Response cache: replaying data versions on Redis failed ({e})")
+            self._redis_client = None
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return
+        self._pending_bumps.difference_update(tables)
+        metrics.increment('response_cache.replayed_bumps', len(tables))
+        logger.info(f"Response cache: {len(tables)} data versions replayed on Redis")
+
+    def _call(self, operation: str, *args):
+        store = self._store()
+        try:
+            return getattr(store, operation)(*args)
+        except Exception as e:
+            if store.name != 'redis':
+                raise
+            logger.warning(f"Response cache: Redis {operation} failed ({e}), falling back to Django cache")
+            metrics.increment('response_cache.redis_errors')
+            self._redis_client = None
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return getattr(self._store(), operation)(*args)
+
+    @staticmethod
+    def make_key(query: str, role: str) -> str:
+        digest = hashlib.md5(f"{role}\n{normalize_query(query)}".encode('utf-8')).hexdigest()
+        return f"{RESPONSE_PREFIX}{digest}"
+
+    @staticmethod
+    def is_cacheable(result: Any) -> bool:
+        return (
+            isinstance(result, dict)
+            and bool(result.get('response'))
+            and result.get('intent') not in _UNCACHEABLE_INTENTS
+            and result.get('source') != 'error'
+        )
+
+    def get(self, query: str, role: str) -> Optional[Dict[str, Any]]:
+        """Réponse en cache, ou None si absente, datée d'un autre jour ou si une table lue a changé depuis"""
+        key = self.make_key(query, role)
+        try:
+            entry = self._call('get', key)
+            if entry is None:
+                metrics.increment('response_cache.misses')
+                return None
+            if entry.get('day') and entry['day'] != _today():
+                # Calculée un autre jour : retards et échéances ont pu changer
+                metrics.increment('response_cache.invalidations')
+                self._call('delete', key)
+                return None
+            deps = entry.get('deps') or {}
+            if deps:
+                current = self._call('get_versions', list(deps))
+                if any(current.get(table, 0) != version for table, version in deps.items()):
+                    metrics.increment('response_cache.invalidations')
+                    self._call('delete', key)
+                    return None
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            metrics.increment('response_cache.errors')
+            return None
+        metrics.increment('response_cache.hits')
+        return entry['response']
+
+    def set(self, query: str, role: str, response: Dict[str, Any], deps: Dict[str, int]):
+        entry = {'response': response, 'deps': deps}
+        if is_date_sensitive(query, response):
+            entry['day'] = _today()
+        try:
+            self._call('set', self.make_key(query, role), entry, self.ttl)
+            metrics.increment('response_cache.stores')
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+            metrics.increment('response_cache.errors')
+
+    def get_or_compute(self, query: str, role: str, compute: Callable[[], Any],
+                       store: bool = True) -> Tuple[Any, bool]:
+        """Renvoie (réponse, trouvée_en_cache) ; calcule et met en cache en cas d'absence
+
+        Les versions sont lues avant le calcul : une modification concurrente rend
+        l'entrée immédiatement périmée plutôt que de la faire passer pour à jour.
+        """
+        if not self.enabled:
+            return compute(), False
+        cached = self.get(query, role)
+        if cached is not None:
+            return cached, True
+
+        tracked = sorted(_tracked_tables)
+        try:
+            snapshot = self._call('get_versions', tracked)
+        except Exception as e:
+            logger.warning(f"Response cache: data versions unavailable ({e})")
+            snapshot, store = {}, False
+
+        with capture_tables() as tables:
+            result = compute()
+
+        if store and self.is_cacheable(result):
+            deps = {table: snapshot.get(table, 0) for table in tables if table in _tracked_tables}
+            self.set(query, role, result, deps)
+        return result, False
+
+    def get_versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        """Versions courantes des tables (0 pour une table jamais modifiée)"""
+        tables = sorted(tables)
+        versions = self._call('get_versions', tables)
+        return {table: versions.get(table, 0) for table in tables}
+
+    def bump(self, table: str):
+        """Incrémente la version d'une table"""
+        try:
+            self._call('bump', table)
+            if self._redis_client is None and self._redis_retry_at != float('inf'):
+                # Incrément fait dans le cache Django : à reporter quand Redis revient
+                with self._lock:
+                    self._pending_bumps.add(table)
+            metrics.increment('data_version.bumps')
+        except Exception as e:
+            logger.warning(f"Data version bump for {table} failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        counters = metrics.get_counters()
+        hits = counters.get('response_cache.hits', 0)
+        lookups = hits + counters.get('response_cache.misses', 0) + counters.get('response_cache.invalidations', 0)
+        return {
+            'enabled': self.enabled,
+            'backend': 'redis' if self._redis_client is not None else 'django',
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': counters.get('response_cache.misses', 0),
+            'invalidations': counters.get('response_cache.invalidations', 0),
+            'stores': counters.get('response_cache.stores', 0),
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'data_version_bumps': counters.get('data_version.bumps', 0),
+            'pending_version_bumps': len(self._pending_bumps),
+            'replayed_version_bumps': counters.get('response_cache.replayed_bumps', 0),
+            'tracked_tables': len(_tracked_tables),
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        from django.conf import settings
+        _response_cache = ResponseCache(ttl=int(getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 1800)))
+    return _response_cache
+
+
+def bump_data_version(table: str):
+    """Invalide les réponses dépendant de la table, une fois la transaction validée"""
+    from django.db import transaction
+    transaction.on_commit(lambda: get_response_cache().bump(table))
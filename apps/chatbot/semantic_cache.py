@@ -0,0 +1,192 @@
+"""
+Cache sémantique des réponses RAG+LLM
+Une entrée garde l'embedding de la question, les documents retrouvés (id et hash
+de contenu) et la réponse générée. Une nouvelle question dont l'embedding est
+assez proche (cosinus >= seuil) reçoit la réponse en cache, à condition que la
+recherche lui ait renvoyé les mêmes documents, dans la même version : une
+reformulation évite ainsi l'appel au LLM, mais une réponse ne survit pas à la
+modification des données qu'elle cite.
+
+Cache en mémoire, propre à chaque processus, borné en nombre d'entrées et en durée.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from apps.chatbot import metrics
+
+logger = logging.getLogger(__name__)
+
+# (chemin de génération, ((id, hash de contenu), ...))
+Fingerprint = Tuple[str, Tuple[Tuple[int, str], ...]]
+
+
+def documents_fingerprint(results: List[Dict], scope: str = '') -> Optional[Fingerprint]:
+    """Documents retrouvés (id, hash de contenu), triés ; None sans document ou si l'un n'est pas identifié
+
+    scope sépare les chemins qui ne produisent pas la même réponse à partir des mêmes documents.
+    """
+    if not results:
+        return None
+    documents = []
+    for result in results:
+        metadata = result.get('metadata') or {}
+        if metadata.get('document_id') is None:
+            return None
+        documents.append((metadata['document_id'], metadata.get('content_hash') or ''))
+    return scope, tuple(sorted(documents))
+
+
+class SemanticCache:
+    """Réponses indexées par embedding de question, validées par les documents retrouvés"""
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 512, ttl: int = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _rebuild(self):
+        self._matrix = np.stack([entry['vector'] for entry in self._entries]) if self._entries else None
+
+    def _purge_expired(self, now: float):
+        live = [entry for entry in self._entries if entry['expires_at'] > now]
+        if len(live) != len(self._entries):
+            self._entries = live
+            self._rebuild()
+
+    def lookup(self, query_vector, fingerprint: Fingerprint) -> Optional[Dict[str, Any]]:
+        """Réponse d'une question proche ayant retrouvé les mêmes documents, sinon None"""
+        vector = self._unit(query_vector)
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            if self._matrix is None:
+                metrics.increment('semantic_cache.misses')
+                return None
+            similarities = self._matrix @ vector
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            stale = []
+            result = None
+            for index in candidates[np.argsort(-similarities[candidates])]:
+                entry = self._entries[index]
+                if entry['fingerprint'] == fingerprint:
+                    result = entry
+                    break
+                # Mêmes documents, contenu modifié depuis : la réponse cite des données périmées
+                scope, documents = entry['fingerprint']
+                if scope == fingerprint[0] and [doc_id for doc_id, _ in documents] == [doc_id for doc_id, _ in fingerprint[1]]:
+                    stale.append(entry)
+            stale_ids = {id(entry) for entry in stale}
+            if result is not None:
+                # Ordre LRU : l'entrée servie passe en fin de liste
+                stale_ids.add(id(result))
+            if stale_ids:
+                self._entries = [entry for entry in self._entries if id(entry) not in stale_ids]
+                if result is not None:
+                    self._entries.append(result)
+                self._rebuild()
+            if stale:
+                metrics.increment('semantic_cache.stale', len(stale))
+            if result is None:
+                metrics.increment('semantic_cache.mismatches' if len(candidates) > len(stale) else 'semantic_cache.misses')
+                return None
+        metrics.increment('semantic_cache.hits')
+        metrics.increment('semantic_cache.saved_ms', result['generation_ms'])
+        return dict(result['response'])
+
+    def store(self, query_vector, fingerprint: Fingerprint, response: Dict[str, Any], generation_ms: int):
+        entry = {
+            'vector': self._unit(query_vector),
+            'fingerprint': fingerprint,
+            'response': response,
+            'generation_ms': generation_ms,
+            'expires_at': time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                # Entrée la moins récemment servie
+                self._entries.pop(0)
+                metrics.increment('semantic_cache.evictions')
+            self._rebuild()
+        metrics.increment('semantic_cache.stores')
+
+    def get_or_generate(self, query_vector, results: List[Dict], generate: Callable[[], Dict[str, Any]],
+                        scope: str = 'chat') -> Tuple[Dict[str, Any], bool]:
+        """Renvoie (résultat, trouvé_en_cache) ; generate n'est appelé qu'en cas d'absence
+
+        Seuls les résultats marqués 'generated' (réponse effectivement produite par le LLM)
+        sont mis en cache.
+        """
+        fingerprint = documents_fingerprint(results, scope) if self.enabled else None
+        if fingerprint is None:
+            return generate(), False
+        cached = self.lookup(query_vector, fingerprint)
+        if cached is not None:
+            return cached, True
+
+        started = time.perf_counter()
+        result = generate()
+        if isinstance(result, dict) and result.get('generated'):
+            self.store(query_vector, fingerprint, result, int((time.perf_counter() - started) * 1000))
+        return result, False
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        counters = metrics.get_counters()
+        hits = counters.get('semantic_cache.hits', 0)
+        stale = counters.get('semantic_cache.stale', 0)
+        lookups = hits + counters.get('semantic_cache.misses', 0) + counters.get('semantic_cache.mismatches', 0)
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': counters.get('semantic_cache.misses', 0),
+            'mismatches': counters.get('semantic_cache.mismatches', 0),
+            'stale': stale,
+            'stores': counters.get('semantic_cache.stores', 0),
+            'evictions': counters.get('semantic_cache.evictions', 0),
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'stale_rate': round(stale / (hits + stale), 3) if hits + stale else 0.0,
+            'seconds_saved': round(counters.get('semantic_cache.saved_ms', 0) / 1000, 2),
+        }
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    global _semantic_cache
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            from django.conf import settings
+            _semantic_cache = SemanticCache(
+                threshold=float(getattr(settings, 'CHATBOT_SEMANTIC_CACHE_THRESHOLD', 0.92)),
+                max_entries=int(getattr(settings, 'CHATBOT_SEMANTIC_CACHE_SIZE', 512)),
+                ttl=int(getattr(settings, 'CHATBOT_SEMANTIC_CACHE_TTL', 3600)),
+            )
+        return _semantic_cache
@@ -0,0 +1,127 @@
+import logging
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .models import IntentExample
+from .intent_index import mark_intent_examples_changed
+from .response_cache import bump_data_version, track_tables
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=IntentExample)
+def refresh_intent_index_on_save(sender, instance, created, **kwargs):
+    """
+    Signale à l'index d'intents qu'un exemple a été ajouté (ou modifié)
+    """
+    mark_intent_examples_changed(rebuild=not created)
+
+
+@receiver(post_delete, sender=IntentExample)
+def refresh_intent_index_on_delete(sender, instance, **kwargs):
+    """
+    Signale à l'index d'intents qu'un exemple a été supprimé
+    """
+    mark_intent_examples_changed(rebuild=True)
+
+
+# Modèles écrits à chaque requête du chatbot : ne servent pas à construire les réponses
+_UNVERSIONED_MODELS = {'ChatMessage', 'ChatbotInteraction', 'ChatbotFeedback', 'DataVersion'}
+
+
+def bump_model_data_version(sender, **kwargs):
+    """
+    Invalide les réponses en cache qui ont lu la table du modèle
+    """
+    bump_data_version(sender._meta.db_table)
+
+
+def bump_m2m_data_version(sender, instance, action, **kwargs):
+    """
+    Invalide les réponses en cache qui ont lu une relation many-to-many
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_data_version(sender._meta.db_table)
+        bump_data_version(instance._meta.db_table)
+
+
+def connect_data_version_signals():
+    """
+    Branche les compteurs de version sur les modèles métier (apps.*) et les groupes
+    """
+    tables = set()
+    for model in django_apps.get_models():
+        if not (model.__module__.startswith('apps.') or model is Group):
+            continue
+        if model.__name__ in _UNVERSIONED_MODELS:
+            continue
+        uid = f"data_version:{model._meta.label}"
+        post_save.connect(bump_model_data_version, sender=model, dispatch_uid=f"{uid}:save")
+        post_delete.connect(bump_model_data_version, sender=model, dispatch_uid=f"{uid}:delete")
+        tables.add(model._meta.db_table)
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            m2m_changed.connect(bump_m2m_data_version, sender=through,
+                                dispatch_uid=f"data_version:{through._meta.label}:m2m")
+            tables.add(through._meta.db_table)
+    track_tables(tables)
+
+
+def enqueue_rag_reindex(sender, instance, **kwargs):
+    """
+    Inscrit l'objet modifié ou supprimé dans l'outbox d'indexation RAG
+    """
+    from .rag_indexer import enqueue
+    try:
+        enqueue(sender, [instance.pk])
+    except Exception as e:
+        logger.warning(f"RAG outbox: could not enqueue {sender.__name__} {instance.pk}: {e}")
+
+
+# Champs jamais recopiés dans les documents : une connexion (last_login) ne réindexe pas
+# tout l'historique de l'utilisateur
+_UNINDEXED_FIELDS = frozenset({'last_login', 'password'})
+
+
+def enqueue_rag_dependents(sender, instance, update_fields=None, **kwargs):
+    """
+    Inscrit dans l'outbox les documents qui recopient des valeurs de l'objet modifié
+    (nom du fournisseur d'une commande, utilisateur d'un matériel...)
+    Branché sur pre_delete : après la suppression, les liens SET_NULL sont déjà effacés.
+    """
+    if update_fields and set(update_fields) <= _UNINDEXED_FIELDS:
+        return
+    from .rag_indexer import enqueue
+    from .rag_manager import get_dependent_lookups
+    for model, lookup in get_dependent_lookups().get(sender, ()):
+        try:
+            pks = list(
+                model._default_manager.filter(**{lookup: instance.pk})
+                .values_list('pk', flat=True).distinct()
+            )
+            enqueue(model, pks)
+        except Exception as e:
+            logger.warning(f"RAG outbox: could not enqueue {model.__name__} depending on "
+                           f"{sender.__name__} {instance.pk}: {e}")
+
+
+def connect_rag_index_signals():
+    """
+    Branche l'outbox d'indexation sur les modèles indexés par le RAG et sur ceux
+    dont ils recopient des valeurs
+    """
+    from .rag_manager import get_dependent_lookups, get_indexed_models
+    for app_label, model_name in get_indexed_models():
+        try:
+            model = django_apps.get_model(app_label, model_name)
+        except LookupError:
+            continue
+        uid = f"rag_outbox:{model._meta.label}"
+        post_save.connect(enqueue_rag_reindex, sender=model, dispatch_uid=f"{uid}:save")
+        post_delete.connect(enqueue_rag_reindex, sender=model, dispatch_uid=f"{uid}:delete")
+    for model in get_dependent_lookups():
+        uid = f"rag_outbox_dependents:{model._meta.label}"
+        post_save.connect(enqueue_rag_dependents, sender=model, dispatch_uid=f"{uid}:save")
+        pre_delete.connect(enqueue_rag_dependents, sender=model, dispatch_uid=f"{uid}:delete")
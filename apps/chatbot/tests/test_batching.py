@@ -0,0 +1,55 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from apps.chatbot.batching import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def test_results_follow_submission_order(self):
+        batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=8, max_wait_ms=20)
+        futures = [batcher.submit(i) for i in range(20)]
+        self.assertEqual([future.result(timeout=5) for future in futures], [i * 2 for i in range(20)])
+
+    def test_concurrent_calls_are_grouped(self):
+        sizes = []
+        release = threading.Event()
+
+        def batch_fn(items):
+            sizes.append(len(items))
+            release.wait(5)
+            return items
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=16, max_wait_ms=50)
+        futures = [batcher.submit(i) for i in range(10)]
+        release.set()
+        self.assertEqual([future.result(timeout=5) for future in futures], list(range(10)))
+        self.assertLess(len(sizes), 10)
+        self.assertLessEqual(max(sizes), 16)
+        stats = batcher.get_stats()
+        self.assertEqual(stats['items'], 10)
+        self.assertEqual(stats['batches'], len(sizes))
+
+    def test_max_batch_size_is_respected(self):
+        sizes = []
+        batcher = MicroBatcher(lambda items: sizes.append(len(items)) or items, max_batch_size=3, max_wait_ms=50)
+        futures = [batcher.submit(i) for i in range(7)]
+        [future.result(timeout=5) for future in futures]
+        self.assertLessEqual(max(sizes), 3)
+
+    def test_batch_error_is_raised_by_every_caller(self):
+        def fail(items):
+            raise RuntimeError('model down')
+
+        batcher = MicroBatcher(fail, max_wait_ms=20)
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        self.assertGreaterEqual(batcher.get_stats()['errors'], 1)
+
+    def test_result_count_mismatch_is_an_error(self):
+        batcher = MicroBatcher(lambda items: items[:-1], max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher(1, timeout=5)
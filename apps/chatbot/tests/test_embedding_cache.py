@@ -0,0 +1,87 @@
+import sys
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.chatbot.embedding_cache import EmbeddingCache, LRUByteCache, get_embedding_cache
+
+
+class FakeModel:
+    """Encodeur déterministe qui compte les textes encodés"""
+
+    def __init__(self, dim: int = 4):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=False):
+        self.encoded.extend(texts)
+        return np.array([[len(text), i, 1.0, 2.0][:self.dim] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+class LRUByteCacheTests(SimpleTestCase):
+
+    def size(self, key, vector):
+        return vector.nbytes + sys.getsizeof(key)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        vector = np.zeros(16, dtype=np.float32)
+        cache = LRUByteCache(max_bytes=2 * self.size('a', vector))
+        cache.put('a', vector)
+        cache.put('b', vector)
+        cache.get('a')
+        cache.put('c', vector)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+
+    def test_replacing_a_key_keeps_byte_count(self):
+        cache = LRUByteCache(max_bytes=10 ** 6)
+        cache.put('a', np.zeros(16, dtype=np.float32))
+        cache.put('a', np.zeros(8, dtype=np.float32))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.current_bytes, self.size('a', np.zeros(8, dtype=np.float32)))
+
+    def test_oversized_vector_is_not_stored(self):
+        cache = LRUByteCache(max_bytes=16)
+        cache.put('a', np.zeros(64, dtype=np.float32))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.current_bytes, 0)
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+
+    def make_cache(self):
+        # redis_ttl=0 : pas de second niveau
+        return EmbeddingCache('test-model', max_bytes=10 ** 6, redis_ttl=0)
+
+    def test_only_missing_texts_are_encoded(self):
+        cache, model = self.make_cache(), FakeModel()
+        first = cache.encode(model, ['alpha', 'beta'])
+        second = cache.encode(model, ['beta', 'gamma', 'alpha'])
+        self.assertEqual(model.encoded, ['alpha', 'beta', 'gamma'])
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[2], first[0])
+
+    def test_duplicates_and_spacing_variants_share_an_entry(self):
+        cache, model = self.make_cache(), FakeModel()
+        vectors = cache.encode(model, ['liste  des\tfournisseurs', 'liste des fournisseurs'])
+        self.assertEqual(model.encoded, ['liste des fournisseurs'])
+        np.testing.assert_array_equal(vectors[0], vectors[1])
+
+    def test_normalized_and_raw_vectors_are_cached_separately(self):
+        cache, model = self.make_cache(), FakeModel()
+        cache.encode(model, ['alpha'], normalize=False)
+        cache.encode(model, ['alpha'], normalize=True)
+        self.assertEqual(model.encoded, ['alpha', 'alpha'])
+
+    def test_caller_cannot_alter_cached_vectors(self):
+        cache, model = self.make_cache(), FakeModel()
+        vector = cache.encode_one(model, 'alpha')
+        vector[0] = -1.0
+        self.assertNotEqual(cache.encode_one(model, 'alpha')[0], -1.0)
+
+    def test_shared_cache_is_per_model(self):
+        self.assertIs(get_embedding_cache('model-a'), get_embedding_cache('model-a'))
+        self.assertIsNot(get_embedding_cache('model-a'), get_embedding_cache('model-b'))
+        self.assertEqual(get_embedding_cache('model-b').model_name, 'model-b')
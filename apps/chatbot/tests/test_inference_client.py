@@ -0,0 +1,61 @@
+import threading
+from unittest import mock
+
+import numpy as np
+import requests
+from django.test import SimpleTestCase
+
+from apps.chatbot.inference_client import REMOTE_RETRY_SECONDS, RemoteEmbeddingModel
+
+MONOTONIC = 'apps.chatbot.inference_client.time.monotonic'
+
+
+class FlakyClient:
+    def __init__(self):
+        self.up = False
+        self.calls = 0
+
+    def encode(self, texts, normalize=False):
+        self.calls += 1
+        if not self.up:
+            raise requests.ConnectionError('down')
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+
+class LocalModel:
+    def encode(self, sentences, **kwargs):
+        return np.zeros((len(sentences), 2), dtype=np.float32)
+
+
+class RemoteEmbeddingModelTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = FlakyClient()
+        self.loads = []
+        self.model = RemoteEmbeddingModel(self.client, lambda: self.loads.append(1) or LocalModel())
+
+    def test_falls_back_then_retries_the_server_after_the_backoff(self):
+        with mock.patch(MONOTONIC, return_value=0.0):
+            self.assertEqual(self.model.encode(['a']).sum(), 0)
+            self.assertEqual(self.model.encode(['b']).sum(), 0)
+        self.assertEqual(self.client.calls, 1)
+
+        self.client.up = True
+        with mock.patch(MONOTONIC, return_value=REMOTE_RETRY_SECONDS + 1):
+            self.assertEqual(self.model.encode(['c']).sum(), 2)
+        self.assertEqual(self.client.calls, 2)
+        self.assertEqual(len(self.loads), 1)
+
+    def test_local_model_loaded_once_under_concurrency(self):
+        barrier = threading.Barrier(8)
+
+        def encode():
+            barrier.wait()
+            self.model.encode(['a'])
+
+        threads = [threading.Thread(target=encode) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.loads), 1)
@@ -0,0 +1,65 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.chatbot.intent_index import IntentEmbeddingIndex
+
+
+class HashModel:
+    """Vecteur déterministe par phrase ; compte les phrases encodées"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, phrases, normalize_embeddings=True):
+        self.encoded.extend(phrases)
+        return np.array([[len(phrase), sum(map(ord, phrase)) % 97, 1.0] for phrase in phrases], dtype=np.float32)
+
+
+class CrossProcessRefreshTests(SimpleTestCase):
+    """Modifications faites par un autre processus : aucun signal local, seules les sondes"""
+
+    def setUp(self):
+        self.rows = [(1, 'liste_fournisseurs', 'liste des fournisseurs')]
+        self.version = 1
+        self.model = HashModel()
+        self.index = IntentEmbeddingIndex(self.model, {'salutation': ['bonjour']})
+        patches = [
+            mock.patch.object(IntentEmbeddingIndex, '_fetch_db_rows',
+                              lambda _, after_id=0: [row for row in self.rows if row[0] > after_id]),
+            mock.patch.object(IntentEmbeddingIndex, '_read_db_version', staticmethod(lambda: self.version)),
+            mock.patch('apps.chatbot.models.IntentExample.objects'),
+        ]
+        for patch in patches:
+            started = patch.start()
+            self.addCleanup(patch.stop)
+        started.aggregate.side_effect = lambda **_: {
+            'max_id': max((row[0] for row in self.rows), default=None), 'count': len(self.rows)
+        }
+        self.assertTrue(self.index.build())
+
+    def test_unchanged_table_is_not_reencoded(self):
+        encoded = len(self.model.encoded)
+        self.index.refresh(force=True)
+        self.assertEqual(len(self.model.encoded), encoded)
+
+    def test_edit_in_place_is_detected(self):
+        self.rows = [(1, 'liste_commandes', 'liste des commandes')]
+        self.version += 1
+        self.index.refresh(force=True)
+        self.assertIn('liste_commandes', self.index._labels)
+        self.assertNotIn('liste_fournisseurs', self.index._labels)
+
+    def test_delete_plus_insert_is_detected(self):
+        self.rows = [(2, 'liste_commandes', 'liste des commandes')]
+        self.version += 2
+        self.index.refresh(force=True)
+        self.assertEqual(sorted(self.index._labels), ['liste_commandes', 'salutation'])
+
+    def test_plain_insert_is_appended(self):
+        self.rows.append((2, 'liste_commandes', 'liste des commandes'))
+        self.version += 1
+        self.index.refresh(force=True)
+        self.assertEqual(self.model.encoded[-1], 'liste des commandes')
+        self.assertEqual(len(self.index), 3)
@@ -0,0 +1,76 @@
+import re
+
+from django.test import SimpleTestCase
+
+from apps.chatbot.core_chatbot import ParcInfoChatbot
+from apps.chatbot.intent_corpus import PARCINFO_TRAINING_DATA, PARCINFO_VALIDATION_DATA
+from apps.chatbot.intent_router import KeywordAutomaton, required_literals
+
+
+class CompiledIntentRouterTests(SimpleTestCase):
+    """Le préfiltrage (automate + littéraux obligatoires) ne doit changer aucun score"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.chatbot = ParcInfoChatbot(warmup='none')
+        cls.router = cls.chatbot._intent_router
+
+    def corpus(self):
+        queries = [phrase for phrases in self.chatbot._default_intent_examples().values() for phrase in phrases]
+        queries += [phrase for phrase, _ in PARCINFO_TRAINING_DATA + PARCINFO_VALIDATION_DATA]
+        queries += [
+            "liste des fournisseurs", "ICE du fournisseur Dell Maroc", "statut de livraison BC23",
+            "combien de commandes en attente", "matériels affectés à jdoe", "livraisons en retard",
+            "fournisseur de la commande BC26", "total des commandes informatiques en août",
+            "lsite des fournisseurs", "matreiel informatique", "commande en atente",
+            "demandes d'équipement approuvées", "quel est le mode de passation de la commande BC12",
+            "", "?", "bonjour", "PC-001", "12345",
+        ]
+        return queries
+
+    def test_score_matches_sequential_evaluation(self):
+        for query in self.corpus():
+            text = self.chatbot._normalize_text(query).lower()
+            with self.subTest(query=query):
+                self.assertEqual(self.router.score(text), self.router.score_sequential(text))
+
+    def test_stats_count_skipped_rules(self):
+        self.router.reset_stats()
+        self.router.score("liste des fournisseurs")
+        stats = self.router.get_stats()
+        self.assertEqual(stats['queries'], 1)
+        self.assertGreater(stats['regex_skipped'], 0)
+
+
+class RequiredLiteralsTests(SimpleTestCase):
+
+    def test_literal_of_a_plain_pattern(self):
+        literals = required_literals(r'\bliste\s+des\s+fournisseurs\b')
+        self.assertTrue(literals)
+        self.assertLessEqual(literals, {'liste', 'des', 'fournisseurs'})
+
+    def test_no_prefilter_for_pattern_without_mandatory_literal(self):
+        self.assertIsNone(required_literals(r'.*'))
+
+    def test_every_matching_text_contains_a_literal(self):
+        patterns = [r'.*liste.*mat[eé]riel.*', r'\bice\s+fournisseur\b', r'(commande|bc)\s*\d+', r'retard(?:[ée]s)?']
+        texts = ["liste du matériel", "ice fournisseur", "commande 12", "bc 7", "retardés", "rien"]
+        for pattern in patterns:
+            literals = required_literals(pattern)
+            if literals is None:
+                continue
+            for text in texts:
+                if re.search(pattern, text, re.IGNORECASE):
+                    with self.subTest(pattern=pattern, text=text):
+                        self.assertTrue(any(literal in text for literal in literals))
+
+
+class KeywordAutomatonTests(SimpleTestCase):
+
+    def test_finds_overlapping_words(self):
+        automaton = KeywordAutomaton(['four', 'fournisseur', 'seur', 'ice'])
+        self.assertEqual(automaton.find_all('liste fournisseurs ice'), {'four', 'fournisseur', 'seur', 'ice'})
+
+    def test_empty_text(self):
+        self.assertEqual(KeywordAutomaton(['abc']).find_all(''), set())
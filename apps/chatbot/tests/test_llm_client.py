@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.chatbot.llm_client import CircuitBreaker
+
+MONOTONIC = 'apps.chatbot.llm_client.time.monotonic'
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    def fail(self, times: int, at: float = 0.0):
+        with mock.patch(MONOTONIC, return_value=at):
+            for _ in range(times):
+                self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.assertTrue(self.breaker.allow())
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with mock.patch(MONOTONIC, return_value=10.0):
+            self.assertFalse(self.breaker.allow())
+            self.assertTrue(self.breaker.is_open())
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_single_trial_call_after_cooldown(self):
+        self.fail(3, at=0.0)
+        with mock.patch(MONOTONIC, return_value=31.0):
+            self.assertFalse(self.breaker.is_open())
+            self.assertTrue(self.breaker.allow())
+            self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertFalse(self.breaker.allow())
+
+    def test_trial_success_closes(self):
+        self.fail(3, at=0.0)
+        with mock.patch(MONOTONIC, return_value=31.0):
+            self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_failure_reopens(self):
+        self.fail(3, at=0.0)
+        with mock.patch(MONOTONIC, return_value=31.0):
+            self.breaker.allow()
+        self.fail(1, at=31.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with mock.patch(MONOTONIC, return_value=40.0):
+            self.assertFalse(self.breaker.allow())
@@ -0,0 +1,72 @@
+import struct
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.chatbot.pg_bulk import build_binary_copy, copy_rows
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+
+
+def read_rows(data: bytes):
+    """Décodeur minimal du format COPY binaire : [[bytes ou None, ...], ...]"""
+    assert data.startswith(HEADER)
+    offset, rows = len(HEADER), []
+    while True:
+        (count,) = struct.unpack_from('>h', data, offset)
+        offset += 2
+        if count == -1:
+            assert offset == len(data)
+            return rows
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from('>i', data, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            row.append(data[offset:offset + length])
+            offset += length
+        rows.append(row)
+
+
+class BinaryCopyTests(SimpleTestCase):
+
+    def test_scalar_columns(self):
+        data = build_binary_copy([(7, 3, True, 'matériel')], ['int8', 'int4', 'bool', 'text']).getvalue()
+        (row,) = read_rows(data)
+        self.assertEqual(struct.unpack('>q', row[0])[0], 7)
+        self.assertEqual(struct.unpack('>i', row[1])[0], 3)
+        self.assertEqual(row[2], b'\x01')
+        self.assertEqual(row[3].decode('utf-8'), 'matériel')
+
+    def test_vector_is_big_endian_float4_with_dimension_header(self):
+        vector = np.array([0.5, -1.25, 3.0], dtype=np.float32)
+        (row,) = read_rows(build_binary_copy([(vector,)], ['vector']).getvalue())
+        dim, unused = struct.unpack_from('>hh', row[0])
+        self.assertEqual((dim, unused), (3, 0))
+        np.testing.assert_array_equal(np.frombuffer(row[0][4:], dtype='>f4'), vector)
+
+    def test_null_values(self):
+        (row,) = read_rows(build_binary_copy([(None, 'x')], ['text', 'text']).getvalue())
+        self.assertEqual(row, [None, b'x'])
+
+    def test_empty_stream(self):
+        self.assertEqual(read_rows(build_binary_copy([], ['int8']).getvalue()), [])
+
+    def test_unknown_column_type(self):
+        with self.assertRaises(ValueError):
+            build_binary_copy([(1,)], ['uuid'])
+
+
+class CopyRowsFallbackTests(SimpleTestCase):
+
+    def test_insert_without_copy_expert(self):
+        class Cursor:
+            def executemany(self, sql, params):
+                self.sql, self.params = sql, params
+
+        cursor = Cursor()
+        copy_rows(cursor, 'docs', ['id', 'embedding'], ['int8', 'vector'], [(1, [0.5, 1.0]), (2, None)])
+        self.assertIn('%s::vector', cursor.sql)
+        self.assertEqual(cursor.params, [(1, '[0.5,1.0]'), (2, None)])
@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+
+from apps.chatbot.prompt_builder import PromptBuilder, TokenCounter, split_fields
+
+
+def document(code: str, **fields) -> dict:
+    parts = [f"Code inventaire: {code}"] + [f"{label.replace('_', ' ').capitalize()}: {value}"
+                                            for label, value in fields.items()]
+    return {'content': ' '.join(parts)}
+
+
+class SplitFieldsTests(SimpleTestCase):
+
+    def test_label_value_pairs(self):
+        self.assertEqual(
+            split_fields("Fournisseur: Dell Maroc Adresse: 12 rue X ICE: 001234"),
+            [('Fournisseur', 'Dell Maroc'), ('Adresse', '12 rue X'), ('ICE', '001234')],
+        )
+
+    def test_multi_word_labels(self):
+        self.assertEqual(
+            split_fields("Numéro série: SN1 Date fin garantie calculée: 2026-01-01"),
+            [('Numéro série', 'SN1'), ('Date fin garantie calculée', '2026-01-01')],
+        )
+
+    def test_acronym_inside_a_value_is_not_a_label(self):
+        self.assertEqual(split_fields("Raison sociale: RAS Public IF Fiscal: 42"),
+                         [('Raison sociale', 'RAS Public'), ('IF Fiscal', '42')])
+
+    def test_text_without_label(self):
+        self.assertEqual(split_fields("texte libre"), [('', 'texte libre')])
+        self.assertEqual(split_fields("intro Statut: ok"), [('', 'intro'), ('Statut', 'ok')])
+        self.assertEqual(split_fields(""), [])
+
+
+class PackContextTests(SimpleTestCase):
+
+    def setUp(self):
+        self.builder = PromptBuilder(TokenCounter())
+
+    def test_shared_values_are_kept_for_distinct_objects(self):
+        context = [document(f"PC-00{i}", statut='nouveau', utilisateur='jdoe') for i in (1, 2, 3)]
+        text, stats = self.builder.pack_context("statut et utilisateur des PC", context, 500)
+        for line in text.splitlines():
+            self.assertIn('Statut: nouveau', line)
+            self.assertIn('Utilisateur: jdoe', line)
+        self.assertEqual(stats['used'], 3)
+        self.assertEqual(stats['duplicates'], 0)
+
+    def test_repeated_document_is_dropped(self):
+        context = [document("PC-001", statut='nouveau', utilisateur='jdoe')] * 2
+        text, stats = self.builder.pack_context("statut et utilisateur", context, 500)
+        self.assertEqual(len(text.splitlines()), 1)
+        self.assertEqual(stats['duplicates'], 1)
+
+    def test_only_fields_matching_the_question_are_kept(self):
+        context = [document("PC-001", statut='panne', lieu='Salle 3', marque='Dell', utilisateur='jdoe')]
+        text, _ = self.builder.pack_context("où se trouve le PC-001 ?", context, 500)
+        self.assertIn('Lieu: Salle 3', text)
+        self.assertNotIn('Marque', text)
+
+    def test_budget_is_respected(self):
+        context = [document(f"PC-{i:03d}", statut='nouveau', lieu=f"Salle {i}") for i in range(50)]
+        counter = TokenCounter()
+        text, stats = self.builder.pack_context("statut et lieu", context, 60)
+        self.assertLessEqual(counter.count(text), 60)
+        self.assertLessEqual(stats['context_tokens'], 60)
+        self.assertTrue(stats['truncated'])
+        self.assertLess(stats['used'], 50)
+
+    def test_empty_context(self):
+        self.assertEqual(self.builder.pack_context("statut", [], 100)[0], '')
@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.test import SimpleTestCase
+
+from apps.chatbot.rag_manager import get_dependent_lookups
+
+
+class DependentLookupsTests(SimpleTestCase):
+    """Documents à réindexer quand un objet lié change (voir RELATED_SPECS)"""
+
+    def dependents(self, app_label, model_name):
+        model = apps.get_model(app_label, model_name)
+        return {(dependent.__name__, lookup) for dependent, lookup in get_dependent_lookups().get(model, [])}
+
+    def test_supplier_fans_out_to_orders_and_office_equipment(self):
+        dependents = self.dependents('fournisseurs', 'Fournisseur')
+        self.assertIn(('Commande', 'fournisseur'), dependents)
+        self.assertIn(('CommandeBureau', 'fournisseur'), dependents)
+        self.assertIn(('MaterielBureau', 'commande__fournisseur'), dependents)
+
+    def test_user_and_order_fan_out_to_equipment(self):
+        self.assertIn(('MaterielInformatique', 'utilisateur'), self.dependents('users', 'CustomUser'))
+        self.assertIn(('MaterielInformatique', 'commande'), self.dependents('commande_informatique', 'Commande'))
+        self.assertIn(('MaterielInformatique', 'ligne_commande__designation'),
+                      self.dependents('commande_informatique', 'Designation'))
+
+    def test_prefetched_reverse_relations_are_followed(self):
+        self.assertIn(('Livraison', 'commande_informatique__lignes'),
+                      self.dependents('commande_informatique', 'LigneCommande'))
@@ -0,0 +1,142 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.chatbot.response_cache import ResponseCache, VERSION_PREFIX, is_date_sensitive, normalize_query
+
+TODAY = 'apps.chatbot.response_cache._today'
+
+
+class MemoryStore:
+    """Store en mémoire avec l'interface de _RedisStore / _DjangoStore"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.entries, self.versions = {}, {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl):
+        self.entries[key] = value
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def get_versions(self, tables):
+        return {table: self.versions[table] for table in tables if table in self.versions}
+
+    def bump(self, table):
+        self.versions[table] = self.versions.get(table, 0) + 1
+
+
+class ResponseCacheInvalidationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.store = MemoryStore()
+        self.cache = ResponseCache(ttl=60)
+        self.cache._store = lambda: self.store
+        self.response = {'response': 'Dell Maroc', 'intent': 'liste_fournisseurs'}
+
+    def test_same_question_same_role_hits(self):
+        self.cache.set('Liste des fournisseurs ?', 'staff', self.response, {'fournisseurs_fournisseur': 0})
+        self.assertEqual(self.cache.get('liste  des fournisseurs', 'staff'), self.response)
+        self.assertIsNone(self.cache.get('liste des fournisseurs', 'anonymous'))
+
+    def test_bump_of_a_read_table_invalidates(self):
+        self.cache.set('liste des fournisseurs', 'staff', self.response, {'fournisseurs_fournisseur': 0})
+        self.cache.bump('fournisseurs_fournisseur')
+        self.assertIsNone(self.cache.get('liste des fournisseurs', 'staff'))
+        self.assertEqual(self.store.entries, {})
+
+    def test_bump_of_another_table_keeps_the_entry(self):
+        self.cache.set('liste des fournisseurs', 'staff', self.response, {'fournisseurs_fournisseur': 0})
+        self.cache.bump('livraison_livraison')
+        self.assertEqual(self.cache.get('liste des fournisseurs', 'staff'), self.response)
+
+    def test_get_or_compute_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return self.response
+
+        self.assertEqual(self.cache.get_or_compute('q', 'staff', compute), (self.response, False))
+        self.assertEqual(self.cache.get_or_compute('q', 'staff', compute), (self.response, True))
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_not_cached(self):
+        error = {'response': 'Erreur', 'intent': 'error', 'source': 'error'}
+        self.cache.get_or_compute('q', 'staff', lambda: error)
+        self.assertEqual(self.store.entries, {})
+
+    def test_date_relative_answer_expires_the_next_day(self):
+        with mock.patch(TODAY, return_value='2026-10-16'):
+            self.cache.set('livraisons en retard', 'staff', {'response': '3'}, {})
+            self.cache.set('liste des fournisseurs', 'staff', self.response, {})
+            self.assertEqual(self.cache.get('livraisons en retard', 'staff'), {'response': '3'})
+        with mock.patch(TODAY, return_value='2026-10-17'):
+            self.assertIsNone(self.cache.get('livraisons en retard', 'staff'))
+            self.assertEqual(self.cache.get('liste des fournisseurs', 'staff'), self.response)
+
+
+class DateSensitivityTests(SimpleTestCase):
+
+    def test_by_question_terms(self):
+        self.assertTrue(is_date_sensitive('Livraisons en retard', {}))
+        self.assertTrue(is_date_sensitive('Commandes de ce mois ?', {}))
+        self.assertTrue(is_date_sensitive('Garantie du PC-001', {}))
+        self.assertFalse(is_date_sensitive('Liste des fournisseurs', {}))
+
+    def test_by_intent(self):
+        self.assertTrue(is_date_sensitive('BC23', {'intent': 'delayed_deliveries'}))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query('  Liste   des Fournisseurs ?! '), 'liste des fournisseurs')
+
+
+class RedisOutageReplayTests(SimpleTestCase):
+    """Versions incrémentées pendant une panne Redis, reportées à la reconnexion"""
+
+    class FakeRedis:
+        def __init__(self):
+            self.values, self.up = {}, True
+
+        def incr(self, key):
+            if not self.up:
+                raise ConnectionError('down')
+            self.values[key] = self.values.get(key, 0) + 1
+
+        def mget(self, keys):
+            if not self.up:
+                raise ConnectionError('down')
+            return [self.values.get(key) for key in keys]
+
+        def pipeline(self):
+            client, keys = self, []
+
+            class Pipeline:
+                def incr(self, key):
+                    keys.append(key)
+
+                def execute(self):
+                    for key in keys:
+                        client.incr(key)
+            return Pipeline()
+
+    def test_bumps_made_on_the_fallback_reach_redis(self):
+        redis = self.FakeRedis()
+        cache = ResponseCache(ttl=60)
+        cache._connect_redis = lambda: redis if redis.up else None
+        cache._django_store = MemoryStore()
+
+        cache.bump('materiel')
+        redis.up = False
+        cache.bump('materiel')
+        self.assertEqual(redis.values[VERSION_PREFIX + 'materiel'], 1)
+
+        redis.up = True
+        cache._redis_retry_at = 0
+        self.assertEqual(cache.get_versions(['materiel']), {'materiel': 2})
+        self.assertEqual(cache.get_stats()['pending_version_bumps'], 0)
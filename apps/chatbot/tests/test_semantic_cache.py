@@ -0,0 +1,80 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.chatbot.semantic_cache import SemanticCache, documents_fingerprint
+
+
+def results(*documents):
+    return [{'content': '', 'metadata': {'document_id': doc_id, 'content_hash': content_hash}}
+            for doc_id, content_hash in documents]
+
+
+class DocumentsFingerprintTests(SimpleTestCase):
+
+    def test_order_independent(self):
+        self.assertEqual(documents_fingerprint(results((1, 'a'), (2, 'b')), 'chat'),
+                         documents_fingerprint(results((2, 'b'), (1, 'a')), 'chat'))
+
+    def test_unidentified_document_disables_caching(self):
+        self.assertIsNone(documents_fingerprint([{'content': 'x', 'metadata': {}}]))
+        self.assertIsNone(documents_fingerprint([]))
+
+
+class SemanticCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.9, max_entries=2, ttl=60)
+        self.calls = 0
+
+    def generate(self):
+        self.calls += 1
+        return {'response': f"réponse {self.calls}", 'generated': True}
+
+    def ask(self, vector, docs, scope='chat'):
+        return self.cache.get_or_generate(np.array(vector, dtype=np.float32), docs, self.generate, scope)
+
+    def test_close_question_with_same_documents_is_served_from_cache(self):
+        docs = results((1, 'a'))
+        self.assertEqual(self.ask([1, 0, 0], docs), ({'response': 'réponse 1', 'generated': True}, False))
+        response, cached = self.ask([0.99, 0.05, 0], docs)
+        self.assertTrue(cached)
+        self.assertEqual(response['response'], 'réponse 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_distant_question_is_generated(self):
+        docs = results((1, 'a'))
+        self.ask([1, 0, 0], docs)
+        self.assertFalse(self.ask([0, 1, 0], docs)[1])
+        self.assertEqual(self.calls, 2)
+
+    def test_other_documents_or_scope_miss(self):
+        self.ask([1, 0, 0], results((1, 'a')))
+        self.assertFalse(self.ask([1, 0, 0], results((2, 'b')))[1])
+        self.assertFalse(self.ask([1, 0, 0], results((1, 'a')), scope='fallback')[1])
+
+    def test_modified_document_invalidates_the_answer(self):
+        self.ask([1, 0, 0], results((1, 'a')))
+        self.assertFalse(self.ask([1, 0, 0], results((1, 'a2')))[1])
+        self.assertEqual(self.cache.get_stats()['entries'], 1)
+
+    def test_failed_generation_is_not_cached(self):
+        docs = results((1, 'a'))
+        self.cache.get_or_generate(np.array([1, 0, 0]), docs, lambda: {'response': 'indisponible'})
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+    def test_least_recently_served_entry_is_evicted(self):
+        self.ask([1, 0, 0], results((1, 'a')))
+        self.ask([0, 1, 0], results((2, 'b')))
+        self.ask([1, 0, 0], results((1, 'a')))
+        self.ask([0, 0, 1], results((3, 'c')))
+        self.assertTrue(self.ask([1, 0, 0], results((1, 'a')))[1])
+        self.assertFalse(self.ask([0, 1, 0], results((2, 'b')))[1])
+
+    def test_entries_expire(self):
+        docs = results((1, 'a'))
+        with mock.patch('apps.chatbot.semantic_cache.time.monotonic', return_value=1000.0):
+            self.ask([1, 0, 0], docs)
+        with mock.patch('apps.chatbot.semantic_cache.time.monotonic', return_value=1061.0):
+            self.assertFalse(self.ask([1, 0, 0], docs)[1])
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from apps.chatbot.views import _ValidatedTokenStream
+
+
+def validate(text: str) -> str:
+    """Remplace le code inconnu PC-999, comme _validate_response_data"""
+    return text.replace('PC-999', '[CODE_VÉRIFIÉ_REQUIS]')
+
+
+class ValidatedTokenStreamTests(SimpleTestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.stream = _ValidatedTokenStream(self.sent.append, validate)
+
+    def feed(self, *tokens):
+        for token in tokens:
+            self.stream.token(token)
+
+    def test_forwards_complete_lines_only(self):
+        self.feed('Le PC-', '001 est ', 'en stock.\nIl ', 'est au bureau')
+        self.assertEqual(self.sent, ['Le PC-001 est en stock.\n'])
+        self.stream.end()
+        self.assertEqual(self.sent, ['Le PC-001 est en stock.\n', 'Il est au bureau'])
+
+    def test_unknown_entity_stops_the_stream(self):
+        self.feed('Ligne sûre.\n', 'Le PC-', '999 est perdu.\n', 'Suite.\n')
+        self.stream.end()
+        self.assertEqual(self.sent, ['Ligne sûre.\n'])
+
+    def test_later_generations_are_not_streamed(self):
+        self.feed('Première réponse.')
+        self.stream.end()
+        self.feed('Seconde réponse.\n')
+        self.stream.end()
+        self.assertEqual(self.sent, ['Première réponse.'])
@@ -6,6 +6,7 @@ app_name = 'chatbot'
 urlpatterns = [
     path('', views.chatbot_ui, name='chatbot-ui'),
     path('api/', views.chatbot_api, name='chatbot-api'),
+    path('api/stream/', views.chatbot_stream, name='chatbot-stream'),
     path('process_query/', views.chatbot_api, name='chatbot-process-query'),  # Alias pour compatibilité
     path('status/', views.chatbot_status, name='chatbot-status'),
     path('feedback/', views.chatbot_feedback, name='chatbot-feedback'),
@@ -0,0 +1,431 @@
+"""
+Index ANN de chatbot_documentvector (pgvector)
+Le type d'index (HNSW ou IVFFlat) et ses paramètres sont choisis d'après le nombre
+de lignes ; l'index est reconstruit en CONCURRENTLY, sans bloquer les écritures.
+semantic_search trie par distance cosinus (<=>). Les modèles volumineux ont en plus
+un index partiel (WHERE model_name = ...) utilisé par les recherches filtrées sur ce modèle.
+
+Représentation indexée (CHATBOT_VECTOR_STORAGE) : full (vector), halfvec (float16,
+index deux fois plus petit) ou binary (binary_quantize, distance de Hamming, 32 fois
+plus petit). En halfvec / binary, l'index présélectionne candidates × rerank_factor
+lignes, reclassées à pleine précision sur la colonne embedding.
+
+Au moment de la recherche, ivfflat.probes et hnsw.ef_search sont fixés par
+SET LOCAL dans un bloc local_settings_scope, qui les rétablit à la sortie même
+dans la transaction d'un appelant. Leurs valeurs viennent, par ordre de priorité, des settings
+CHATBOT_VECTOR_PROBES / CHATBOT_VECTOR_EF_SEARCH, du dernier réglage enregistré
+par manage.py tune_vector_index --apply, ou de valeurs dérivées de l'index.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'chatbot_documentvector'
+INDEX_NAME = 'embedding_idx'
+DIMENSIONS = 384
+
+# Expression indexée, opclass et opérateur de chaque représentation ; le vecteur complet reste dans la table
+STORAGES = {
+    'full': {
+        'expression': 'embedding', 'opclass': 'vector_cosine_ops', 'operator': '<=>',
+        'query': '%(qvec)s::vector', 'rerank_factor': 1,
+    },
+    'halfvec': {
+        'expression': f'(embedding::halfvec({DIMENSIONS}))', 'opclass': 'halfvec_cosine_ops', 'operator': '<=>',
+        'query': f'%(qvec)s::halfvec({DIMENSIONS})', 'rerank_factor': 2,
+    },
+    'binary': {
+        'expression': f'(binary_quantize(embedding)::bit({DIMENSIONS}))', 'opclass': 'bit_hamming_ops',
+        'operator': '<~>', 'query': f'binary_quantize(%(qvec)s::vector)::bit({DIMENSIONS})', 'rerank_factor': 8,
+    },
+}
+
+# Au-delà, le graphe HNSW (construction, mémoire) coûte plus que des listes IVFFlat bien dimensionnées
+HNSW_MAX_ROWS = 5_000_000
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+PARAMS_CACHE_SECONDS = 300
+# Modèles dont les documents actifs justifient un index ANN partiel
+PARTIAL_INDEX_MIN_ROWS = 10_000
+
+_params_cache: Dict[str, Any] = {}
+_params_lock = threading.Lock()
+
+
+def get_storage() -> str:
+    from django.conf import settings
+    storage = getattr(settings, 'CHATBOT_VECTOR_STORAGE', 'full')
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    return storage
+
+
+def recommend_index(rows: int, index_type: str = 'auto', storage: Optional[str] = None) -> Dict[str, Any]:
+    """Type et paramètres d'index conseillés pour rows documents
+
+    IVFFlat : lists = rows / 1000 jusqu'à un million de lignes, sqrt(rows) au-delà
+    (recommandation pgvector), probes ≈ sqrt(lists). HNSW n'a pas de phase
+    d'entraînement : il reste juste quand l'index est créé sur une table encore petite.
+    """
+    storage = storage or get_storage()
+    if index_type == 'auto':
+        index_type = 'hnsw' if rows <= HNSW_MAX_ROWS else 'ivfflat'
+    if index_type == 'hnsw':
+        return {'type': 'hnsw', 'storage': storage, 'm': HNSW_M, 'ef_construction': HNSW_EF_CONSTRUCTION}
+    if index_type == 'ivfflat':
+        lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+        return {'type': 'ivfflat', 'storage': storage, 'lists': max(10, lists)}
+    raise ValueError(f"Unknown vector index type: {index_type}")
+
+
+def _index_definition(params: Dict[str, Any]) -> str:
+    """USING ... (expression opclass) WITH (...) pour les paramètres donnés"""
+    spec = STORAGES[params['storage']]
+    options = ', '.join(f"{key} = {int(value)}" for key, value in params.items() if key not in ('type', 'storage'))
+    return f"USING {params['type']} ({spec['expression']} {spec['opclass']}) WITH ({options})"
+
+
+def current_index(using=None) -> Optional[Dict[str, Any]]:
+    """Index ANN existant sur embedding : nom, type, opclass et paramètres, ou None"""
+    with (using or connection).cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.relname, am.amname, i.reloptions, opc.opcname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            LEFT JOIN pg_opclass opc ON opc.oid = x.indclass[0]
+            WHERE x.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat') AND x.indpred IS NULL
+            ORDER BY i.relname = %s DESC
+            LIMIT 1
+            """,
+            [TABLE, INDEX_NAME]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    name, index_type, reloptions, opclass = row
+    storage = next((key for key, spec in STORAGES.items() if spec['opclass'] == opclass), 'full')
+    params: Dict[str, Any] = {'name': name, 'type': index_type, 'storage': storage, 'opclass': opclass}
+    for option in reloptions or []:
+        key, _, value = option.partition('=')
+        params[key] = int(value) if value.isdigit() else value
+    if index_type == 'ivfflat':
+        params.setdefault('lists', 100)
+    elif index_type == 'hnsw':
+        params.setdefault('m', HNSW_M)
+        params.setdefault('ef_construction', HNSW_EF_CONSTRUCTION)
+    return params
+
+
+def index_matches(current: Optional[Dict[str, Any]], wanted: Dict[str, Any]) -> bool:
+    if current is None or current['type'] != wanted['type']:
+        return False
+    if current.get('opclass') != STORAGES[wanted['storage']]['opclass']:
+        return False
+    return all(current.get(key) == value for key, value in wanted.items() if key != 'type')
+
+
+def count_rows(using=None) -> int:
+    with (using or connection).cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def rebuild_index(wanted: Dict[str, Any], using=None) -> Dict[str, Any]:
+    """Crée le nouvel index en CONCURRENTLY puis remplace l'ancien (hors transaction)"""
+    conn = using or connection
+    definition = _index_definition(wanted)
+    temp_name = f"{INDEX_NAME}_new"
+    current = current_index(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {temp_name}")
+        cursor.execute(f"CREATE INDEX CONCURRENTLY {temp_name} ON {TABLE} {definition}")
+        if current is not None:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {current['name']}")
+        cursor.execute(f"ALTER INDEX {temp_name} RENAME TO {INDEX_NAME}")
+        cursor.execute(f"ANALYZE {TABLE}")
+    invalidate_search_params()
+    logger.info(f"✅ Vector index rebuilt: {definition}")
+    return current_index(conn)
+
+
+def ensure_index(index_type: str = 'auto', storage: Optional[str] = None, using=None) -> bool:
+    """Reconstruit l'index s'il diffère de la recommandation pour la taille actuelle"""
+    wanted = recommend_index(count_rows(using), index_type, storage)
+    if index_matches(current_index(using), wanted):
+        return False
+    rebuild_index(wanted, using)
+    return True
+
+
+def partial_index_name(model_name: str) -> str:
+    return f"embedding_{model_name.lower()}_idx"
+
+
+def partial_indexes(using=None) -> Dict[str, str]:
+    """Index ANN partiels existants (un par modèle) : nom -> définition"""
+    with (using or connection).cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE x.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat') AND x.indpred IS NOT NULL
+            """,
+            [TABLE]
+        )
+        return dict(cursor.fetchall())
+
+
+def ensure_partial_indexes(index_type: str = 'auto', min_rows: int = PARTIAL_INDEX_MIN_ROWS,
+                           storage: Optional[str] = None, using=None) -> Dict[str, List[str]]:
+    """Un index ANN partiel (WHERE is_active AND model_name = ...) par modèle volumineux
+
+    Une recherche filtrée sur un modèle parcourt alors son propre graphe / ses propres
+    listes au lieu de filtrer après coup les candidats de l'index global. Les petits
+    modèles n'en ont pas besoin : l'index btree sur model_name suivi d'un tri exact suffit.
+    """
+    conn = using or connection
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT model_name, COUNT(*) FROM {TABLE} WHERE is_active GROUP BY model_name"
+        )
+        counts = dict(cursor.fetchall())
+    storage = storage or get_storage()
+    # Un index d'une autre représentation est supprimé puis reconstruit
+    current = {name: STORAGES[storage]['opclass'] in definition for name, definition in partial_indexes(conn).items()}
+    wanted = {partial_index_name(name): (name, rows) for name, rows in counts.items() if rows >= min_rows}
+    created, dropped = [], []
+    with conn.cursor() as cursor:
+        for name, up_to_date in current.items():
+            if name not in wanted or not up_to_date:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                dropped.append(name)
+        for name, (model_name, rows) in wanted.items():
+            if current.get(name):
+                continue
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY {name} ON {TABLE} "
+                f"{_index_definition(recommend_index(rows, index_type, storage))} "
+                f"WHERE is_active AND model_name = %s",
+                [model_name]
+            )
+            created.append(name)
+    if created or dropped:
+        logger.info(f"✅ Partial vector indexes: {len(created)} created, {len(dropped)} dropped")
+    return {'created': created, 'dropped': dropped}
+
+
+def _tuning_path() -> Optional[str]:
+    from django.conf import settings
+    directory = getattr(settings, 'CHATBOT_CACHE_DIR', '')
+    return os.path.join(directory, 'vector_index.json') if directory else None
+
+
+def save_tuning(values: Dict[str, Any]):
+    """Enregistre les probes / ef_search retenus par le benchmark"""
+    path = _tuning_path()
+    if path is None:
+        raise RuntimeError("CHATBOT_CACHE_DIR is empty, cannot store vector index tuning")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(values, handle, indent=2)
+    invalidate_search_params()
+
+
+def _load_tuning() -> Dict[str, Any]:
+    path = _tuning_path()
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Vector index tuning unreadable ({e}), using derived values")
+        return {}
+
+
+def derived_search_params(index: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    probes = 1
+    if index and index['type'] == 'ivfflat':
+        probes = max(1, round(math.sqrt(index['lists'])))
+    storage = index['storage'] if index else 'full'
+    return {'probes': probes, 'ef_search': HNSW_EF_SEARCH, 'storage': storage,
+            'rerank_factor': STORAGES[storage]['rerank_factor']}
+
+
+def get_search_params() -> Dict[str, Any]:
+    """probes / ef_search / représentation à appliquer ; l'index courant est relu au plus toutes les 5 minutes
+
+    La représentation suit l'index existant, pas le setting : une requête binaire
+    sans index binaire parcourrait toute la table.
+    """
+    from django.conf import settings
+    with _params_lock:
+        if _params_cache and time.monotonic() - _params_cache['loaded_at'] < PARAMS_CACHE_SECONDS:
+            return _params_cache['params']
+    try:
+        index = current_index()
+    except Exception as e:
+        logger.warning(f"Vector index lookup failed: {e}")
+        index = None
+    params = derived_search_params(index)
+    tuning = _load_tuning()
+    if index and tuning.get('index') and tuning['index'] == {key: index.get(key) for key in tuning['index']}:
+        params.update({key: int(tuning[key]) for key in ('probes', 'ef_search') if key in tuning})
+    for key, setting in (('probes', 'CHATBOT_VECTOR_PROBES'), ('ef_search', 'CHATBOT_VECTOR_EF_SEARCH'),
+                         ('rerank_factor', 'CHATBOT_VECTOR_RERANK_FACTOR')):
+        value = int(getattr(settings, setting, 0) or 0)
+        if value > 0:
+            params[key] = value
+    with _params_lock:
+        _params_cache.update({'params': params, 'loaded_at': time.monotonic()})
+    return params
+
+
+def invalidate_search_params():
+    with _params_lock:
+        _params_cache.clear()
+
+
+@contextmanager
+def local_settings_scope():
+    """Bloc dont les SET LOCAL ne survivent pas à la sortie (lectures uniquement)
+
+    Hors transaction, le bloc atomic se termine avec eux. Dans la transaction d'un
+    appelant, un SET LOCAL dure jusqu'à son commit, même après RELEASE SAVEPOINT :
+    le bloc est donc un savepoint annulé à la sortie, ce qui rétablit les valeurs
+    précédentes (et la transaction, si une requête a échoué, par exemple sur timeout).
+    """
+    if not connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+    sid = transaction.savepoint()
+    try:
+        yield
+    finally:
+        transaction.savepoint_rollback(sid)
+
+
+def search_settings_sql(candidates: int) -> str:
+    """SET LOCAL à placer en tête de la requête de recherche, exécutée dans local_settings_scope
+
+    ef_search ne peut pas être inférieur au LIMIT de l'index (présélection comprise) :
+    HNSW renverrait moins de candidats.
+    """
+    params = get_search_params()
+    limit = int(candidates) * int(params['rerank_factor'])
+    return (f"SET LOCAL ivfflat.probes = {int(params['probes'])}; "
+            f"SET LOCAL hnsw.ef_search = {max(int(params['ef_search']), limit)};")
+
+
+def nearest_sql(where_sql: str = 'TRUE') -> str:
+    """Sous-requête (id, dist) : les %(candidates)s plus proches voisins de %(qvec)s
+
+    En halfvec / binary, l'index compact présélectionne candidates × rerank_factor
+    lignes, reclassées par distance cosinus sur le vecteur complet.
+    """
+    params = get_search_params()
+    if params['storage'] == 'full':
+        return f"""
+            SELECT id, embedding <=> %(qvec)s::vector AS dist
+            FROM {TABLE}
+            WHERE {where_sql}
+            ORDER BY dist
+            LIMIT %(candidates)s
+        """
+    spec = STORAGES[params['storage']]
+    return f"""
+        SELECT id, embedding <=> %(qvec)s::vector AS dist
+        FROM (
+            SELECT id, embedding
+            FROM {TABLE}
+            WHERE {where_sql}
+            ORDER BY {spec['expression']} {spec['operator']} {spec['query']}
+            LIMIT %(candidates)s * {int(params['rerank_factor'])}
+        ) shortlist
+        ORDER BY dist
+        LIMIT %(candidates)s
+    """
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def benchmark_recall(values: List[int], k: int = 10, queries: int = 100) -> List[Dict[str, Any]]:
+    """recall@k et latence de la recherche ANN, comparée à la recherche exacte
+
+    Les requêtes sont des embeddings tirés de l'index, cherchés comme dans
+    semantic_search (présélection compacte et rerank compris). Pour chaque valeur de
+    probes (IVFFlat) ou ef_search (HNSW), renvoie recall moyen, p50 et p95 en ms.
+    """
+    index = current_index()
+    if index is None:
+        raise RuntimeError(f"No ANN index on {TABLE}")
+    knob = 'ivfflat.probes' if index['type'] == 'ivfflat' else 'hnsw.ef_search'
+    exact_sql = f"SELECT id FROM {TABLE} ORDER BY embedding <=> %(qvec)s::vector LIMIT %(candidates)s"
+    search_sql = f"SELECT id FROM ({nearest_sql()}) nearest"
+    shortlist = k * int(get_search_params()['rerank_factor'])
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT embedding::text FROM {TABLE} ORDER BY random() LIMIT %s", [queries])
+        vectors = [row[0] for row in cursor.fetchall()]
+    if not vectors:
+        return []
+
+    exact = []
+    with local_settings_scope(), connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_indexscan = off")
+        for vector in vectors:
+            cursor.execute(exact_sql, {'qvec': vector, 'candidates': k})
+            exact.append({row[0] for row in cursor.fetchall()})
+
+    results = []
+    for value in values:
+        recalls, latencies = [], []
+        with local_settings_scope(), connection.cursor() as cursor:
+            # Comme search_settings_sql : ef_search au moins égal à la présélection
+            setting = int(value) if knob == 'ivfflat.probes' else max(int(value), shortlist)
+            cursor.execute(f"SET LOCAL {knob} = {setting}")
+            for vector, truth in zip(vectors, exact):
+                started = time.perf_counter()
+                cursor.execute(search_sql, {'qvec': vector, 'candidates': k})
+                found = {row[0] for row in cursor.fetchall()}
+                latencies.append(time.perf_counter() - started)
+                recalls.append(len(found & truth) / len(truth) if truth else 1.0)
+        results.append({
+            'knob': knob,
+            'value': value,
+            'recall': round(sum(recalls) / len(recalls), 4),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+        })
+    return results
+
+
+def pick_setting(results: List[Dict[str, Any]], recall_target: float,
+                 latency_budget_ms: float = 0) -> Optional[Dict[str, Any]]:
+    """Plus petite valeur atteignant le recall cible dans le budget de latence p95"""
+    for result in sorted(results, key=lambda item: item['value']):
+        if result['recall'] < recall_target:
+            continue
+        if latency_budget_ms and result['p95_ms'] > latency_budget_ms:
+            return None
+        return result
+    return None
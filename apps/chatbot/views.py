@@ -1,16 +1,26 @@
 import json
 import logging
-from django.http import JsonResponse
+import queue
+import threading
+import time
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render
 from datetime import datetime
 from .core_chatbot import get_chatbot
 from .models import ChatbotInteraction
+from .response_cache import get_response_cache, user_role
+from .llm_client import stream_tokens_to
+from . import metrics
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Commentaire SSE envoyé pendant les longues phases sans token (proxys, navigateurs)
+STREAM_KEEPALIVE_SECONDS = 15
+
 def is_authorized_for_chatbot(user):
     """Vérifie si l'utilisateur est autorisé à accéder au chatbot"""
     return user.is_superuser or user.groups.filter(name__in=['Super Admin', 'Gestionnaire Informatique', 'Gestionnaire Bureau']).exists()
@@ -27,6 +37,50 @@ def chatbot_ui(request):
     }
     return render(request, 'chatbot/chatbot_modern.html', context)
 
+def _result_payload(result, cached: bool) -> dict:
+    """Réponse JSON de l'API à partir du résultat de process_query"""
+    # Handle new dictionary response format
+    if isinstance(result, dict):
+        payload = {
+            'response': result.get('response', 'Erreur de traitement'),
+            'intent': result.get('intent', 'unknown'),
+            'entities': result.get('entities', {}),
+            'confidence': result.get('confidence', 0),
+            'source': result.get('source', 'unknown'),
+            'method': result.get('method', 'hybrid_rag_llm'),
+        }
+    else:
+        # Fallback for old string format
+        payload = {
+            'response': str(result),
+            'intent': 'unknown',
+            'entities': {},
+            'confidence': 0,
+            'source': 'unknown',
+            'method': 'legacy_string',
+        }
+    payload['cached'] = cached
+    payload['timestamp'] = datetime.now().isoformat()
+    return payload
+
+
+def _save_interaction(session_id: str, query: str, payload: dict):
+    # Save interaction with correct field names
+    try:
+        ChatbotInteraction.objects.create(
+            session_id=session_id,
+            user_query=query,
+            detected_intent=payload['intent'],
+            final_response=payload['response'],
+            sql_attempted=False,
+            sql_results=0,
+            rag_results=1
+        )
+    except Exception as e:
+        logger.warning(f"Failed to save interaction: {e}")
+        # Continue without saving interaction
+
+
 @csrf_exempt
 def chatbot_api(request):
     if request.method == 'POST':
@@ -60,9 +114,13 @@ def chatbot_api(request):
                     'timestamp': datetime.now().isoformat()
                 }, status=500)
             
-            # Process query with enhanced RAG+LLM
+            # Process query with enhanced RAG+LLM (réponses en cache par requête et rôle)
             try:
-                result = chatbot.process_query(query)
+                # Pendant le démarrage progressif, les réponses dégradées ne sont pas mises en cache
+                result, cached = get_response_cache().get_or_compute(
+                    query, user_role(request.user), lambda: chatbot.process_query(query),
+                    store=chatbot.readiness.is_settled()
+                )
             except Exception as e:
                 logger.error(f"Error processing query: {e}")
                 return JsonResponse({
@@ -74,47 +132,9 @@ def chatbot_api(request):
                     'timestamp': datetime.now().isoformat()
                 }, status=500)
             
-            # Handle new dictionary response format
-            if isinstance(result, dict):
-                response_text = result.get('response', 'Erreur de traitement')
-                intent = result.get('intent', 'unknown')
-                entities = result.get('entities', {})
-                confidence = result.get('confidence', 0)
-                source = result.get('source', 'unknown')
-                method = result.get('method', 'hybrid_rag_llm')
-            else:
-                # Fallback for old string format
-                response_text = str(result)
-                intent = 'unknown'
-                entities = {}
-                confidence = 0
-                source = 'unknown'
-                method = 'legacy_string'
-            
-            # Save interaction with correct field names
-            try:
-                ChatbotInteraction.objects.create(
-                    session_id=data.get('session_id', 'web_session'),
-                    user_query=query,
-                    detected_intent=intent,
-                    final_response=response_text,
-                    sql_attempted=False,
-                    sql_results=0,
-                    rag_results=1
-                )
-            except Exception as e:
-                logger.warning(f"Failed to save interaction: {e}")
-                # Continue without saving interaction
-            
-            return JsonResponse({
-                'response': response_text,
-                'intent': intent,
-                'entities': entities,
-                'confidence': confidence,
-                'source': source,
-                'method': method,
-                'timestamp': datetime.now().isoformat()
-            })
+            payload = _result_payload(result, cached)
+            _save_interaction(data.get('session_id', 'web_session'), query, payload)
+            return JsonResponse(payload)
             
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Format JSON invalide'}, status=400)
@@ -124,6 +144,140 @@ def chatbot_api(request):
     
     return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
 
+class _ValidatedTokenStream:
+    """Ne transmet les tokens que par lignes complètes déjà conformes à _validate_response_data
+
+    Une ligne qui cite une entité inconnue (code, ICE, fournisseur) coupe la diffusion :
+    le client n'affiche alors que le texte validé de done. Seule la première génération
+    est diffusée, les suivantes (plusieurs appels au LLM) n'arrivant qu'avec done.
+    """
+
+    def __init__(self, send, validate):
+        self._send = send
+        self._validate = validate
+        self._line = []
+        self.closed = False
+
+    def _flush(self, line: str) -> None:
+        if self.closed or not line:
+            return
+        if self._validate(line) != line:
+            metrics.increment('chatbot.stream.blocked_lines')
+            self.closed = True
+            return
+        self._send(line)
+
+    def token(self, token: str) -> None:
+        if self.closed:
+            return
+        head, newline, tail = token.rpartition('\n')
+        if not newline:
+            self._line.append(token)
+            return
+        self._flush(''.join(self._line) + head + newline)
+        self._line = [tail] if tail else []
+
+    def end(self) -> None:
+        self._flush(''.join(self._line))
+        self._line = []
+        self.closed = True
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def chatbot_stream(request):
+    """Variante SSE de chatbot_api : événements token au fil de la génération LLM, puis done
+
+    done porte la même réponse que chatbot_api (texte final nettoyé et validé, qui
+    remplace les tokens affichés) ainsi que ttft_ms et total_ms. Les tokens ne sont
+    émis que par lignes validées (voir _ValidatedTokenStream). Les réponses sans
+    LLM (recherche structurée, cache) n'émettent que done.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Format JSON invalide'}, status=400)
+    else:
+        data = request.GET
+    raw_query = data.get('query') or data.get('question') or data.get('text') or ''
+    query = raw_query.strip() if isinstance(raw_query, str) else ''
+    session_id = data.get('session_id', 'web_session')
+    role = user_role(request.user)
+    started = time.perf_counter()
+    events = queue.Queue()
+
+    def produce():
+        try:
+            if not query:
+                events.put(('done', {
+                    'response': 'Veuillez poser une question.',
+                    'intent': 'validation',
+                    'confidence': 0,
+                    'source': 'validation',
+                    'method': 'validation_error',
+                    'timestamp': datetime.now().isoformat()
+                }))
+                return
+            chatbot = get_chatbot()
+            tokens = _ValidatedTokenStream(
+                lambda text: events.put(('token', text)),
+                lambda text: chatbot._validate_response_data(text, query)
+            )
+            with stream_tokens_to(tokens.token, on_end=tokens.end):
+                result, cached = get_response_cache().get_or_compute(
+                    query, role, lambda: chatbot.process_query(query),
+                    store=chatbot.readiness.is_settled()
+                )
+            payload = _result_payload(result, cached)
+            _save_interaction(session_id, query, payload)
+            events.put(('done', payload))
+        except Exception as e:
+            logger.error(f"Error processing streamed query: {e}")
+            events.put(('error', {
+                'response': 'Une erreur est survenue lors du traitement de votre question. Veuillez réessayer.',
+                'intent': 'error',
+                'source': 'error',
+                'method': 'processing_error',
+                'timestamp': datetime.now().isoformat()
+            }))
+        finally:
+            # Connexion ouverte par ce thread
+            connection.close()
+
+    def stream():
+        threading.Thread(target=produce, name='chatbot-stream', daemon=True).start()
+        first_token_at = None
+        while True:
+            try:
+                kind, item = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if kind == 'token':
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.record_latency('chatbot.stream.ttft', first_token_at - started)
+                yield _sse_event('token', {'token': item})
+                continue
+            total = time.perf_counter() - started
+            metrics.record_latency('chatbot.stream.total', total)
+            item['ttft_ms'] = round((first_token_at - started) * 1000, 1) if first_token_at else None
+            item['total_ms'] = round(total * 1000, 1)
+            yield _sse_event(kind, item)
+            return
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Désactive la mise en tampon des proxys (nginx)
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def chatbot_feedback(request):
@@ -244,11 +398,15 @@ def chatbot_status(request):
             status = chatbot.get_system_status()
             
             return JsonResponse({
-                'status': 'healthy',
+                'status': 'healthy' if status.get('warmup_complete') else 'warming_up',
                 'rag_documents': status.get('rag_documents', 0),
                 'llm_available': status.get('llm_available', False),
                 'models': status.get('ollama_models', []),
                 'embedding_model': status.get('embedding_model', 'unknown'),
+                'components': status.get('components', {}),
+                'response_cache': status.get('response_cache', {}),
+                'metrics': status.get('metrics', {}),
+                'latencies': status.get('latencies', {}),
                 'timestamp': status.get('timestamp', datetime.now().isoformat())
             })
         except Exception as e:
@@ -0,0 +1,123 @@
+"""
+Classification zero-shot (NLI) par lots pour le classifieur d'intents BART
+Les requêtes arrivant dans une fenêtre de quelques millisecondes sont regroupées
+et toutes leurs paires (requête, hypothèse) passent dans un seul batch paddé.
+Les hypothèses tokenisées sont mises en cache par jeu de labels.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from apps.chatbot.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+class BatchedZeroShotClassifier:
+    """Remplaçant du pipeline 'zero-shot-classification' avec micro-batching
+
+    S'appelle comme le pipeline : classifier(query, candidate_labels=[...])
+    renvoie {'sequence', 'labels', 'scores'} avec les labels triés par score.
+    Le thread du micro-batcher ne démarre qu'au premier appel : le serveur
+    d'inférence, qui regroupe lui-même les requêtes, n'utilise que classify_batch.
+    """
+
+    def __init__(self, model_name: str = "facebook/bart-large-mnli", device: str = 'cpu',
+                 hypothesis_template: str = DEFAULT_HYPOTHESIS_TEMPLATE, max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, max_pairs_per_forward: int = 256, max_premise_tokens: int = 256):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.torch = torch
+        self.device = device
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(device).eval()
+        self.hypothesis_template = hypothesis_template
+        self.max_pairs_per_forward = max_pairs_per_forward
+        self.max_premise_tokens = max_premise_tokens
+        self.entailment_id = self._entailment_id()
+        self._hypothesis_cache: Dict[Tuple[str, ...], List[List[int]]] = {}
+        self._cache_lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+    @property
+    def batcher(self) -> MicroBatcher:
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(self.classify_batch, self.max_batch_size, self.max_wait_ms,
+                                                 'zero-shot-batcher')
+        return self._batcher
+
+    def _entailment_id(self) -> int:
+        for label, index in self.model.config.label2id.items():
+            if label.lower().startswith('entail'):
+                return int(index)
+        return -1
+
+    def _hypothesis_ids(self, labels: Tuple[str, ...]) -> List[List[int]]:
+        """Tokenisation des hypothèses, calculée une seule fois par jeu de labels"""
+        with self._cache_lock:
+            cached = self._hypothesis_cache.get(labels)
+            if cached is None:
+                hypotheses = [self.hypothesis_template.format(label) for label in labels]
+                cached = self.tokenizer(hypotheses, add_special_tokens=False)['input_ids']
+                self._hypothesis_cache[labels] = cached
+            return cached
+
+    def classify_batch(self, items: List[Tuple[str, Tuple[str, ...]]]) -> List[Dict[str, Any]]:
+        """Classe un lot de (requête, labels) en un minimum de passes avant"""
+        torch = self.torch
+        premises = self.tokenizer(
+            [sequence for sequence, _ in items], add_special_tokens=False,
+            truncation=True, max_length=self.max_premise_tokens
+        )['input_ids']
+
+        pairs, owners = [], []
+        for index, ((_, labels), premise) in enumerate(zip(items, premises)):
+            for hypothesis in self._hypothesis_ids(labels):
+                pairs.append(self.tokenizer.build_inputs_with_special_tokens(premise, hypothesis))
+                owners.append(index)
+
+        logits = []
+        with torch.inference_mode():
+            for start in range(0, len(pairs), self.max_pairs_per_forward):
+                chunk = self.tokenizer.pad(
+                    {'input_ids': pairs[start:start + self.max_pairs_per_forward]}, return_tensors='pt'
+                )
+                chunk = {key: value.to(self.device) for key, value in chunk.items()}
+                logits.append(self.model(**chunk).logits[:, self.entailment_id].float().cpu())
+        entailment = torch.cat(logits) if logits else torch.empty(0)
+
+        results, offset = [], 0
+        for sequence, labels in items:
+            scores = torch.softmax(entailment[offset:offset + len(labels)], dim=0).tolist()
+            offset += len(labels)
+            ranked = sorted(zip(labels, scores), key=lambda pair: pair[1], reverse=True)
+            results.append({
+                'sequence': sequence,
+                'labels': [label for label, _ in ranked],
+                'scores': [score for _, score in ranked],
+            })
+        return results
+
+    def __call__(self, sequences: Union[str, Sequence[str]], candidate_labels: Sequence[str], **kwargs):
+        labels = tuple(candidate_labels)
+        if isinstance(sequences, str):
+            return self.batcher((sequences, labels))
+        futures = [self.batcher.submit((sequence, labels)) for sequence in sequences]
+        return [future.result() for future in futures]
+
+    def get_stats(self) -> Dict[str, Any]:
+        if self._batcher is not None:
+            stats = self._batcher.get_stats()
+        else:
+            stats = {'batches': 0, 'items': 0, 'max_batch': 0, 'errors': 0, 'avg_batch': 0, 'queued': 0}
+        stats['cached_label_sets'] = len(self._hypothesis_cache)
+        return stats
@@ -26,7 +26,7 @@ class ChatbotImprover:
     
     def __init__(self):
         """Initialise l'améliorateur"""
-        self.chatbot = ParcInfoChatbot()
+        self.chatbot = ParcInfoChatbot(warmup='sync')
         self.improvements_made = []
         
         print("🚀 Améliorateur Immédiat du Chatbot ParcInfo")
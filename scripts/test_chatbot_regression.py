@@ -20,7 +20,7 @@ def norm_response(res):
 
 
 def run_tests(tests: List[Tuple[str, List[str]]]) -> int:
-    bot = ParcInfoChatbot()
+    bot = ParcInfoChatbot(warmup='sync')
     total = 0
     failed = 0
     for idx, (query, expects) in enumerate(tests, 1):